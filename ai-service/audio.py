@@ -0,0 +1,306 @@
+import io
+import struct
+import subprocess
+import tempfile
+import threading
+from typing import List, Optional
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+# Whisper expects 16 kHz mono input, so every upload is decoded straight to it
+TARGET_SAMPLE_RATE = 16000
+
+# Leading bytes of the containers libsndfile decodes (WAV, RF64, FLAC, OGG, AIFF)
+SOUNDFILE_SIGNATURES = (b"RIFF", b"RF64", b"fLaC", b"OggS", b"FORM")
+
+
+class AudioDecodeError(ValueError):
+    """Raised when an upload cannot be decoded as audio."""
+
+
+class AudioTooLargeError(AudioDecodeError):
+    """Raised when an upload exceeds the size or duration limit."""
+
+
+def decode_audio(data: bytes, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Decode an uploaded recording in memory to mono float32 samples at target_sr."""
+    if not data:
+        raise AudioDecodeError("Audio file is empty")
+
+    # WAV, FLAC and OGG decode directly through libsndfile
+    try:
+        y, sr = sf.read(io.BytesIO(data), dtype="float32", always_2d=True)
+    except RuntimeError:
+        return decode_with_ffmpeg(data, target_sr)
+
+    y = y.mean(axis=1)
+    if sr != target_sr:
+        y = librosa.resample(y, orig_sr=sr, target_sr=target_sr)
+    return finalize_waveform(y)
+
+
+def ffmpeg_command(target_sr: int) -> List[str]:
+    """ffmpeg arguments that decode stdin to mono float32 samples at target_sr on stdout."""
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "f32le", "-ac", "1", "-ar", str(target_sr),
+        "pipe:1",
+    ]
+
+
+def ffmpeg_error(stderr: bytes) -> AudioDecodeError:
+    message = stderr.decode("utf-8", errors="replace").strip().splitlines()
+    return AudioDecodeError(f"Could not decode audio: {message[-1] if message else 'unknown error'}")
+
+
+def decode_with_ffmpeg(data, target_sr: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """Decode any container ffmpeg understands (WebM, MP3, M4A, ...) through pipes.
+
+    ``data`` is either the encoded bytes or an open file to read them from.
+    """
+    try:
+        process = subprocess.run(
+            ffmpeg_command(target_sr),
+            capture_output=True,
+            check=False,
+            **({"input": data} if isinstance(data, bytes) else {"stdin": data}),
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError("Unsupported audio format (ffmpeg is not installed)")
+
+    if process.returncode != 0:
+        raise ffmpeg_error(process.stderr)
+
+    return finalize_waveform(np.frombuffer(process.stdout, dtype=np.float32))
+
+
+def declared_duration(head: bytes) -> Optional[float]:
+    """Duration announced by a WAV or FLAC header, from the first bytes of the file.
+
+    Returns None while the header is incomplete, for other formats, and for
+    streamed WAVs that leave the data size unset.
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        byte_rate = None
+        offset = 12
+        while offset + 8 <= len(head):
+            chunk_id = head[offset:offset + 4]
+            size = struct.unpack("<I", head[offset + 4:offset + 8])[0]
+            if chunk_id == b"fmt " and offset + 20 <= len(head):
+                byte_rate = struct.unpack("<I", head[offset + 16:offset + 20])[0]
+            elif chunk_id == b"data":
+                return size / byte_rate if byte_rate and 0 < size < 0xFFFFFFFF else None
+            offset += 8 + size + (size & 1)
+        return None
+
+    if head[:4] == b"fLaC" and len(head) >= 26:
+        # STREAMINFO: 20 bits sample rate, 3 bits channels, 5 bits depth, 36 bits total samples
+        bits = int.from_bytes(head[18:26], "big")
+        sample_rate, total_samples = bits >> 44, bits & ((1 << 36) - 1)
+        return total_samples / sample_rate if sample_rate and total_samples else None
+
+    return None
+
+
+class IncrementalDecoder:
+    """Decode an upload while it is still arriving, within size and duration limits.
+
+    Chunks are fed as they are received. Containers libsndfile reads (WAV,
+    FLAC, OGG) are spooled to a temporary file that stays in memory up to
+    ``spool_bytes`` and moves to disk beyond that; WAV and FLAC headers give
+    the duration, so an overlong recording is rejected from its first chunk.
+    Other spooled files are checked against the length libsndfile reports
+    before decoding, then decoded block by block up to the limit. Anything
+    else is piped into ffmpeg as it arrives and decoded concurrently, and the
+    decoded length is checked as it grows. Either way at most ``max_bytes``
+    of the upload are accepted.
+    """
+
+    HEAD_BYTES = 65536
+
+    def __init__(
+        self,
+        target_sr: int = TARGET_SAMPLE_RATE,
+        max_bytes: int = 25 * 1024 * 1024,
+        max_seconds: float = 600.0,
+        spool_bytes: int = 1024 * 1024,
+    ):
+        self.target_sr = target_sr
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.spool_bytes = spool_bytes
+        self.received = 0
+        self._head = b""
+        self._duration_checked = False
+        self._spool = None
+        self._process = None
+        self._stderr = None
+        self._reader = None
+        self._decoded: List[bytes] = []
+        self._decoded_bytes = 0
+        self._too_long = False
+
+    def too_long_error(self) -> AudioTooLargeError:
+        return AudioTooLargeError(f"Recording exceeds the {self.max_seconds:g} s upload limit")
+
+    def feed(self, chunk: bytes):
+        """Accept the next chunk of the upload."""
+        if not chunk:
+            return
+        self.received += len(chunk)
+        if self.received > self.max_bytes:
+            raise AudioTooLargeError(f"Upload exceeds the {self.max_bytes} byte limit")
+
+        if len(self._head) < self.HEAD_BYTES:
+            self._head += chunk[:self.HEAD_BYTES - len(self._head)]
+        if self._spool is None and self._process is None:
+            # Wait for the signature before picking a decoder
+            if len(self._head) < 4:
+                return
+            if self._head[:4] in SOUNDFILE_SIGNATURES:
+                self._spool = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+            else:
+                self._start_ffmpeg()
+            chunk = self._head[:self.received - len(chunk)] + chunk
+
+        if self._spool is not None:
+            self._spool.write(chunk)
+            self._check_declared_duration()
+        else:
+            if self._too_long:
+                raise self.too_long_error()
+            try:
+                self._process.stdin.write(chunk)
+            except BrokenPipeError:
+                raise self._ffmpeg_failure()
+
+    def finish(self) -> np.ndarray:
+        """Decode the rest of the upload and return its samples."""
+        if self.received == 0:
+            raise AudioDecodeError("Audio file is empty")
+        if self._spool is None and self._process is None:
+            # Shorter than any signature: leave it to ffmpeg to reject
+            return decode_with_ffmpeg(self._head, self.target_sr)
+
+        y = None
+        if self._spool is not None:
+            y = self._decode_spool()
+            if y is None:
+                # libsndfile cannot read it after all: decode it through the same capped ffmpeg pipe
+                self._pipe_spool_to_ffmpeg()
+        if y is None:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+            self._process.wait()
+            self._reader.join()
+            if self._too_long:
+                raise self.too_long_error()
+            if self._process.returncode != 0:
+                raise self._ffmpeg_failure()
+            y = np.frombuffer(b"".join(self._decoded), dtype=np.float32)
+
+        if len(y) > self.max_seconds * self.target_sr:
+            raise self.too_long_error()
+        return finalize_waveform(y)
+
+    def close(self):
+        """Release the spool and stop ffmpeg if it is still running."""
+        if self._spool is not None:
+            self._spool.close()
+        if self._process is not None:
+            if self._process.poll() is None:
+                self._process.kill()
+            self._process.wait()
+            self._reader.join()
+            self._process.stdin.close()
+            self._stderr.close()
+
+    def _decode_spool(self) -> Optional[np.ndarray]:
+        """Decode the spooled upload with libsndfile; None if it cannot read it."""
+        self._spool.seek(0)
+        try:
+            with sf.SoundFile(self._spool) as f:
+                max_frames = int(self.max_seconds * f.samplerate)
+                # OGG and other headers without a declared duration still give libsndfile the length
+                if f.frames > max_frames:
+                    raise self.too_long_error()
+                blocks, frames = [], 0
+                for block in f.blocks(blocksize=65536, dtype="float32", always_2d=True):
+                    frames += len(block)
+                    if frames > max_frames:
+                        raise self.too_long_error()
+                    blocks.append(block.mean(axis=1))
+                sr = f.samplerate
+        except RuntimeError:
+            return None
+
+        y = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+        if sr != self.target_sr:
+            y = librosa.resample(y, orig_sr=sr, target_sr=self.target_sr)
+        return y
+
+    def _pipe_spool_to_ffmpeg(self):
+        self._spool.seek(0)
+        self._start_ffmpeg()
+        for chunk in iter(lambda: self._spool.read(65536), b""):
+            if self._too_long:
+                break
+            try:
+                self._process.stdin.write(chunk)
+            except BrokenPipeError:
+                break
+
+    def _check_declared_duration(self):
+        if self._duration_checked:
+            return
+        duration = declared_duration(self._head)
+        if duration is not None or len(self._head) >= self.HEAD_BYTES:
+            self._duration_checked = True
+        if duration is not None and duration > self.max_seconds:
+            raise self.too_long_error()
+
+    def _start_ffmpeg(self):
+        self._stderr = tempfile.TemporaryFile()
+        try:
+            self._process = subprocess.Popen(
+                ffmpeg_command(self.target_sr),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=self._stderr,
+                bufsize=0,
+            )
+        except FileNotFoundError:
+            self._stderr.close()
+            raise AudioDecodeError("Unsupported audio format (ffmpeg is not installed)")
+        self._reader = threading.Thread(target=self._read_decoded, daemon=True)
+        self._reader.start()
+
+    def _read_decoded(self):
+        max_decoded_bytes = int(self.max_seconds * self.target_sr) * 4
+        for data in iter(lambda: self._process.stdout.read(65536), b""):
+            self._decoded.append(data)
+            self._decoded_bytes += len(data)
+            if self._decoded_bytes > max_decoded_bytes:
+                self._too_long = True
+                self._process.kill()
+                break
+        self._process.stdout.close()
+
+    def _ffmpeg_failure(self) -> AudioDecodeError:
+        self._process.wait()
+        if self._too_long:
+            return self.too_long_error()
+        self._stderr.seek(0)
+        return ffmpeg_error(self._stderr.read())
+
+
+def finalize_waveform(y: np.ndarray) -> np.ndarray:
+    """Check decoded samples and return them as a contiguous float32 array."""
+    if y.size == 0:
+        raise AudioDecodeError("Audio file contains no samples")
+    return np.ascontiguousarray(y, dtype=np.float32)
@@ -0,0 +1,88 @@
+import asyncio
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-item calls into batched calls.
+
+    Callers ``await submit(item)`` and get back their own result. Items are
+    gathered until either ``max_batch_size`` items are pending or the oldest
+    pending item has waited ``max_wait_ms``, then ``process_batch`` runs once
+    for the whole batch and each caller's future is resolved with the matching
+    entry of the returned list.
+
+    Batches run through ``queue`` (an InferenceQueue) when one is given, so
+    they share its concurrency limit and backpressure; otherwise they run in
+    the event loop's default executor.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        queue: Optional[Any] = None,
+    ):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.queue = queue
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue a single item and wait for its result."""
+        # Fail fast instead of piling more work onto a saturated model
+        if self.queue is not None:
+            self.queue.check_capacity()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        """Hand every pending item to a batch task, max_batch_size at a time."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        # Drop callers that gave up (e.g. client disconnected) before we start
+        batch = [(item, future) for item, future in batch if not future.done()]
+        if not batch:
+            return
+
+        items = [item for item, _ in batch]
+        try:
+            results = await self._call(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Batch function returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def _call(self, items: List[Any]) -> Sequence[Any]:
+        if self.queue is not None:
+            return await self.queue.run(self.process_batch, items)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.process_batch, items)
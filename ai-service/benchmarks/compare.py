@@ -0,0 +1,56 @@
+"""Compare two benchmark result files.
+
+Usage:
+    python benchmarks/compare.py baseline.json results.json [--threshold 10] [--fail-on-regression]
+"""
+import argparse
+import json
+import sys
+
+
+def result_key(result):
+    return result["name"] + " " + " ".join(f"{k}={v}" for k, v in sorted(result["params"].items()))
+
+
+def percent_change(old, new):
+    return 100.0 * (new - old) / old if old else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent change reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = {result_key(r): r for r in json.load(f)["results"]}
+    with open(args.candidate) as f:
+        candidate = {result_key(r): r for r in json.load(f)["results"]}
+
+    regressions = 0
+    print(f"{'benchmark':<64} {'p50':>9} {'p95':>9} {'p99':>9} {'throughput':>11}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        changes = [percent_change(old["latency_ms"][p], new["latency_ms"][p]) for p in ("p50", "p95", "p99")]
+        throughput = percent_change(old["throughput_per_s"], new["throughput_per_s"])
+        regressed = changes[0] > args.threshold or changes[1] > args.threshold or throughput < -args.threshold
+        regressions += regressed
+        print(
+            f"{key:<64} " + " ".join(f"{c:>+8.1f}%" for c in changes) + f" {throughput:>+10.1f}%"
+            + ("  REGRESSION" if regressed else "")
+        )
+
+    for key in sorted(baseline.keys() - candidate.keys()):
+        print(f"{key:<64} only in baseline")
+    for key in sorted(candidate.keys() - baseline.keys()):
+        print(f"{key:<64} only in candidate")
+
+    if regressions and args.fail_on_regression:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
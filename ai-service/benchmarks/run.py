@@ -0,0 +1,320 @@
+"""Per-stage and per-endpoint latency and throughput benchmarks.
+
+Stages (decode, feature extraction, transcription, text analysis) are timed
+by calling the service's functions directly. Endpoints are exercised in-process
+through an ASGI client (httpx) at each requested concurrency. Inputs are
+synthetic and seeded, and each request gets distinct content so caches do not
+flatter the numbers; repeated voice uploads are measured separately, as
+voice cache hits.
+
+With --tiny-models the three production models are replaced by tiny randomly
+initialised models of the same architectures, so the suite runs offline in
+seconds. Their numbers are only comparable with other --tiny-models runs.
+
+Usage (from the ai-service directory):
+    python benchmarks/run.py --tiny-models --output results.json
+    python benchmarks/run.py --snapshot-dir /models --audio-seconds 5 30 60 --concurrency 1 4 16 --output results.json
+    python benchmarks/compare.py baseline.json results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from benchmarks.synthetic import SAMPLE_RATE, synthetic_speech, synthetic_texts, wav_bytes  # noqa: E402
+
+UPLOAD_CHUNK_BYTES = 65536
+
+STAGES = ("decode", "fingerprint", "vad", "features", "transcription", "text", "long_text", "endpoints")
+
+
+def summarize(name, params, latencies, elapsed, items=1, errors=0):
+    """Latency percentiles (ms) and throughput (items/s) for one benchmark."""
+    latencies_ms = 1000 * np.asarray(latencies)
+    result = {
+        "name": name,
+        "params": params,
+        "iterations": len(latencies),
+        "errors": errors,
+        "latency_ms": {
+            "mean": round(float(latencies_ms.mean()), 3),
+            "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+            "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+            "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+        },
+        "throughput_per_s": round(len(latencies) * items / elapsed, 3),
+    }
+    if "audio_seconds" in params:
+        result["audio_seconds_per_s"] = round(len(latencies) * params["audio_seconds"] / elapsed, 3)
+    param_text = " ".join(f"{k}={v}" for k, v in params.items())
+    print(
+        f"{name:<24} {param_text:<32} p50 {result['latency_ms']['p50']:>9.2f} ms  "
+        f"p95 {result['latency_ms']['p95']:>9.2f} ms  p99 {result['latency_ms']['p99']:>9.2f} ms  "
+        f"{result['throughput_per_s']:>9.2f}/s" + (f"  errors {errors}" if errors else "")
+    )
+    return result
+
+
+def time_calls(fn, inputs, warmup):
+    """Time fn over every input after ``warmup`` untimed calls."""
+    for item in inputs[:warmup]:
+        fn(item)
+    latencies = []
+    start = time.perf_counter()
+    for item in inputs:
+        call_start = time.perf_counter()
+        fn(item)
+        latencies.append(time.perf_counter() - call_start)
+    return latencies, time.perf_counter() - start
+
+
+def decode_upload(main, payload):
+    """Decode a payload the way uploads are decoded: fed to an IncrementalDecoder in chunks."""
+    from audio import IncrementalDecoder
+
+    decoder = IncrementalDecoder(
+        main.TARGET_SAMPLE_RATE, main.UPLOAD_MAX_BYTES, main.UPLOAD_MAX_SECONDS, main.UPLOAD_SPOOL_BYTES
+    )
+    try:
+        for start in range(0, len(payload), UPLOAD_CHUNK_BYTES):
+            decoder.feed(payload[start:start + UPLOAD_CHUNK_BYTES])
+        return decoder.finish()
+    finally:
+        decoder.close()
+
+
+def distinct_clips(seconds, count, seed):
+    """``count`` clips of one length that differ in content, so no two requests share a cache entry."""
+    base = synthetic_speech(seconds, seed=seed)
+    rng = np.random.default_rng(seed)
+    return [np.clip(base + 1e-3 * rng.standard_normal(len(base)).astype(np.float32), -1, 1) for _ in range(count)]
+
+
+def bench_stages(main, args):
+    results = []
+    for seconds in args.audio_seconds:
+        clips = distinct_clips(seconds, args.iterations + args.warmup, args.seed)
+        params = {"audio_seconds": seconds}
+
+        if "decode" in args.stages:
+            payloads = [wav_bytes(clip) for clip in clips]
+            latencies, elapsed = time_calls(lambda payload: decode_upload(main, payload), payloads, args.warmup)
+            results.append(summarize("decode", params, latencies, elapsed))
+
+        if "fingerprint" in args.stages:
+            latencies, elapsed = time_calls(main.audio_cache_key, clips, args.warmup)
+            results.append(summarize("audio_cache_key", params, latencies, elapsed))
+
+        if "vad" in args.stages:
+            latencies, elapsed = time_calls(main.detect_speech, clips, args.warmup)
+            results.append(summarize("vad", params, latencies, elapsed))
+
+        if "features" in args.stages:
+            latencies, elapsed = time_calls(main.extract_audio_features, clips, args.warmup)
+            results.append(summarize("extract_audio_features", params, latencies, elapsed))
+
+        if "transcription" in args.stages:
+            latencies, elapsed = time_calls(main.transcribe_waveform, clips, args.warmup)
+            results.append(summarize("transcription", params, latencies, elapsed))
+
+    if "text" in args.stages:
+        for batch_size in args.text_batch_sizes:
+            batches = [
+                synthetic_texts(batch_size, words=args.text_words, seed=args.seed + i)
+                for i in range(args.iterations + args.warmup)
+            ]
+            latencies, elapsed = time_calls(main.analyze_text_sentiment_batch, batches, args.warmup)
+            results.append(summarize(
+                "analyze_text_sentiment", {"batch_size": batch_size, "words": args.text_words},
+                latencies, elapsed, items=batch_size,
+            ))
+
+    if "long_text" in args.stages:
+        # Texts over the models' 512-token limit, scored in overlapping windows
+        for words in args.long_text_words:
+            batches = [
+                synthetic_texts(args.long_text_batch_size, words=words, seed=args.seed + i)
+                for i in range(args.iterations + args.warmup)
+            ]
+            latencies, elapsed = time_calls(main.analyze_text_sentiment_batch, batches, args.warmup)
+            results.append(summarize(
+                "analyze_text_long", {"batch_size": args.long_text_batch_size, "words": words},
+                latencies, elapsed, items=args.long_text_batch_size,
+            ))
+    return results
+
+
+async def run_concurrently(send, count, concurrency):
+    """Issue ``count`` requests from ``concurrency`` workers; return latencies, wall time and errors."""
+    latencies = []
+    errors = 0
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index, errors
+        while next_index < count:
+            index = next_index
+            next_index += 1
+            start = time.perf_counter()
+            response = await send(index)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies, time.perf_counter() - start, errors
+
+
+async def bench_endpoints(main, args):
+    import httpx
+
+    results = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for concurrency in args.concurrency:
+            texts = synthetic_texts(args.requests, words=args.text_words, seed=args.seed + 1000 * concurrency)
+            latencies, elapsed, errors = await run_concurrently(
+                lambda i: client.post("/analyze-text", json={"text": texts[i]}), args.requests, concurrency
+            )
+            results.append(summarize("POST /analyze-text", {"concurrency": concurrency}, latencies, elapsed, errors=errors))
+
+            for seconds in args.audio_seconds:
+                payloads = [wav_bytes(clip) for clip in distinct_clips(seconds, args.requests, args.seed + concurrency)]
+                latencies, elapsed, errors = await run_concurrently(
+                    lambda i: client.post("/analyze-voice", files={"audio": ("check-in.wav", payloads[i], "audio/wav")}),
+                    args.requests, concurrency,
+                )
+                results.append(summarize(
+                    "POST /analyze-voice", {"concurrency": concurrency, "audio_seconds": seconds},
+                    latencies, elapsed, errors=errors,
+                ))
+
+                # The same uploads again, as a client retrying after a timeout: answered from the voice cache
+                latencies, elapsed, errors = await run_concurrently(
+                    lambda i: client.post("/analyze-voice", files={"audio": ("retry.wav", payloads[i], "audio/wav")}),
+                    args.requests, concurrency,
+                )
+                results.append(summarize(
+                    "POST /analyze-voice cached", {"concurrency": concurrency, "audio_seconds": seconds},
+                    latencies, elapsed, errors=errors,
+                ))
+
+        for count in args.corpus_sizes:
+            bodies = [
+                "".join(
+                    json.dumps({"id": i, "text": text}) + "\n"
+                    for i, text in enumerate(synthetic_texts(count, words=args.text_words, seed=args.seed + count + n))
+                )
+                for n in range(args.iterations)
+            ]
+            latencies, elapsed, errors = await run_concurrently(
+                lambda i: client.post("/analyze-text/batch", content=bodies[i], headers={"content-type": "application/x-ndjson"}),
+                args.iterations, 1,
+            )
+            results.append(summarize(
+                "POST /analyze-text/batch", {"texts": count}, latencies, elapsed, items=count, errors=errors,
+            ))
+    return results
+
+
+def environment_info():
+    import torch
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    models = parser.add_mutually_exclusive_group()
+    models.add_argument("--tiny-models", action="store_true", help="Use tiny random models of the same architectures")
+    models.add_argument("--snapshot-dir", help="Load real models from this MODEL_SNAPSHOT_DIR")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES)
+    parser.add_argument("--audio-seconds", nargs="+", type=float, default=[5, 30, 60])
+    parser.add_argument("--text-batch-sizes", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--text-words", type=int, default=20, help="Approximate words per synthetic text")
+    parser.add_argument("--long-text-words", nargs="+", type=int, default=[600, 3000], help="Words per long text")
+    parser.add_argument("--long-text-batch-size", type=int, default=4, help="Long texts analyzed together")
+    parser.add_argument("--corpus-sizes", nargs="+", type=int, default=[100, 1000], help="Texts per /analyze-text/batch call")
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 4])
+    parser.add_argument("--iterations", type=int, default=10, help="Timed calls per stage benchmark")
+    parser.add_argument("--requests", type=int, default=16, help="Requests per endpoint benchmark")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if "endpoints" in args.stages:
+        try:
+            import httpx  # noqa: F401
+        except ImportError:
+            print("Skipping the endpoints stage: it needs httpx (pip install httpx)", file=sys.stderr)
+            args.stages = [stage for stage in args.stages if stage != "endpoints"]
+
+    import torch
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    # The model configuration must be in place before main.py is imported
+    tiny_dir = None
+    if args.tiny_models:
+        from benchmarks.tiny_models import build_tiny_models
+        tiny_dir = tempfile.mkdtemp(prefix="tiny-models-")
+        os.environ["MODEL_SNAPSHOT_DIR"] = tiny_dir
+    elif args.snapshot_dir:
+        os.environ["MODEL_SNAPSHOT_DIR"] = args.snapshot_dir
+    os.environ["MODEL_LOAD_MODE"] = "lazy"
+    # Results persisted by an earlier run would turn cold requests into cache hits
+    os.environ.pop("ANALYSIS_CACHE_SHARED_PATH", None)
+    os.environ.pop("VOICE_CACHE_PATH", None)
+
+    import main as service
+
+    if tiny_dir:
+        build_tiny_models(tiny_dir, {name: spec.model_id for name, spec in service.model_registry.specs.items()}, seed=args.seed)
+    for name in service.model_registry.specs:
+        service.model_registry.load(name)
+
+    results = bench_stages(service, args)
+    if "endpoints" in args.stages:
+        results += asyncio.run(bench_endpoints(service, args))
+
+    report = {
+        "environment": environment_info(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "models": {name: spec.status() for name, spec in service.model_registry.specs.items()},
+        "sample_rate": SAMPLE_RATE,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Deterministic synthetic inputs for benchmarks: speech-like audio and check-in texts."""
+import io
+
+import numpy as np
+import soundfile as sf
+
+SAMPLE_RATE = 16000
+
+# (F1, F2, F3) formant centres of a few vowels, in Hz
+VOWEL_FORMANTS = [(730, 1090, 2440), (270, 2290, 3010), (530, 1840, 2480), (570, 840, 2410), (300, 870, 2240)]
+
+
+def synthetic_speech(seconds, sr=SAMPLE_RATE, seed=0):
+    """Speech-like audio: voiced syllables with a moving pitch and vowel formants,
+    fricative noise bursts, pauses between phrases and a low noise floor."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sr)
+    y = 0.002 * rng.standard_normal(n)
+    base_f0 = rng.uniform(110, 220)
+
+    position = int(rng.uniform(0.2, 0.6) * sr)
+    while position < n:
+        # A phrase of a few syllables, then a pause
+        for _ in range(rng.integers(3, 12)):
+            length = int(rng.uniform(0.12, 0.3) * sr)
+            if position + length >= n:
+                break
+            t = np.arange(length) / sr
+            f0 = base_f0 * (1 + 0.08 * np.sin(2 * np.pi * rng.uniform(1, 3) * t + rng.uniform(0, np.pi)))
+            phase = 2 * np.pi * np.cumsum(f0) / sr
+            formants = VOWEL_FORMANTS[rng.integers(len(VOWEL_FORMANTS))]
+
+            syllable = np.zeros(length)
+            for k in range(1, int(4000 / f0.mean())):
+                harmonic = k * f0.mean()
+                gain = sum(np.exp(-0.5 * ((harmonic - f) / 120) ** 2) for f in formants) / k ** 0.5
+                syllable += gain * np.sin(k * phase)
+
+            if rng.random() < 0.3:
+                syllable += 0.3 * np.diff(rng.standard_normal(length + 1))  # fricative-like noise
+
+            envelope = np.sin(np.pi * np.arange(length) / length) ** 2
+            y[position:position + length] += 0.1 * rng.uniform(0.5, 1.5) * envelope * syllable
+            position += length + int(rng.uniform(0.02, 0.08) * sr)
+        position += int(rng.uniform(0.3, 1.2) * sr)
+
+    return np.clip(y, -1, 1).astype(np.float32)
+
+
+def wav_bytes(y, sr=SAMPLE_RATE):
+    buffer = io.BytesIO()
+    sf.write(buffer, y, sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+FEELINGS = ["happy", "tired", "anxious", "calm", "frustrated", "hopeful", "sad", "excited", "overwhelmed", "content"]
+EVENTS = [
+    "work was busy", "I went for a walk", "the meeting ran late", "I called my sister", "I slept badly",
+    "I finished my project", "the kids were loud", "it rained all day", "I cooked dinner", "traffic was terrible",
+]
+CONNECTORS = ["and", "but", "because", "so", "although"]
+
+
+def synthetic_texts(count, words=20, seed=0):
+    """Check-in style texts of roughly ``words`` words each."""
+    rng = np.random.default_rng(seed)
+    texts = []
+    for _ in range(count):
+        parts = []
+        while sum(len(p.split()) for p in parts) < words:
+            parts.append(
+                f"I feel {FEELINGS[rng.integers(len(FEELINGS))]} {CONNECTORS[rng.integers(len(CONNECTORS))]} "
+                f"{EVENTS[rng.integers(len(EVENTS))]}."
+            )
+        texts.append(" ".join(parts))
+    return texts
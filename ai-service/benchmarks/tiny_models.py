@@ -0,0 +1,124 @@
+"""Tiny randomly initialised stand-ins for the service's three models.
+
+The models keep the production architectures (DistilBERT and DistilRoBERTa
+sequence classifiers, Whisper encoder-decoder) and label sets but are only a
+few layers of width 32, so benchmarks exercise every code path offline in
+seconds. They are written in the MODEL_SNAPSHOT_DIR layout expected by
+models.ModelRegistry. Their outputs are meaningless; only timings matter.
+"""
+import json
+import os
+
+import torch
+from transformers import (
+    DistilBertConfig,
+    DistilBertForSequenceClassification,
+    DistilBertTokenizerFast,
+    RobertaConfig,
+    RobertaForSequenceClassification,
+    RobertaTokenizerFast,
+    WhisperConfig,
+    WhisperFeatureExtractor,
+    WhisperForConditionalGeneration,
+    WhisperTokenizer,
+)
+from transformers.models.gpt2.tokenization_gpt2 import bytes_to_unicode
+
+SENTIMENT_LABELS = ["NEGATIVE", "POSITIVE"]
+EMOTION_LABELS = ["anger", "disgust", "fear", "joy", "neutral", "sadness", "surprise"]
+WHISPER_SPECIAL_TOKENS = [
+    "<|endoftext|>", "<|startoftranscript|>", "<|en|>", "<|transcribe|>", "<|translate|>", "<|notimestamps|>",
+]
+
+
+def byte_level_vocab(special_tokens, special_first=False):
+    """A byte-level BPE vocabulary with no merges: every byte is one token.
+
+    The special tokens come after the bytes, as in Whisper, or before them
+    with ``special_first``, as in RoBERTa.
+    """
+    tokens = list(bytes_to_unicode().values())
+    tokens = special_tokens + tokens if special_first else tokens + special_tokens
+    return {token: i for i, token in enumerate(tokens)}
+
+
+def write_bpe_files(directory, vocab):
+    with open(os.path.join(directory, "vocab.json"), "w") as f:
+        json.dump(vocab, f)
+    with open(os.path.join(directory, "merges.txt"), "w") as f:
+        f.write("#version: 0.2\n")
+
+
+def build_sentiment(directory, width):
+    os.makedirs(directory, exist_ok=True)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + [chr(c) for c in range(33, 127)]
+    vocab += ["##" + chr(c) for c in range(33, 127)]
+    with open(os.path.join(directory, "vocab.txt"), "w") as f:
+        f.write("\n".join(vocab))
+    tokenizer = DistilBertTokenizerFast(vocab_file=os.path.join(directory, "vocab.txt"), model_max_length=512)
+
+    config = DistilBertConfig(
+        vocab_size=len(vocab), dim=width, hidden_dim=2 * width, n_layers=2, n_heads=2,
+        id2label=dict(enumerate(SENTIMENT_LABELS)), label2id={l: i for i, l in enumerate(SENTIMENT_LABELS)},
+    )
+    DistilBertForSequenceClassification(config).save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+
+
+def build_emotion(directory, width):
+    os.makedirs(directory, exist_ok=True)
+    # RoBERTa position ids start after padding_idx, so <pad> must be 1 for 512-token inputs to fit
+    vocab = byte_level_vocab(["<s>", "<pad>", "</s>", "<unk>", "<mask>"], special_first=True)
+    write_bpe_files(directory, vocab)
+    tokenizer = RobertaTokenizerFast(
+        os.path.join(directory, "vocab.json"), os.path.join(directory, "merges.txt"), model_max_length=512
+    )
+
+    config = RobertaConfig(
+        vocab_size=len(vocab), hidden_size=width, intermediate_size=2 * width, num_hidden_layers=2,
+        num_attention_heads=2, max_position_embeddings=514, pad_token_id=vocab["<pad>"],
+        bos_token_id=vocab["<s>"], eos_token_id=vocab["</s>"],
+        id2label=dict(enumerate(EMOTION_LABELS)), label2id={l: i for i, l in enumerate(EMOTION_LABELS)},
+    )
+    RobertaForSequenceClassification(config).save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+
+
+def build_speech(directory, width, max_new_tokens=16):
+    os.makedirs(directory, exist_ok=True)
+    vocab = byte_level_vocab(WHISPER_SPECIAL_TOKENS)
+    write_bpe_files(directory, vocab)
+    eot = vocab["<|endoftext|>"]
+    tokenizer = WhisperTokenizer(
+        os.path.join(directory, "vocab.json"), os.path.join(directory, "merges.txt"),
+        unk_token="<|endoftext|>", bos_token="<|endoftext|>", eos_token="<|endoftext|>", pad_token="<|endoftext|>",
+    )
+    tokenizer.add_special_tokens({"additional_special_tokens": WHISPER_SPECIAL_TOKENS[1:]})
+
+    config = WhisperConfig(
+        vocab_size=len(vocab), num_mel_bins=80, d_model=width, encoder_layers=2, decoder_layers=2,
+        encoder_attention_heads=2, decoder_attention_heads=2, encoder_ffn_dim=2 * width, decoder_ffn_dim=2 * width,
+        max_source_positions=1500, max_target_positions=64, decoder_start_token_id=vocab["<|startoftranscript|>"],
+        pad_token_id=eot, bos_token_id=eot, eos_token_id=eot, begin_suppress_tokens=None, suppress_tokens=None,
+    )
+    model = WhisperForConditionalGeneration(config)
+    model.generation_config.max_length = max_new_tokens
+    model.generation_config.no_timestamps_token_id = vocab["<|notimestamps|>"]
+    model.generation_config.forced_decoder_ids = None
+    model.save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    WhisperFeatureExtractor(feature_size=80).save_pretrained(directory)
+
+
+def build_tiny_models(snapshot_dir, model_ids, width=32, seed=0):
+    """Write tiny models for the sentiment, emotion and speech model ids into snapshot_dir.
+
+    Every speech model of the cascade ("speech" and "speech:<name>") gets a tiny Whisper.
+    """
+    torch.manual_seed(seed)
+    build_sentiment(os.path.join(snapshot_dir, model_ids["sentiment"]), width)
+    build_emotion(os.path.join(snapshot_dir, model_ids["emotion"]), width)
+    for name, model_id in model_ids.items():
+        if name == "speech" or name.startswith("speech:"):
+            build_speech(os.path.join(snapshot_dir, model_id), width)
+    return snapshot_dir
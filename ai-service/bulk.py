@@ -0,0 +1,214 @@
+import codecs
+import json
+import re
+import tempfile
+from typing import IO, Any, Iterable, Iterator, Optional
+
+READ_CHUNK_SIZE = 64 * 1024
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_CONTAINER_SPECIAL = re.compile(r'["\[\]{}]')
+_SCALAR_END = re.compile(r'[\s,\]]')
+
+
+class BulkItemError(ValueError):
+    """A single item of a bulk request could not be parsed."""
+
+
+class BodyTooLargeError(ValueError):
+    """Raised when a request body exceeds the size limit."""
+
+    def __init__(self, max_bytes: int):
+        super().__init__(f"Request body exceeds the {max_bytes} byte limit")
+
+
+async def spool_request_body(request, max_memory_bytes: int = 1024 * 1024, max_bytes: Optional[int] = None) -> IO[bytes]:
+    """Copy the request body into a temporary file that only spills to disk when large.
+
+    With ``max_bytes``, a larger body raises BodyTooLargeError: straight away
+    when its declared Content-Length is over the limit, otherwise as soon as
+    that much has been received.
+    """
+    if max_bytes is not None:
+        declared = request.headers.get("content-length", "")
+        if declared.isdigit() and int(declared) > max_bytes:
+            raise BodyTooLargeError(max_bytes)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=max_memory_bytes)
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if max_bytes is not None and received > max_bytes:
+                raise BodyTooLargeError(max_bytes)
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def is_json_array(stream: IO[bytes], content_type: str = "") -> bool:
+    """Whether a spooled bulk body is a JSON array rather than NDJSON."""
+    first = b""
+    while True:
+        chunk = stream.read(1)
+        if not chunk or not chunk.isspace():
+            first = chunk
+            break
+    stream.seek(0)
+
+    if not first:
+        raise ValueError("Request body is empty")
+    return first == b"[" and "ndjson" not in content_type
+
+
+def load_bulk_items(stream: IO[bytes], content_type: str = "") -> Iterable[Any]:
+    """The items of a spooled bulk body: a JSON array, or NDJSON otherwise.
+
+    A JSON array is parsed in full here, so a malformed one raises ValueError
+    before any result is sent, and its items are returned as a list. NDJSON
+    is parsed lazily, line by line: a bad line only fails its own item.
+    """
+    if is_json_array(stream, content_type):
+        return list(iter_json_array(stream))
+    return iter_ndjson(stream)
+
+
+def iter_ndjson(stream: IO[bytes]) -> Iterator[Any]:
+    """Yield one decoded value per non-empty line, or a BulkItemError for bad lines."""
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield BulkItemError(f"Invalid JSON line: {e}")
+
+
+class _ValueScanner:
+    """Finds where a JSON value ends, chunk by chunk, without decoding it.
+
+    Only brackets, braces and quotes are tracked, so each character is looked
+    at once however many chunks the value spans. Whether the value is valid is
+    left to the decoder.
+    """
+
+    def __init__(self, first_char: str):
+        self.scalar = first_char not in '"[{'
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+
+    def scan(self, text: str, start: int = 0) -> int:
+        """The index just past the value's end in ``text``, or -1 if it goes on."""
+        if self.scalar:
+            match = _SCALAR_END.search(text, start)
+            return match.start() if match else -1
+
+        index = start
+        while True:
+            if self.escaped:
+                if index >= len(text):
+                    return -1
+                index += 1
+                self.escaped = False
+            match = (_STRING_SPECIAL if self.in_string else _CONTAINER_SPECIAL).search(text, index)
+            if not match:
+                return -1
+            char, index = match.group(), match.end()
+            if char == "\\":
+                self.escaped = True
+            elif char == '"':
+                self.in_string = not self.in_string
+                if not self.in_string and self.depth == 0:
+                    return index
+            elif char in "[{":
+                self.depth += 1
+            else:
+                self.depth -= 1
+                if self.depth <= 0:
+                    return index
+
+
+def _iter_text(stream: IO[bytes]) -> Iterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        text = decoder.decode(chunk, final=not chunk)
+        if text:
+            yield text
+        if not chunk:
+            return
+
+
+def iter_json_array(stream: IO[bytes]) -> Iterator[Any]:
+    """Yield the elements of a top-level JSON array without loading the whole array.
+
+    Raises ValueError for anything that is not exactly one JSON array, such as
+    a missing or doubled comma, or data after the closing bracket.
+    """
+    decoder = json.JSONDecoder()
+    chunks = _iter_text(stream)
+    buffer = ""
+    position = 0
+    # Characters already dropped from the buffer, to report positions in the whole body
+    consumed = 0
+    # What comes next: "[", the first element or "]", an element, "," or "]", or nothing
+    expected = "array"
+
+    while True:
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+
+        if position < len(buffer):
+            char = buffer[position]
+            if expected == "array":
+                if char != "[":
+                    raise ValueError("Request body must be a JSON array or NDJSON")
+                expected = "first"
+                position += 1
+                continue
+            if expected == "end":
+                raise ValueError("Request body has data after the JSON array")
+            if expected == "separator":
+                if char not in ",]":
+                    raise ValueError(f"Expected ',' or ']' at character {consumed + position} of the JSON array")
+                expected = "element" if char == "," else "end"
+                position += 1
+                continue
+            if char == "]" and expected == "first":
+                expected = "end"
+                position += 1
+                continue
+            if char in ",]":
+                raise ValueError(f"Expected a value at character {consumed + position} of the JSON array")
+            scanner = _ValueScanner(char)
+            if scanner.scan(buffer, position) < 0:
+                # The value goes on in later chunks: gather them, scanning only the new text
+                consumed += position
+                pieces = [buffer[position:]]
+                for chunk in chunks:
+                    pieces.append(chunk)
+                    if scanner.scan(chunk) >= 0:
+                        break
+                buffer = "".join(pieces)
+                position = 0
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+            except ValueError:
+                raise ValueError("Request body is not valid JSON")
+            yield value
+            expected = "separator"
+            continue
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            if expected == "end":
+                return
+            raise ValueError("Request body is not a complete JSON array")
+        consumed += len(buffer)
+        buffer = chunk
+        position = 0
@@ -0,0 +1,234 @@
+import asyncio
+import copy
+import functools
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text so trivially different inputs share a cache entry."""
+    return " ".join(unicodedata.normalize("NFKC", text).split())
+
+
+def content_key(data: bytes, namespace: str) -> str:
+    """Build a cache key from a content hash, scoped to a namespace."""
+    return f"{namespace}:{hashlib.sha256(data).hexdigest()}"
+
+
+def text_cache_key(text: str, namespace: str = "text") -> str:
+    return content_key(normalize_text(text).encode("utf-8"), namespace)
+
+
+def audio_cache_key(waveform: np.ndarray, namespace: str = "voice") -> str:
+    """Build a cache key from decoded audio samples.
+
+    The samples are hashed as 16-bit PCM, so the same recording sent in another
+    container or with different metadata gets the same key, despite small float
+    differences between decoders.
+    """
+    pcm = np.clip(np.rint(np.asarray(waveform, dtype=np.float32) * 32768), -32768, 32767)
+    return content_key(pcm.astype("<i2").tobytes(), namespace)
+
+
+class SqliteCacheBackend:
+    """Cache backend stored in a local SQLite file.
+
+    Every uvicorn worker on the host can point at the same file, so a result
+    computed by one worker is a hit for the others. Values must be JSON
+    serializable. Calls block on SQLite (up to its 5 s lock timeout under
+    write contention), so async code goes through ``run``.
+    """
+
+    def __init__(self, path: str, ttl_seconds: float = 3600, max_entries: int = 100000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = None
+        self._pid = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross a fork, so each process opens its own
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    async def run(self, function: Callable, *args) -> Any:
+        """Run a blocking call of this backend on its own thread, keeping SQLite off the event loop."""
+        # Threads do not survive a fork, so each process starts its own
+        if self._executor is None or self._executor_pid != os.getpid():
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-cache")
+            self._executor_pid = os.getpid()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(function, *args))
+
+    def get_entry(self, key: str) -> Optional[Tuple[Any, float]]:
+        """The value stored under a key and when it expires (a ``time.time()`` timestamp)."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self.get_entry(key)
+        return entry[0] if entry is not None else None
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self.ttl_seconds),
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                self._prune()
+
+    def set_if_version(self, key: str, value: Dict[str, Any], version: Optional[int]) -> bool:
+        """Store a value with a ``version`` field, unless another writer got there first.
+
+        The write only happens if the live entry still has ``version`` (None:
+        no live entry), checked and written in one transaction that holds
+        SQLite's write lock, so concurrent read-modify-writes from several
+        processes cannot overwrite each other. Returns whether it was written.
+        """
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT value FROM cache WHERE key = ? AND expires_at > ?", (key, time.time())
+                ).fetchone()
+                current = json.loads(row[0]).get("version") if row else None
+                if current != version:
+                    conn.execute("ROLLBACK")
+                    return False
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), time.time() + self.ttl_seconds),
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return True
+
+    def _prune(self):
+        # Drop expired rows, then the entries closest to expiry beyond max_entries
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+        conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class ResultCache:
+    """In-process LRU cache with a TTL and hit/miss counters.
+
+    Lookups that miss locally fall through to the optional shared backend,
+    and its hits are copied into the local LRU until they expire there. In
+    async code, use ``aget`` and ``aset``, which query the backend off the
+    event loop.
+    """
+
+    def __init__(self, max_entries: int = 2048, ttl_seconds: float = 3600, backend: Optional[SqliteCacheBackend] = None):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.shared_hits = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        found, value = self._get_local(key)
+        if found:
+            return value
+        return self._shared_result(key, self.backend.get_entry(key) if self.backend is not None else None)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        found, value = self._get_local(key)
+        if found:
+            return value
+        entry = await self.backend.run(self.backend.get_entry, key) if self.backend is not None else None
+        return self._shared_result(key, entry)
+
+    def set(self, key: str, value: Any):
+        self._store(key, copy.deepcopy(value))
+        if self.backend is not None:
+            self.backend.set(key, value)
+
+    async def aset(self, key: str, value: Any):
+        self._store(key, copy.deepcopy(value))
+        if self.backend is not None:
+            await self.backend.run(self.backend.set, key, value)
+
+    def _get_local(self, key: str) -> Tuple[bool, Optional[Any]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, copy.deepcopy(value)
+                del self._entries[key]
+        return False, None
+
+    def _shared_result(self, key: str, entry: Optional[Tuple[Any, float]]) -> Optional[Any]:
+        if entry is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        value, expires_at = entry
+        # Keep the shared entry's expiry, so the local copy does not outlive it
+        self._store(key, value, expires_at - time.time())
+        with self._lock:
+            self.hits += 1
+            self.shared_hits += 1
+        return copy.deepcopy(value)
+
+    def _store(self, key: str, value: Any, ttl_seconds: Optional[float] = None):
+        ttl_seconds = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "shared_backend": self.backend.path if self.backend is not None else None,
+            }
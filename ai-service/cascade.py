@@ -0,0 +1,113 @@
+import math
+import threading
+from typing import Dict, List, Optional, Tuple
+
+
+class SpeechCascade:
+    """Pick the most accurate speech model expected to finish within a latency target.
+
+    ``names`` are registry names ordered from the fastest to the most accurate
+    model. Whisper pads every clip to a full window, so a model's cost is
+    tracked per window of ``window_seconds`` rather than per second of audio.
+    For every request the expected latency of each loaded model is the wait
+    for a slot on the speech queue (the calls ahead of it times the recent
+    mean call time) plus the model's cost for the clip's windows. The most
+    accurate model within ``latency_target_seconds`` is used; when none fits,
+    the fastest one is.
+
+    Costs start from each model's warm-up call and follow the observed calls
+    as an exponential moving average. A model is only measured when it is
+    used, so when the queue is idle every ``probe_every``-th downgraded
+    request goes to the next more accurate model instead, to keep its
+    estimate current.
+    """
+
+    def __init__(
+        self,
+        registry,
+        names: List[str],
+        latency_target_seconds: float = 8.0,
+        window_seconds: float = 30.0,
+        smoothing: float = 0.2,
+        probe_every: int = 20,
+    ):
+        self.registry = registry
+        self.names = list(names)
+        self.latency_target_seconds = latency_target_seconds
+        self.window_seconds = window_seconds
+        self.smoothing = smoothing
+        self.probe_every = max(1, int(probe_every))
+        self._window_costs: Dict[str, float] = {}
+        self._mean_call_seconds: Optional[float] = None
+        self._downgrades = 0
+        self._lock = threading.Lock()
+
+    def windows(self, audio_seconds: float) -> int:
+        return max(1, math.ceil(audio_seconds / self.window_seconds))
+
+    def window_cost(self, name: str) -> Optional[float]:
+        """Seconds one window takes on a model, once known."""
+        if name in self._window_costs:
+            return self._window_costs[name]
+        # The warm-up transcribes one second of silence, which is one window
+        return self.registry.specs[name].warmup_seconds
+
+    def expected_seconds(self, name: str, audio_seconds: float, queue) -> float:
+        model_seconds = (self.window_cost(name) or 0.0) * self.windows(audio_seconds)
+        backlog = max(0, queue.waiting + queue.running - queue.max_concurrency + 1)
+        mean_call_seconds = self._mean_call_seconds if self._mean_call_seconds is not None else model_seconds
+        return backlog / queue.max_concurrency * mean_call_seconds + model_seconds
+
+    def choose(self, audio_seconds: float, queue) -> Tuple[str, str, float]:
+        """The model to use for a clip: (name, reason, expected seconds).
+
+        The reason is ``target`` when the model is expected to meet the latency
+        target, ``overloaded`` when none is and the fastest one was picked,
+        ``probe`` for a measurement of a more accurate model on an idle queue,
+        and ``only_model`` when just one model is loaded.
+        """
+        loaded = [name for name in self.names if self.registry.specs[name].state == "ready"]
+        if len(loaded) <= 1:
+            # Nothing to choose from; fall back to the most accurate model, loading it if needed
+            name = loaded[0] if loaded else self.names[-1]
+            return name, "only_model", self.expected_seconds(name, audio_seconds, queue)
+
+        for index in range(len(loaded) - 1, -1, -1):
+            expected = self.expected_seconds(loaded[index], audio_seconds, queue)
+            if expected <= self.latency_target_seconds:
+                name, reason = loaded[index], "target"
+                break
+        else:
+            index = 0
+            name, reason = loaded[0], "overloaded"
+
+        if index < len(loaded) - 1 and queue.waiting + queue.running < queue.max_concurrency:
+            with self._lock:
+                self._downgrades += 1
+                probe = self._downgrades % self.probe_every == 0
+            if probe:
+                name, reason = loaded[index + 1], "probe"
+                expected = self.expected_seconds(name, audio_seconds, queue)
+        return name, reason, expected
+
+    def observe(self, name: str, audio_seconds: float, seconds: float):
+        """Record how long a model took for a clip."""
+        window_cost = seconds / self.windows(audio_seconds)
+        with self._lock:
+            previous = self._window_costs.get(name)
+            self._window_costs[name] = window_cost if previous is None else (
+                previous + self.smoothing * (window_cost - previous)
+            )
+            self._mean_call_seconds = seconds if self._mean_call_seconds is None else (
+                self._mean_call_seconds + self.smoothing * (seconds - self._mean_call_seconds)
+            )
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            name: {
+                "model": self.registry.specs[name].model_id,
+                "state": self.registry.specs[name].state,
+                "window_seconds": self.window_cost(name),
+            }
+            for name in self.names
+        }
@@ -0,0 +1,188 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Re-tokenizing a chunk's text can add a token or two at its edges, so windows are kept this much short of the limit
+WINDOW_MARGIN_TOKENS = 8
+# Characters per token assumed when cutting text before it is tokenized; real text averages well under this
+MAX_CHARS_PER_TOKEN = 8
+
+
+class DocumentChunks:
+    """The overlapping text windows one document is scored in."""
+
+    def __init__(self, tokens: int, texts: List[str], weights: List[int], sampled: bool = False):
+        self.tokens = tokens
+        self.texts = texts
+        self.weights = weights
+        self.sampled = sampled
+
+
+def window_tokens(pipe) -> int:
+    """Longest window, in tokens without the special ones, that a pipeline's model accepts."""
+    limit = pipe.tokenizer.model_max_length
+    max_positions = getattr(pipe.model.config, "max_position_embeddings", None)
+    if max_positions:
+        limit = min(limit, max_positions)
+    return max(16, limit - pipe.tokenizer.num_special_tokens_to_add() - WINDOW_MARGIN_TOKENS)
+
+
+def window_starts(n_tokens: int, window: int, overlap: int) -> List[int]:
+    """Token offsets of the overlapping windows that cover a document."""
+    if n_tokens <= window:
+        return [0]
+    last = n_tokens - window
+    return list(range(0, last, max(1, window - overlap))) + [last]
+
+
+def allocate_windows(wanted: Sequence[int], budget: int) -> List[int]:
+    """Share ``budget`` windows between documents that want ``wanted`` windows each.
+
+    Every document keeps at least one window. Documents wanting fewer than an
+    equal share get all they want, and the longest ones split the rest.
+    """
+    budget = max(budget, len(wanted))
+    if sum(wanted) <= budget:
+        return list(wanted)
+    low, high = 1, max(wanted)
+    while low < high:
+        cap = (low + high + 1) // 2
+        if sum(min(count, cap) for count in wanted) <= budget:
+            low = cap
+        else:
+            high = cap - 1
+    allowed = [min(count, low) for count in wanted]
+    # Windows left over below the next cap go to the first documents that want more
+    spare = budget - sum(allowed)
+    for index, count in enumerate(wanted):
+        if spare and count > allowed[index]:
+            allowed[index] += 1
+            spare -= 1
+    return allowed
+
+
+def chunk_documents(
+    tokenizer,
+    texts: Sequence[str],
+    window: int,
+    overlap: int,
+    max_tokens: int,
+    max_batch_tokens: Optional[int] = None,
+) -> List[DocumentChunks]:
+    """Split texts into windows of at most ``window`` tokens, overlapping by ``overlap`` tokens.
+
+    Windows are cut on token boundaries and mapped back to the original text
+    through the tokenizer's character offsets. At most ``max_tokens`` tokens
+    are scored per document and ``max_batch_tokens`` for all of them (but
+    always one window per document). Texts far longer than their budget are
+    only tokenized in evenly spread pieces of it.
+    """
+    max_windows = max(1, max_tokens // window)
+    max_chars = max_windows * window * MAX_CHARS_PER_TOKEN
+    piece_chars = window * MAX_CHARS_PER_TOKEN
+
+    # Tokenize the pieces of the long texts along with the other texts, in one call
+    inputs, pieces = [], {}
+    for index, text in enumerate(texts):
+        if len(text) > max_chars:
+            starts = np.linspace(0, len(text) - piece_chars, max_windows).astype(int)
+            pieces[index] = (len(inputs), [int(start) for start in starts])
+            inputs.extend(text[start:start + piece_chars] for start in starts)
+        else:
+            inputs.append(text)
+    # Texts are only cut into windows here, so the warning about their length is not needed
+    offsets = tokenizer(inputs, add_special_tokens=False, return_offsets_mapping=True, verbose=False)["offset_mapping"]
+
+    # Token offsets of the candidate windows of every document
+    candidates: List[List[Tuple[int, int, int]]] = []
+    n_tokens: List[int] = []
+    sampled: List[bool] = []
+    position = 0
+    for index, text in enumerate(texts):
+        if index in pieces:
+            first, starts = pieces[index]
+            windows = []
+            for piece, start in enumerate(starts):
+                piece_offsets = offsets[first + piece]
+                if not piece_offsets:
+                    continue
+                # A piece may begin inside a word; unless it starts the text, its first token is dropped
+                skip = 1 if start > 0 and len(piece_offsets) > 1 else 0
+                end = min(len(piece_offsets), skip + window)
+                windows.append((start + piece_offsets[skip][0], start + piece_offsets[end - 1][1], end - skip))
+            sampled_chars = sum(len(inputs[first + piece]) for piece in range(len(starts)))
+            sampled_tokens = sum(len(offsets[first + piece]) for piece in range(len(starts)))
+            candidates.append(windows or [(0, 0, 1)])
+            n_tokens.append(int(len(text) * sampled_tokens / max(1, sampled_chars)))
+            sampled.append(True)
+            position = first + len(starts)
+            continue
+
+        text_offsets = offsets[position]
+        position += 1
+        n_tokens.append(len(text_offsets))
+        if len(text_offsets) <= window:
+            candidates.append([(0, len(text), max(1, len(text_offsets)))])
+            sampled.append(False)
+            continue
+        starts = window_starts(len(text_offsets), window, overlap)
+        sampled.append(len(starts) > max_windows)
+        if len(starts) > max_windows:
+            # Over the budget: spread the allowed windows evenly, so the text is still read from beginning to end
+            starts = sorted(set(int(start) for start in np.linspace(0, starts[-1], max_windows).round()))
+        windows = []
+        for start in starts:
+            end = min(len(text_offsets), start + window)
+            windows.append((text_offsets[start][0], text_offsets[end - 1][1], end - start))
+        candidates.append(windows)
+
+    allowed = [len(windows) for windows in candidates]
+    if max_batch_tokens is not None:
+        allowed = allocate_windows(allowed, max_batch_tokens // window)
+
+    documents = []
+    for text, windows, count, tokens, was_sampled in zip(texts, candidates, allowed, n_tokens, sampled):
+        if count < len(windows):
+            # Over the batch's budget: keep fewer windows, still spread over the text
+            windows = spread(windows, count)
+            was_sampled = True
+        chunks = [text[start:end] for start, end, _ in windows]
+        documents.append(DocumentChunks(tokens, chunks, [weight for _, _, weight in windows], was_sampled))
+    return documents
+
+
+def spread(items: Sequence, count: int) -> List:
+    """``count`` of the items, spread evenly from the first to the last."""
+    return [items[index] for index in sorted(set(int(i) for i in np.linspace(0, len(items) - 1, count).round()))]
+
+
+def score_chunks(pipe, documents: Sequence[DocumentChunks], batch_size: int, **kwargs) -> List[List[Any]]:
+    """Run a pipeline once over the chunks of all documents and regroup the results per document.
+
+    Chunks are scored shortest first, so each model batch pads its texts to
+    similar lengths.
+    """
+    flat = [(weight, text) for document in documents for text, weight in zip(document.texts, document.weights)]
+    order = sorted(range(len(flat)), key=lambda index: flat[index][0])
+    results = pipe([flat[index][1] for index in order], batch_size=max(1, min(batch_size, len(flat))), **kwargs)
+
+    by_chunk: List[Any] = [None] * len(flat)
+    for index, result in zip(order, results):
+        by_chunk[index] = result
+
+    grouped, position = [], 0
+    for document in documents:
+        grouped.append(by_chunk[position:position + len(document.texts)])
+        position += len(document.texts)
+    return grouped
+
+
+def combine_scores(results: Sequence[Sequence[Dict]], weights: Sequence[int]) -> List[Dict]:
+    """Average the per-label scores of a document's chunks, weighted by chunk length, best label first."""
+    totals: Dict[str, float] = {}
+    for labels, weight in zip(results, weights):
+        for item in labels:
+            totals[item["label"]] = totals.get(item["label"], 0.0) + item["score"] * weight
+    total_weight = float(sum(weights))
+    combined = [{"label": label, "score": score / total_weight} for label, score in totals.items()]
+    return sorted(combined, key=lambda item: item["score"], reverse=True)
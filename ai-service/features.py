@@ -0,0 +1,178 @@
+import functools
+import time
+from typing import Dict, List, Optional, Sequence
+
+import librosa
+import numpy as np
+import scipy.fft
+
+# Fixed layout of the acoustic feature vector returned by FeatureEngine
+N_MFCC = 13
+N_CONTRAST = 7  # spectral_contrast returns n_bands + 1 rows with the default 6 bands
+FEATURE_NAMES = (
+    [f"mfcc_{i}" for i in range(N_MFCC)]
+    + ["centroid"]
+    + [f"contrast_{i}" for i in range(N_CONTRAST)]
+    + ["zcr", "rms", "tempo"]
+)
+FEATURE_SIZE = len(FEATURE_NAMES)
+
+MFCC = slice(0, N_MFCC)
+CENTROID = N_MFCC
+CONTRAST = slice(CENTROID + 1, CENTROID + 1 + N_CONTRAST)
+ZCR = CONTRAST.stop
+RMS = ZCR + 1
+TEMPO = RMS + 1
+
+
+class FeatureEngine:
+    """Acoustic feature extraction from a single shared spectrogram.
+
+    The magnitude STFT is computed once per clip; the mel spectrogram, MFCCs,
+    spectral centroid, spectral contrast and onset envelope are all derived
+    from it. RMS energy and zero-crossing rate are framed directly from the
+    waveform with running sums, which needs no FFT at all.
+    """
+
+    def __init__(
+        self, sr: int, n_fft: int = 2048, hop_length: int = 512, n_mels: int = 128, max_batch_seconds: float = 120.0
+    ):
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+        self.max_batch_samples = int(max_batch_seconds * sr)
+        self.mel_basis = librosa.filters.mel(sr=sr, n_fft=n_fft, n_mels=n_mels).astype(np.float32)
+
+    def extract(self, y: np.ndarray, timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """Extract the feature vector of one clip."""
+        return self.extract_batch([y], timings)[0]
+
+    def extract_batch(self, clips: Sequence[np.ndarray], timings: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """Extract feature vectors for several clips with batched STFTs.
+
+        Clips of similar length share one STFT (see ``length_groups``), so the
+        cost follows the total audio rather than the number of clips times the
+        longest one. Returns a (len(clips), FEATURE_SIZE) float32 array. If
+        ``timings`` is given, the seconds spent in each step are recorded in it.
+        """
+        features = np.empty((len(clips), FEATURE_SIZE), dtype=np.float32)
+        for group in self.length_groups([len(y) for y in clips]):
+            features[group] = self._extract_group([clips[i] for i in group], timings)
+        return features
+
+    def length_groups(self, lengths: Sequence[int]) -> List[List[int]]:
+        """Indices of clips to batch together, shortest clips first.
+
+        Within a group the longest clip is at most twice the shortest, and the
+        padded group holds at most ``max_batch_samples`` samples; a clip longer
+        than that is a group of its own.
+        """
+        groups: List[List[int]] = []
+        group: List[int] = []
+        for index in sorted(range(len(lengths)), key=lambda i: lengths[i]):
+            length = max(lengths[index], self.n_fft)
+            if group and (
+                length > 2 * max(lengths[group[0]], self.n_fft)
+                or length * (len(group) + 1) > self.max_batch_samples
+            ):
+                groups.append(group)
+                group = []
+            group.append(index)
+        if group:
+            groups.append(group)
+        return groups
+
+    def _extract_group(self, clips: Sequence[np.ndarray], timings: Optional[Dict[str, float]]) -> np.ndarray:
+        """One batched STFT for clips of similar length.
+
+        Clips are zero-padded to the longest one and per-clip frame masks keep
+        the padding out of every average.
+        """
+        clock = StepClock(timings)
+        lengths = np.array([len(y) for y in clips])
+        batch = np.zeros((len(clips), max(int(lengths.max()), self.n_fft)), dtype=np.float32)
+        for i, y in enumerate(clips):
+            batch[i, :len(y)] = y
+
+        # 1. One magnitude spectrogram, shared by every spectral feature
+        S = np.abs(librosa.stft(batch, n_fft=self.n_fft, hop_length=self.hop_length))
+        n_frames = S.shape[-1]
+        valid_frames = np.minimum(1 + lengths // self.hop_length, n_frames)
+        mask = (np.arange(n_frames)[None, :] < valid_frames[:, None]).astype(np.float32)
+        clock.step("stft")
+
+        # 2. Log-mel spectrogram (80 dB floor per clip, as librosa.power_to_db)
+        mel = np.einsum("mf,bft->bmt", self.mel_basis, S ** 2)
+        log_mel = 10.0 * np.log10(np.maximum(mel, 1e-10))
+        log_mel = np.maximum(log_mel, log_mel.max(axis=(1, 2), keepdims=True) - 80.0)
+        clock.step("mel")
+
+        # 3. MFCCs are the DCT of the log-mel spectrogram
+        mfcc = scipy.fft.dct(log_mel, axis=-2, type=2, norm="ortho")[:, :N_MFCC]
+        clock.step("mfcc")
+
+        # 4. Spectral centroid and contrast from the same magnitudes
+        centroid = librosa.feature.spectral_centroid(S=S, sr=self.sr, n_fft=self.n_fft)
+        contrast = librosa.feature.spectral_contrast(S=S, sr=self.sr, n_fft=self.n_fft)
+        clock.step("spectral")
+
+        # 5. Onset envelope from the log-mel spectrogram, tempo per clip
+        onset_env = librosa.onset.onset_strength(S=log_mel, sr=self.sr, hop_length=self.hop_length)
+
+        features = np.empty((len(clips), FEATURE_SIZE), dtype=np.float32)
+        features[:, MFCC] = masked_mean(mfcc, mask)
+        features[:, CENTROID] = masked_mean(centroid, mask)[:, 0]
+        features[:, CONTRAST] = masked_mean(contrast, mask)
+        for i in range(len(clips)):
+            env = onset_env[i, :valid_frames[i]]
+            features[i, TEMPO] = librosa.feature.tempo(onset_envelope=env, sr=self.sr, hop_length=self.hop_length)[0]
+        clock.step("tempo")
+
+        for i, y in enumerate(clips):
+            features[i, ZCR], features[i, RMS] = self._frame_zcr_rms(y)
+        clock.step("zcr_rms")
+        return features
+
+    def _frame_zcr_rms(self, y: np.ndarray):
+        """Mean zero-crossing rate and RMS energy over centered frames."""
+        half = self.n_fft // 2
+        padded = np.pad(y.astype(np.float64), half)
+        starts = np.arange(0, len(y) + 1, self.hop_length)
+
+        energy = np.concatenate(([0.0], np.cumsum(padded ** 2)))
+        rms = np.sqrt(np.maximum(energy[starts + self.n_fft] - energy[starts], 0.0) / self.n_fft)
+
+        signs = np.signbit(np.where(np.abs(padded) <= 1e-10, 0.0, padded))
+        crossings = np.concatenate(([0, 0], np.cumsum(signs[1:] != signs[:-1])))
+        zcr = (crossings[starts + self.n_fft] - crossings[starts + 1]) / self.n_fft
+
+        return float(zcr.mean()), float(rms.mean())
+
+
+class StepClock:
+    """Records the seconds since the previous step into a timings dict, if one is given."""
+
+    def __init__(self, timings: Optional[Dict[str, float]]):
+        self.timings = timings
+        self.last = time.perf_counter()
+
+    def step(self, name: str):
+        if self.timings is not None:
+            now = time.perf_counter()
+            self.timings[name] = self.timings.get(name, 0.0) + now - self.last
+            self.last = now
+
+
+def masked_mean(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Average (batch, rows, frames) values over the frames where mask is set."""
+    return (values * mask[:, None, :]).sum(axis=-1) / mask.sum(axis=-1, keepdims=True)
+
+
+@functools.lru_cache(maxsize=None)
+def get_feature_engine(sr: int) -> FeatureEngine:
+    """Shared engine per sample rate, so mel filters are only built once."""
+    return FeatureEngine(sr)
+
+
+def extract_features_batch(clips: List[np.ndarray], sr: int) -> np.ndarray:
+    return get_feature_engine(sr).extract_batch(clips)
@@ -0,0 +1,46 @@
+"""Gunicorn configuration for multi-worker serving with shared model weights.
+
+    gunicorn main:app -c gunicorn.conf.py
+
+The app and its models are loaded once in the master process, then the
+workers are forked from it. Model weights are never written after loading, so
+every worker shares the master's copy of them (copy-on-write) instead of
+loading its own, and adding a worker costs only its unique memory.
+Use scripts/memory_report.py to see how much that is.
+"""
+import os
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+pidfile = os.getenv("PIDFILE")
+
+# Torch threads per worker; by default the CPUs are divided between the workers
+torch_threads = int(os.getenv("TORCH_THREADS_PER_WORKER", "0")) or max(1, (os.cpu_count() or 1) // workers)
+
+# Counters and histograms of every worker are aggregated through files in this directory.
+# It must be set before main.py (and prometheus_client) is imported.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="ai-service-metrics-"))
+
+
+def when_ready(server):
+    # Runs in the master after main.py is imported and before any worker is forked
+    from main import MODEL_LOAD_WORKERS, model_registry
+    from serving import preload_models
+
+    preload_models(model_registry, MODEL_LOAD_WORKERS)
+
+
+def post_fork(server, worker):
+    from serving import init_worker
+
+    init_worker(torch_threads)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,119 @@
+import asyncio
+import contextlib
+import functools
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when a model queue cannot accept more work."""
+
+    def __init__(self, queue_name: str, depth: int):
+        super().__init__(f"The {queue_name} model is busy ({depth} requests queued), please retry shortly")
+        self.queue_name = queue_name
+        self.depth = depth
+
+
+class InferenceQueue:
+    """Bounded queue in front of one model.
+
+    At most ``max_concurrency`` calls run at once in the executor; up to
+    ``max_queue`` more may wait for a slot. Anything beyond that is rejected
+    straight away with QueueFullError so latency cannot pile up without limit.
+    """
+
+    def __init__(self, name: str, executor, max_concurrency: int = 1, max_queue: int = 8):
+        self.name = name
+        self.executor = executor
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.max_queue = max(0, int(max_queue))
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._waits = deque(maxlen=256)
+
+    def is_full(self) -> bool:
+        return self.waiting + self.running >= self.max_concurrency + self.max_queue
+
+    def check_capacity(self):
+        """Raise QueueFullError if a new call would be rejected."""
+        if self.is_full():
+            self.rejected += 1
+            raise QueueFullError(self.name, self.waiting)
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        """Hold one of the queue's slots, waiting for it if needed.
+
+        For work that spans several calls, such as receiving an upload.
+        """
+        self.check_capacity()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self._waits.append(time.perf_counter() - queued_at)
+
+        self.running += 1
+        try:
+            yield
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._semaphore.release()
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` in the executor once a slot is free."""
+        async with self.slot():
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, Any]:
+        waits = sorted(self._waits)
+        return {
+            "waiting": self.waiting,
+            "running": self.running,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "wait_ms_avg": round(1000 * sum(waits) / len(waits), 2) if waits else 0.0,
+            "wait_ms_p95": round(1000 * waits[int(0.95 * (len(waits) - 1))], 2) if waits else 0.0,
+            "wait_ms_max": round(1000 * waits[-1], 2) if waits else 0.0,
+        }
+
+
+class InferenceExecutor:
+    """Thread and process pools shared by all model queues.
+
+    Models that release the GIL (torch) run on the thread pool. Pure-Python or
+    NumPy-heavy work with picklable inputs can be sent to the process pool.
+    """
+
+    def __init__(self, thread_workers: int = 4, process_workers: int = 0):
+        self.thread_pool = ThreadPoolExecutor(max_workers=max(1, thread_workers), thread_name_prefix="inference")
+        self.process_pool = ProcessPoolExecutor(max_workers=process_workers) if process_workers > 0 else None
+        self.queues: Dict[str, InferenceQueue] = {}
+
+    def add_queue(self, name: str, max_concurrency: int = 1, max_queue: int = 8, use_processes: bool = False) -> InferenceQueue:
+        executor = self.process_pool if use_processes and self.process_pool is not None else self.thread_pool
+        queue = InferenceQueue(name, executor, max_concurrency, max_queue)
+        self.queues[name] = queue
+        return queue
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: queue.stats() for name, queue in self.queues.items()}
+
+    def shutdown(self):
+        self.thread_pool.shutdown(wait=False)
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False)
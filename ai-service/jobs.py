@@ -0,0 +1,291 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from inference import QueueFullError
+from metrics import JOB_WAIT_SECONDS, JOBS_FINISHED
+
+logger = logging.getLogger(__name__)
+
+QUEUED, RUNNING, COMPLETED, FAILED, EXPIRED = "queued", "running", "completed", "failed", "expired"
+FINISHED = (COMPLETED, FAILED, EXPIRED)
+
+
+class JobQueueFullError(QueueFullError):
+    """Raised when the job queue cannot accept more jobs."""
+
+    def __init__(self, depth: int, audio_seconds: Optional[float] = None):
+        super().__init__("jobs", depth)
+        waiting = f"{depth} jobs waiting" if audio_seconds is None else f"{audio_seconds:.0f} s of audio waiting"
+        self.args = (f"The job queue is full ({waiting}), please retry shortly",)
+
+
+def iso_time(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat() if timestamp is not None else None
+
+
+class Job:
+    """One queued piece of work and, once it has run, its result."""
+
+    def __init__(self, payload: Any, audio_seconds: float):
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.audio_seconds = audio_seconds
+        self.status = QUEUED
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def update(self, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        if status == RUNNING:
+            self.started_at = time.time()
+        elif status in FINISHED:
+            self.finished_at = time.time()
+            # The input is not needed any more; only the result is retained
+            self.payload = None
+        # Wake everyone waiting for a change, then start a new wait
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    @property
+    def changed(self) -> asyncio.Event:
+        """Event set by the next change; take it before reading the state to miss no change."""
+        return self._changed
+
+    async def wait_for_change(self, timeout: float, changed: Optional[asyncio.Event] = None) -> bool:
+        """Wait until the job changes (after ``changed`` was taken, if given); False if ``timeout`` passed first."""
+        try:
+            await asyncio.wait_for((changed or self._changed).wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self) -> Dict:
+        state = {
+            "id": self.id,
+            "status": self.status,
+            "audio_seconds": round(self.audio_seconds, 2),
+            "created_at": iso_time(self.created_at),
+            "started_at": iso_time(self.started_at),
+            "finished_at": iso_time(self.finished_at),
+        }
+        if self.result is not None:
+            state["result"] = self.result
+        if self.error is not None:
+            state["error"] = self.error
+        return state
+
+
+class JobManager:
+    """Background jobs run by a local pool of asyncio workers.
+
+    Jobs are ordered by submission time plus their audio length times
+    ``length_weight``, so short clips run first while a long clip still moves
+    up as it waits. That delay is capped at half of ``queue_timeout_seconds``,
+    so a long clip is never starved into expiring. At most ``max_queued`` jobs,
+    with at most ``max_queued_seconds`` of audio between them (their decoded
+    waveforms are held in memory), wait at once; a job that has not started within ``queue_timeout_seconds``
+    expires without running, which is noticed both by the workers and by
+    lookups. Finished jobs are kept for ``retention_seconds`` (and at
+    most ``max_retained`` of them). With a ``store`` (SqliteCacheBackend), each
+    state change is also written there, in order and on the store's own
+    thread, so every worker on the host can report on any job.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[Dict]],
+        workers: int = 2,
+        max_queued: int = 32,
+        max_queued_seconds: float = 3600.0,
+        queue_timeout_seconds: float = 300.0,
+        retention_seconds: float = 3600.0,
+        max_retained: int = 1000,
+        length_weight: float = 1.0,
+        store=None,
+        retry_delay_seconds: float = 1.0,
+    ):
+        self.handler = handler
+        self.workers = max(1, int(workers))
+        self.max_queued = max(1, int(max_queued))
+        self.max_queued_seconds = max_queued_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retention_seconds = retention_seconds
+        self.max_retained = max(1, int(max_retained))
+        self.length_weight = length_weight
+        self.store = store
+        self.retry_delay_seconds = retry_delay_seconds
+        self.rejected = 0
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._heap: List[Tuple[float, int, Job]] = []
+        self._sequence = itertools.count()
+        self._available: Optional[asyncio.Semaphore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._writes: Set[asyncio.Future] = set()
+
+    @property
+    def queued(self) -> int:
+        return len(self._heap)
+
+    @property
+    def queued_seconds(self) -> float:
+        return sum(job.audio_seconds for _, _, job in self._heap)
+
+    @property
+    def running(self) -> int:
+        return sum(1 for job in self._jobs.values() if job.status == RUNNING)
+
+    def submit(self, payload: Any, audio_seconds: float) -> Job:
+        """Queue a job; raises JobQueueFullError when the queue is full."""
+        self.start()
+        self._prune()
+        if len(self._heap) >= self.max_queued:
+            self.rejected += 1
+            raise JobQueueFullError(len(self._heap))
+        queued_seconds = self.queued_seconds
+        if self._heap and queued_seconds + audio_seconds > self.max_queued_seconds:
+            self.rejected += 1
+            raise JobQueueFullError(len(self._heap), queued_seconds)
+
+        job = Job(payload, audio_seconds)
+        self._jobs[job.id] = job
+        delay = min(audio_seconds * self.length_weight, self.queue_timeout_seconds / 2)
+        heapq.heappush(self._heap, (time.monotonic() + delay, next(self._sequence), job))
+        self._available.release()
+        self._save(job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """A job accepted by this process."""
+        self._prune()
+        return self._jobs.get(job_id)
+
+    async def lookup(self, job_id: str) -> Optional[Dict]:
+        """State of a job accepted by this or, with a store, any other process."""
+        job = self.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        return await self.store.run(self.store.get, self._key(job_id)) if self.store is not None else None
+
+    def start(self):
+        """Start the workers; called on startup and, if that was missed, on the first job."""
+        if self._tasks:
+            return
+        self._available = asyncio.Semaphore(0)
+        self._tasks = [asyncio.ensure_future(self._work()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        # Let the last state changes reach the store
+        await asyncio.gather(*self._writes, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self.queued,
+            "queued_seconds": round(self.queued_seconds, 2),
+            "running": self.running,
+            "retained": len(self._jobs),
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "max_queued_seconds": self.max_queued_seconds,
+            "rejected": self.rejected,
+        }
+
+    async def _work(self):
+        while True:
+            await self._available.acquire()
+            if not self._heap:
+                # The job was expired by a lookup while it waited
+                continue
+            _, _, job = heapq.heappop(self._heap)
+            waited = time.time() - job.created_at
+            if waited > self.queue_timeout_seconds:
+                self._finish(job, EXPIRED, error=f"Job was not started within {self.queue_timeout_seconds:g} s")
+                continue
+
+            JOB_WAIT_SECONDS.observe(waited)
+            job.update(RUNNING)
+            self._save(job)
+            try:
+                result = await self._run(job)
+            except asyncio.CancelledError:
+                self._finish(job, FAILED, error="The service shut down before the job finished")
+                raise
+            except Exception as e:
+                logger.exception("Job %s failed", job.id)
+                self._finish(job, FAILED, error=str(e))
+            else:
+                self._finish(job, COMPLETED, result=result)
+
+    async def _run(self, job: Job) -> Dict:
+        # A saturated model only delays a job; it is retried until the job would expire
+        while True:
+            try:
+                return await self.handler(job.payload)
+            except QueueFullError:
+                if time.time() - job.created_at > self.queue_timeout_seconds:
+                    raise
+                await asyncio.sleep(self.retry_delay_seconds)
+
+    def _finish(self, job: Job, status: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        job.update(status, result=result, error=error)
+        JOBS_FINISHED.labels(status).inc()
+        self._save(job)
+        # Keep finished jobs in completion order so pruning drops the oldest first
+        self._jobs.move_to_end(job.id)
+
+    def _expire(self):
+        """Expire queued jobs that have waited too long, without waiting for a worker to reach them."""
+        cutoff = time.time() - self.queue_timeout_seconds
+        expired = [entry for entry in self._heap if entry[2].created_at < cutoff]
+        if not expired:
+            return
+        self._heap = [entry for entry in self._heap if entry[2].created_at >= cutoff]
+        heapq.heapify(self._heap)
+        for _, _, job in expired:
+            self._finish(job, EXPIRED, error=f"Job was not started within {self.queue_timeout_seconds:g} s")
+
+    def _prune(self):
+        self._expire()
+        cutoff = time.time() - self.retention_seconds
+        finished = [job for job in self._jobs.values() if job.finished]
+        excess = len(finished) - self.max_retained
+        for index, job in enumerate(finished):
+            if index < excess or job.finished_at < cutoff:
+                del self._jobs[job.id]
+
+    def _save(self, job: Job):
+        # The state is taken now; the store's single thread writes the changes in order
+        if self.store is not None:
+            write = asyncio.ensure_future(self._write(job.id, job.to_dict()))
+            self._writes.add(write)
+            write.add_done_callback(self._writes.discard)
+
+    async def _write(self, job_id: str, state: Dict):
+        try:
+            await self.store.run(self.store.set, self._key(job_id), state)
+        except Exception:
+            logger.exception("Could not store the state of job %s", job_id)
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"job:{job_id}"
@@ -1,23 +1,174 @@
-
 import os
-import tempfile
 import json
+import math
+import time
+import asyncio
+import logging
+import threading
 import torch
 import numpy as np
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Request
+from fastapi import FastAPI, Form, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydub import AudioSegment
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import librosa
 import soundfile as sf
 from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
 from typing import List, Dict, Any, Optional
 import requests
 from dotenv import load_dotenv
+from prometheus_client import CONTENT_TYPE_LATEST
+
+from audio import TARGET_SAMPLE_RATE, AudioDecodeError, AudioTooLargeError, IncrementalDecoder
+from batching import MicroBatcher
+from bulk import BodyTooLargeError, BulkItemError, load_bulk_items, spool_request_body
+from cascade import SpeechCascade
+from chunking import chunk_documents, combine_scores, score_chunks, window_tokens
+from cache import ResultCache, SqliteCacheBackend, audio_cache_key, normalize_text, text_cache_key
+from features import CENTROID, RMS, TEMPO, ZCR, get_feature_engine
+from inference import InferenceExecutor, QueueFullError
+from jobs import FINISHED, JobManager
+from metrics import (
+    AUDIO_SECONDS, AUDIO_TRIMMED_FRACTION, INPUT_TOKENS, REQUEST_SECONDS, SPEECH_MODEL_SELECTED,
+    SPEECH_TRANSCRIPTION_SECONDS, TEXT_CHUNKS, TEXT_TOKEN_BUDGET_EXCEEDED, VOICE_CACHE_LOOKUPS,
+    InferenceQueueCollector, ProcessMemoryCollector, SpeechCascadeCollector,
+    current_timings, record_stage, register_collector, render_metrics, request_timings, server_timing_header, span,
+)
+from models import ModelNotAvailableError, ModelRegistry
+from mood import build_text_analysis
+from profiler import SamplingProfiler
+from recommendations import RecentHistory, RecommendationEngine
+from serving import process_memory
+from streaming import StreamingSession, stream_control_type
+from summary import SummaryAggregates, summary_text
+from upload import upload_chunks
+from vad import detect_voice_activity
+from voice_model import MOOD_SCORES, VoiceMoodClassifier
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Model loading: a pinned local snapshot directory (no hub access), and eager or lazy loading per model
+MODEL_SNAPSHOT_DIR = os.getenv("MODEL_SNAPSHOT_DIR")
+MODEL_LOAD_MODE = os.getenv("MODEL_LOAD_MODE", "eager")
+SENTIMENT_LOAD_MODE = os.getenv("SENTIMENT_LOAD_MODE", MODEL_LOAD_MODE)
+EMOTION_LOAD_MODE = os.getenv("EMOTION_LOAD_MODE", MODEL_LOAD_MODE)
+SPEECH_LOAD_MODE = os.getenv("SPEECH_LOAD_MODE", MODEL_LOAD_MODE)
+MODEL_LOAD_WORKERS = int(os.getenv("MODEL_LOAD_WORKERS", "3"))
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "true").lower() == "true"
+
+# Inference precision per model: fp32, bf16 (on CPUs with native support) or int8
+SENTIMENT_PRECISION = os.getenv("SENTIMENT_PRECISION", "fp32")
+EMOTION_PRECISION = os.getenv("EMOTION_PRECISION", "fp32")
+SPEECH_PRECISION = os.getenv("SPEECH_PRECISION", "fp32")
+
+# Speech model cascade: Whisper sizes from fastest to most accurate, all loaded from MODEL_SNAPSHOT_DIR when set.
+# Each transcription uses the most accurate one expected to finish within SPEECH_LATENCY_TARGET_MS at the current load.
+SPEECH_MODELS = os.getenv("SPEECH_MODELS", "openai/whisper-small")
+SPEECH_LATENCY_TARGET_MS = float(os.getenv("SPEECH_LATENCY_TARGET_MS", "8000"))
+
+# Text micro-batching: a batch is run once it holds TEXT_BATCH_MAX_SIZE texts
+# or its oldest text has waited TEXT_BATCH_MAX_WAIT_MS milliseconds
+TEXT_BATCH_MAX_SIZE = int(os.getenv("TEXT_BATCH_MAX_SIZE", "16"))
+TEXT_BATCH_MAX_WAIT_MS = float(os.getenv("TEXT_BATCH_MAX_WAIT_MS", "5"))
+
+# Texts longer than a model's input limit are scored in overlapping windows; at most TEXT_MAX_TOKENS tokens of
+# each text and TEXT_MAX_BATCH_TOKENS of a whole batch are scored, and the windows of all texts in a batch run
+# through the models TEXT_CHUNK_BATCH_SIZE at a time
+TEXT_CHUNK_OVERLAP_TOKENS = int(os.getenv("TEXT_CHUNK_OVERLAP_TOKENS", "64"))
+TEXT_MAX_TOKENS = int(os.getenv("TEXT_MAX_TOKENS", "4096"))
+TEXT_MAX_BATCH_TOKENS = int(os.getenv("TEXT_MAX_BATCH_TOKENS", "16384"))
+TEXT_CHUNK_BATCH_SIZE = int(os.getenv("TEXT_CHUNK_BATCH_SIZE", "32"))
+
+# Acoustic-only analysis (/analyze-voice?mode=fast): a classifier trained with scripts/train_voice_model.py,
+# or the rule-based analysis when VOICE_MODEL_PATH is unset; concurrent clips are scored in batches
+VOICE_MODEL_PATH = os.getenv("VOICE_MODEL_PATH")
+FAST_BATCH_MAX_SIZE = int(os.getenv("FAST_BATCH_MAX_SIZE", "16"))
+FAST_BATCH_MAX_WAIT_MS = float(os.getenv("FAST_BATCH_MAX_WAIT_MS", "5"))
+
+# Inference executor: blocking model calls run in these pools, never on the event loop
+INFERENCE_THREAD_WORKERS = int(os.getenv("INFERENCE_THREAD_WORKERS", "4"))
+INFERENCE_PROCESS_WORKERS = int(os.getenv("INFERENCE_PROCESS_WORKERS", "0"))
+
+# Per-model limits: calls running at once, and calls allowed to wait for a slot
+SPEECH_MAX_CONCURRENCY = int(os.getenv("SPEECH_MAX_CONCURRENCY", "1"))
+SPEECH_MAX_QUEUE = int(os.getenv("SPEECH_MAX_QUEUE", "8"))
+TEXT_MAX_CONCURRENCY = int(os.getenv("TEXT_MAX_CONCURRENCY", "2"))
+TEXT_MAX_QUEUE = int(os.getenv("TEXT_MAX_QUEUE", "32"))
+FEATURES_MAX_CONCURRENCY = int(os.getenv("FEATURES_MAX_CONCURRENCY", "2"))
+FEATURES_MAX_QUEUE = int(os.getenv("FEATURES_MAX_QUEUE", "16"))
+
+# Texts per model batch on /analyze-text/batch, the largest body it accepts, and how long a batch
+# waits for room in a saturated text queue before its texts are reported as failed
+TEXT_BULK_BATCH_SIZE = int(os.getenv("TEXT_BULK_BATCH_SIZE", "32"))
+TEXT_BULK_MAX_BYTES = int(os.getenv("TEXT_BULK_MAX_BYTES", str(100 * 1024 * 1024)))
+TEXT_BULK_RETRY_SECONDS = float(os.getenv("TEXT_BULK_RETRY_SECONDS", "60"))
+
+# Long recordings are transcribed in overlapping windows, batched through Whisper
+SPEECH_CHUNK_LENGTH_S = float(os.getenv("SPEECH_CHUNK_LENGTH_S", "30"))
+SPEECH_STRIDE_LENGTH_S = float(os.getenv("SPEECH_STRIDE_LENGTH_S", "5"))
+SPEECH_BATCH_SIZE = int(os.getenv("SPEECH_BATCH_SIZE", "4"))
+
+# Streaming voice sessions (/analyze-voice/stream)
+STREAM_PARTIAL_INTERVAL_S = float(os.getenv("STREAM_PARTIAL_INTERVAL_S", "2"))
+STREAM_WINDOW_S = float(os.getenv("STREAM_WINDOW_S", "20"))
+STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", "600"))
+
+# Uploads are decoded while they arrive; larger or longer recordings are rejected with 413
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(25 * 1024 * 1024)))
+UPLOAD_MAX_SECONDS = float(os.getenv("UPLOAD_MAX_SECONDS", "600"))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "8"))
+UPLOAD_MAX_QUEUE = int(os.getenv("UPLOAD_MAX_QUEUE", "32"))
+
+# Background voice analysis jobs (/jobs); set JOBS_SHARED_PATH so any worker on the host can report on any job
+JOBS_WORKERS = int(os.getenv("JOBS_WORKERS", "2"))
+JOBS_MAX_QUEUE = int(os.getenv("JOBS_MAX_QUEUE", "32"))
+JOBS_MAX_QUEUED_SECONDS = float(os.getenv("JOBS_MAX_QUEUED_SECONDS", "3600"))
+JOBS_QUEUE_TIMEOUT_SECONDS = float(os.getenv("JOBS_QUEUE_TIMEOUT_SECONDS", "300"))
+JOBS_RETENTION_SECONDS = float(os.getenv("JOBS_RETENTION_SECONDS", "3600"))
+JOBS_MAX_RETAINED = int(os.getenv("JOBS_MAX_RETAINED", "1000"))
+JOBS_LENGTH_WEIGHT = float(os.getenv("JOBS_LENGTH_WEIGHT", "1"))
+JOBS_SHARED_PATH = os.getenv("JOBS_SHARED_PATH")
+
+# Voice activity trimming: only the speech segments of a recording reach Whisper and feature extraction
+VAD_ENABLED = os.getenv("VAD_ENABLED", "true").lower() == "true"
+VAD_FLOOR_DB = float(os.getenv("VAD_FLOOR_DB", "-50"))
+VAD_MIN_SILENCE_MS = float(os.getenv("VAD_MIN_SILENCE_MS", "300"))
+VAD_PAD_MS = float(os.getenv("VAD_PAD_MS", "150"))
+
+# Text analysis result cache; set ANALYSIS_CACHE_SHARED_PATH to share hits across workers
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "2048"))
+ANALYSIS_CACHE_TTL_SECONDS = float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+ANALYSIS_CACHE_SHARED_PATH = os.getenv("ANALYSIS_CACHE_SHARED_PATH")
+
+# Transcripts, acoustic features and voice analyses keyed by a hash of the decoded audio, so retried uploads skip
+# the models; set VOICE_CACHE_PATH to keep them on disk, shared by all workers on the host
+VOICE_CACHE_SIZE = int(os.getenv("VOICE_CACHE_SIZE", "512"))
+VOICE_CACHE_TTL_SECONDS = float(os.getenv("VOICE_CACHE_TTL_SECONDS", "3600"))
+VOICE_CACHE_PATH = os.getenv("VOICE_CACHE_PATH")
+
+# Recommendation catalog file, reloaded when it changes; the last RECOMMENDATIONS_HISTORY_SIZE items
+# recommended to each user (for up to RECOMMENDATIONS_HISTORY_USERS users per worker) are not repeated
+RECOMMENDATIONS_PATH = os.getenv(
+    "RECOMMENDATIONS_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "recommendations.json")
+)
+RECOMMENDATIONS_RELOAD_SECONDS = float(os.getenv("RECOMMENDATIONS_RELOAD_SECONDS", "5"))
+RECOMMENDATIONS_HISTORY_SIZE = int(os.getenv("RECOMMENDATIONS_HISTORY_SIZE", "20"))
+RECOMMENDATIONS_HISTORY_USERS = int(os.getenv("RECOMMENDATIONS_HISTORY_USERS", "10000"))
+
+# Per-user aggregates kept for incremental /generate-summary calls; they are per process unless
+# SUMMARY_CACHE_SHARED_PATH is set, so with several workers set it or most incremental calls miss
+SUMMARY_CACHE_USERS = int(os.getenv("SUMMARY_CACHE_USERS", "10000"))
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "604800"))
+SUMMARY_CACHE_SHARED_PATH = os.getenv("SUMMARY_CACHE_SHARED_PATH")
+
+# Observability: per-request Server-Timing header, and the runtime sampling profiler endpoints
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "false").lower() == "true"
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "false").lower() == "true"
+
 app = FastAPI(title="Mental Health Mirror AI Service")
 
 # Add CORS middleware
@@ -29,199 +180,131 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize sentiment analysis pipeline
+# Models are loaded at startup (eager) or on first use (lazy), from MODEL_SNAPSHOT_DIR when set
+model_registry = ModelRegistry(snapshot_dir=MODEL_SNAPSHOT_DIR, warmup=MODEL_WARMUP)
+
+# Sentiment analysis pipeline
 sentiment_model = "distilbert-base-uncased-finetuned-sst-2-english"
-sentiment_pipeline = pipeline("sentiment-analysis", model=sentiment_model)
+model_registry.register(
+    "sentiment", "sentiment-analysis", sentiment_model,
+    precision=SENTIMENT_PRECISION, load_mode=SENTIMENT_LOAD_MODE, warmup_input=["I feel fine today."],
+)
 
-# Initialize emotion detection pipeline
+# Emotion detection pipeline
 emotion_model = "j-hartmann/emotion-english-distilroberta-base"
-emotion_pipeline = pipeline("text-classification", model=emotion_model, top_k=3)
-
-# Initialize speech recognition pipeline
-speech_model = "openai/whisper-small"
-speech_pipeline = pipeline("automatic-speech-recognition", model=speech_model)
-
-# Load recommendation data
-RECOMMENDATION_DATA = {
-    "happy": {
-        "music": [
-            {"title": "Happy Upbeat Playlist", "description": "Energetic songs to match your positive mood", "link": "https://open.spotify.com/playlist/37i9dQZF1DX3rxVfibe1L0"},
-            {"title": "Feel-Good Classics", "description": "Timeless songs that will keep your good mood going", "link": "https://open.spotify.com/playlist/37i9dQZF1DX9XIFQuFvzM4"}
-        ],
-        "video": [
-            {"title": "Funny Animal Compilations", "description": "Cute and funny animal videos to keep you smiling", "link": "https://www.youtube.com/results?search_query=funny+animal+compilation"},
-            {"title": "Comedy Specials", "description": "Laugh out loud with these stand-up comedy shows", "link": "https://www.youtube.com/results?search_query=best+comedy+specials"}
-        ],
-        "activity": [
-            {"title": "Creative Expression", "description": "Channel your positive energy into a creative project like painting or crafting"},
-            {"title": "Social Connection", "description": "Share your good mood with friends or family - plan a get-together"}
-        ],
-        "journal": [
-            {"title": "Gratitude Reflection", "description": "Write down three things you're grateful for today"},
-            {"title": "Positive Moments", "description": "Document what made you happy today so you can revisit these moments later"}
-        ]
-    },
-    "sad": {
-        "music": [
-            {"title": "Calm & Comforting Playlist", "description": "Soothing music to help process your emotions", "link": "https://open.spotify.com/playlist/37i9dQZF1DX3Ogo9pFvBkY"},
-            {"title": "Uplifting Melodies", "description": "Gently uplifting songs to improve your mood", "link": "https://open.spotify.com/playlist/37i9dQZF1DX9tPFwDMOaN1"}
-        ],
-        "video": [
-            {"title": "Heartwarming Stories", "description": "Videos that restore faith in humanity", "link": "https://www.youtube.com/results?search_query=heartwarming+stories+that+restore+faith+in+humanity"},
-            {"title": "Relaxing Nature Documentaries", "description": "Immerse yourself in the beauty of nature", "link": "https://www.youtube.com/results?search_query=beautiful+nature+documentary"}
-        ],
-        "activity": [
-            {"title": "Gentle Movement", "description": "A short, gentle walk outdoors to get fresh air and shift your perspective"},
-            {"title": "Self-Care Ritual", "description": "Take a warm bath or shower, make some tea, and wrap yourself in a cozy blanket"}
-        ],
-        "journal": [
-            {"title": "Emotional Release", "description": "Write freely about what you're feeling without judgment"},
-            {"title": "Self-Compassion Letter", "description": "Write to yourself with the same kindness you'd offer a good friend"}
-        ]
-    },
-    "anxious": {
-        "music": [
-            {"title": "Calm Meditation Music", "description": "Peaceful sounds to help reduce anxiety", "link": "https://open.spotify.com/playlist/37i9dQZF1DX3Ogo9pFvBkY"},
-            {"title": "Ambient Soundscapes", "description": "Ambient music to help you focus and calm your mind", "link": "https://open.spotify.com/playlist/37i9dQZF1DX3Ogo9pFvBkY"}
-        ],
-        "video": [
-            {"title": "Guided Breathing Exercises", "description": "Follow along with these calming breathing techniques", "link": "https://www.youtube.com/results?search_query=guided+breathing+exercises+for+anxiety"},
-            {"title": "Gentle Yoga for Anxiety", "description": "Simple yoga poses to release tension", "link": "https://www.youtube.com/results?search_query=gentle+yoga+for+anxiety+relief"}
-        ],
-        "activity": [
-            {"title": "5-4-3-2-1 Grounding Exercise", "description": "Name 5 things you can see, 4 things you can touch, 3 things you can hear, 2 things you can smell, and 1 thing you can taste"},
-            {"title": "Progressive Muscle Relaxation", "description": "Tense and then release each muscle group in your body to release physical tension"}
-        ],
-        "journal": [
-            {"title": "Worry Dump", "description": "Write down all your worries to get them out of your head"},
-            {"title": "Evidence Challenging", "description": "List your anxious thoughts and then write evidence for and against them"}
-        ]
-    },
-    "angry": {
-        "music": [
-            {"title": "Calming Classical", "description": "Soothing classical pieces to help you cool down", "link": "https://open.spotify.com/playlist/37i9dQZF1DWWEJlAGA9gs0"},
-            {"title": "Release Playlist", "description": "Music to help process and release anger", "link": "https://open.spotify.com/playlist/37i9dQZF1DX3YSRoSdA634"}
-        ],
-        "video": [
-            {"title": "Guided Anger Meditation", "description": "Meditation specifically designed to help with anger", "link": "https://www.youtube.com/results?search_query=guided+meditation+for+anger"},
-            {"title": "Nature Time-lapses", "description": "Beautiful, slow-moving nature videos to shift your focus", "link": "https://www.youtube.com/results?search_query=beautiful+nature+time+lapse"}
-        ],
-        "activity": [
-            {"title": "Physical Release", "description": "Go for a run, hit a pillow, or do jumping jacks to release the physical energy of anger"},
-            {"title": "Cool Down Strategy", "description": "Place a cool washcloth on your face or neck, or hold an ice cube - the cold sensation can help reset your nervous system"}
-        ],
-        "journal": [
-            {"title": "Anger Letter (Don't Send)", "description": "Write an uncensored letter expressing your feelings, but don't send it"},
-            {"title": "Needs Identification", "description": "What need isn't being met? Write about what you really need in this situation"}
-        ]
-    },
-    "neutral": {
-        "music": [
-            {"title": "Discover Weekly", "description": "Explore new music tailored to your taste", "link": "https://open.spotify.com/playlist/37i9dQZEVXcQ9Aow7qH0GW"},
-            {"title": "Focus Playlist", "description": "Background music to help you focus on tasks", "link": "https://open.spotify.com/playlist/37i9dQZF1DX8NTLI2TtZa6"}
-        ],
-        "video": [
-            {"title": "Fascinating Documentaries", "description": "Learn something new and interesting", "link": "https://www.youtube.com/results?search_query=best+short+documentaries"},
-            {"title": "TED Talks", "description": "Inspiring talks on various topics", "link": "https://www.youtube.com/c/TED/videos"}
-        ],
-        "activity": [
-            {"title": "Skill Building", "description": "Use this neutral state to learn something new or practice a skill"},
-            {"title": "Mindful Activity", "description": "Do a routine activity (like washing dishes) but with complete focus and attention to the sensory experience"}
-        ],
-        "journal": [
-            {"title": "Goal Setting", "description": "Use this balanced state to think about your goals and what steps you can take toward them"},
-            {"title": "Reflection Questions", "description": "What's been on your mind lately? What are you looking forward to?"}
-        ]
-    },
-    "tired": {
-        "music": [
-            {"title": "Gentle Wake-Up Playlist", "description": "Soft, gradually energizing music", "link": "https://open.spotify.com/playlist/37i9dQZF1DX1n9whBbBKoL"},
-            {"title": "Low-Fi Beats", "description": "Relaxing background music that won't overstimulate", "link": "https://open.spotify.com/playlist/37i9dQZF1DWWQRwui0ExPn"}
-        ],
-        "video": [
-            {"title": "Gentle Morning Yoga", "description": "Easy stretches to wake up your body", "link": "https://www.youtube.com/results?search_query=gentle+morning+yoga"},
-            {"title": "Motivational Short Videos", "description": "Brief inspiration to get you going", "link": "https://www.youtube.com/results?search_query=short+motivational+videos"}
-        ],
-        "activity": [
-            {"title": "Nature Reset", "description": "Spend 10 minutes outside in natural light to help reset your circadian rhythm"},
-            {"title": "Micro-Exercise", "description": "Do just 5 minutes of movement - often that's enough to boost your energy"}
-        ],
-        "journal": [
-            {"title": "Energy Audit", "description": "What's draining your energy lately? What gives you energy?"},
-            {"title": "Rest Reflection", "description": "Are you getting enough quality rest? What could help improve your sleep?"}
-        ]
-    },
-    "energetic": {
-        "music": [
-            {"title": "Workout Beats", "description": "High-energy music for maximum motivation", "link": "https://open.spotify.com/playlist/37i9dQZF1DX76Wlfdnj7AP"},
-            {"title": "Dance Party Mix", "description": "Upbeat songs to match your energy", "link": "https://open.spotify.com/playlist/37i9dQZF1DX0BcQWzuB7ZO"}
-        ],
-        "video": [
-            {"title": "Dance Workouts", "description": "Fun dance routines to channel your energy", "link": "https://www.youtube.com/results?search_query=fun+dance+workout"},
-            {"title": "DIY Project Tutorials", "description": "Productive ways to use your high energy", "link": "https://www.youtube.com/results?search_query=quick+DIY+projects"}
-        ],
-        "activity": [
-            {"title": "Creative Project", "description": "Start that project you've been thinking about - your energy will help you make progress"},
-            {"title": "High Intensity Exercise", "description": "Channel your energy into a workout that will leave you feeling accomplished"}
-        ],
-        "journal": [
-            {"title": "Inspiration Capture", "description": "Write down all the ideas coming to you while your energy is high"},
-            {"title": "Achievement Planning", "description": "What could you accomplish today with this energy? Make an action plan"}
-        ]
-    }
-}
+emotion_top_k = 3
+model_registry.register(
+    "emotion", "text-classification", emotion_model,
+    precision=EMOTION_PRECISION, load_mode=EMOTION_LOAD_MODE, warmup_input=["I feel fine today."], top_k=emotion_top_k,
+)
 
-def extract_audio_features(file_path):
-    """Extract audio features from a sound file."""
-    # Load the audio file
-    y, sr = librosa.load(file_path, sr=None)
-    
-    # Extract features
-    # 1. Mel-frequency cepstral coefficients (MFCCs)
-    mfccs = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
-    mfcc_mean = np.mean(mfccs, axis=1)
-    
-    # 2. Spectral centroid
-    centroid = librosa.feature.spectral_centroid(y=y, sr=sr)
-    centroid_mean = np.mean(centroid)
-    
-    # 3. Spectral contrast
-    contrast = librosa.feature.spectral_contrast(y=y, sr=sr)
-    contrast_mean = np.mean(contrast, axis=1)
-    
-    # 4. Zero crossing rate
-    zcr = librosa.feature.zero_crossing_rate(y)
-    zcr_mean = np.mean(zcr)
-    
-    # 5. RMS energy
-    rms = librosa.feature.rms(y=y)
-    rms_mean = np.mean(rms)
-    
-    # 6. Tempo
-    onset_env = librosa.onset.onset_strength(y=y, sr=sr)
-    tempo = librosa.beat.tempo(onset_envelope=onset_env, sr=sr)
-    
-    # Create features dictionary
-    features = {
-        "mfcc_mean": mfcc_mean.tolist(),
-        "centroid_mean": float(centroid_mean),
-        "contrast_mean": contrast_mean.tolist(),
-        "zcr_mean": float(zcr_mean),
-        "rms_mean": float(rms_mean),
-        "tempo": float(tempo[0])
-    }
+# Speech recognition pipelines; the most accurate one is "speech", the faster ones "speech:<model name>"
+speech_models = [model_id.strip() for model_id in SPEECH_MODELS.split(",") if model_id.strip()]
+if not speech_models:
+    raise ValueError(f"SPEECH_MODELS must list at least one Whisper model, got {SPEECH_MODELS!r}")
+speech_model = speech_models[-1]
+# The cascade only picks among loaded models, so with several of them they are all loaded at startup
+speech_load_mode = SPEECH_LOAD_MODE if len(speech_models) == 1 else "eager"
+speech_model_names = [f"speech:{model_id.rsplit('/', 1)[-1]}" for model_id in speech_models[:-1]] + ["speech"]
+for name, model_id in zip(speech_model_names, speech_models):
+    model_registry.register(
+        name, "automatic-speech-recognition", model_id,
+        precision=SPEECH_PRECISION, load_mode=speech_load_mode,
+        warmup_input=np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32),
+    )
+speech_cascade = SpeechCascade(
+    model_registry, speech_model_names, SPEECH_LATENCY_TARGET_MS / 1000, window_seconds=SPEECH_CHUNK_LENGTH_S
+)
+
+# Bounded queues in front of each model
+inference_executor = InferenceExecutor(
+    thread_workers=INFERENCE_THREAD_WORKERS,
+    process_workers=INFERENCE_PROCESS_WORKERS,
+)
+speech_queue = inference_executor.add_queue("speech", SPEECH_MAX_CONCURRENCY, SPEECH_MAX_QUEUE)
+text_queue = inference_executor.add_queue("text", TEXT_MAX_CONCURRENCY, TEXT_MAX_QUEUE)
+features_queue = inference_executor.add_queue(
+    "features", FEATURES_MAX_CONCURRENCY, FEATURES_MAX_QUEUE, use_processes=True
+)
+upload_queue = inference_executor.add_queue("upload", UPLOAD_MAX_CONCURRENCY, UPLOAD_MAX_QUEUE)
+register_collector(InferenceQueueCollector(inference_executor))
+register_collector(ProcessMemoryCollector())
+register_collector(SpeechCascadeCollector(speech_cascade))
+
+# Sampling profiler, started and stopped through /debug/profiler when PROFILER_ENABLED is set
+profiler = SamplingProfiler()
+
+# Recommendation catalog, compiled into an index by mood, energy band and type
+recommendation_engine = RecommendationEngine(
+    RECOMMENDATIONS_PATH,
+    RecentHistory(max_users=RECOMMENDATIONS_HISTORY_USERS, per_user=RECOMMENDATIONS_HISTORY_SIZE),
+    reload_seconds=RECOMMENDATIONS_RELOAD_SECONDS,
+)
+
+def extract_audio_features(y, sr=TARGET_SAMPLE_RATE):
+    """Extract the fixed-layout acoustic feature vector from a decoded waveform."""
+    return get_feature_engine(sr).extract(y)
+
+def extract_audio_features_timed(y, sr=TARGET_SAMPLE_RATE):
+    """Extract audio features, also returning the seconds spent in each step.
     
-    return features
+    The step timings are returned instead of recorded here because this may
+    run in a worker process, whose metrics are never scraped.
+    """
+    timings = {}
+    features = get_feature_engine(sr).extract(y, timings)
+    return features, timings
+
+def transcribe_waveform(waveform, model="speech"):
+    """Transcribe a 16 kHz waveform with one of the registered speech models.
+    
+    Recordings longer than one Whisper window are split into overlapping
+    chunks that run through the model in batches, instead of being cut off.
+    """
+    speech = model_registry.get(model)
+    start = time.perf_counter()
+    with span("speech.model"):
+        if len(waveform) <= SPEECH_CHUNK_LENGTH_S * TARGET_SAMPLE_RATE:
+            transcription = speech(waveform)
+        else:
+            transcription = speech(
+                waveform,
+                chunk_length_s=SPEECH_CHUNK_LENGTH_S,
+                stride_length_s=SPEECH_STRIDE_LENGTH_S,
+                batch_size=SPEECH_BATCH_SIZE,
+            )
+    speech_cascade.observe(model, len(waveform) / TARGET_SAMPLE_RATE, time.perf_counter() - start)
+    return transcription
+
+def detect_speech(waveform):
+    """Find the speech segments of a 16 kHz waveform."""
+    return detect_voice_activity(
+        waveform, TARGET_SAMPLE_RATE,
+        floor_db=VAD_FLOOR_DB, min_silence_ms=VAD_MIN_SILENCE_MS, pad_ms=VAD_PAD_MS,
+    )
+
+def silent_voice_analysis(voice_activity):
+    """Analysis of a recording without speech; no model is run for it."""
+    return {
+        "mood": "neutral",
+        "score": 5,
+        "energy": 1,
+        "sentimentScore": 0.0,
+        "emotional_state": "neutral",
+        "detected_emotions": [],
+        "transcribed_text": "",
+        "voice_activity": voice_activity.summary()
+    }
 
 def analyze_voice_features(features):
     """Analyze voice features to determine emotional state."""
     # This is a simplified rule-based approach
     # In a real system, you would use a trained ML model
     
-    zcr = features["zcr_mean"]
-    rms = features["rms_mean"]
-    tempo = features["tempo"]
-    centroid = features["centroid_mean"]
+    zcr = features[ZCR]
+    rms = features[RMS]
+    tempo = features[TEMPO]
+    centroid = features[CENTROID]
     
     # Energy level (1-10 scale)
     energy = min(10, max(1, int(rms * 50)))
@@ -254,190 +337,695 @@ def analyze_voice_features(features):
         "mood": mood
     }
 
+def load_voice_classifier(path):
+    """Load the acoustic mood classifier, or return None to use the rule-based analysis."""
+    if not path:
+        return None
+    try:
+        return VoiceMoodClassifier.load(path)
+    except Exception:
+        logger.exception("Could not load the voice mood classifier from %s, using the rule-based analysis", path)
+        return None
+
+voice_classifier = load_voice_classifier(VOICE_MODEL_PATH)
+
+def analyze_voice_fast_batch(waveforms):
+    """Mood and energy of several waveforms from their acoustic features alone, in one batch."""
+    features = get_feature_engine(TARGET_SAMPLE_RATE).extract_batch(waveforms)
+    if voice_classifier is not None:
+        analyses = voice_classifier.predict_batch(features)
+    else:
+        analyses = [analyze_voice_features(clip_features) for clip_features in features]
+    for analysis in analyses:
+        analysis.setdefault("score", MOOD_SCORES.get(analysis["mood"], 5))
+        analysis.setdefault("emotional_state", analysis["mood"])
+        analysis["voice_model"] = "classifier" if voice_classifier is not None else "rules"
+    return analyses
+
+def chunk_texts(pipe, texts):
+    return chunk_documents(
+        pipe.tokenizer, texts, window_tokens(pipe), TEXT_CHUNK_OVERLAP_TOKENS, TEXT_MAX_TOKENS, TEXT_MAX_BATCH_TOKENS
+    )
+
+def analyze_text_sentiment_batch(texts):
+    """Analyze a batch of texts, running each pipeline once for the whole batch.
+    
+    Texts longer than a model accepts are split into overlapping windows; the
+    windows of every text in the batch are scored together, and each text's
+    label scores are averaged over its windows, weighted by their length.
+    """
+    texts = list(texts)
+    sentiment = model_registry.get("sentiment")
+    emotion = model_registry.get("emotion")
+    
+    with span("text.tokenize"):
+        sentiment_chunks = chunk_texts(sentiment, texts)
+        emotion_chunks = chunk_texts(emotion, texts)
+        for document in sentiment_chunks:
+            INPUT_TOKENS.observe(document.tokens)
+            TEXT_CHUNKS.observe(len(document.texts))
+            if document.sampled:
+                TEXT_TOKEN_BUDGET_EXCEEDED.inc()
+    with span("text.sentiment"):
+        sentiment_results = score_chunks(sentiment, sentiment_chunks, TEXT_CHUNK_BATCH_SIZE, top_k=None, truncation=True)
+    with span("text.emotion"):
+        emotion_results = score_chunks(emotion, emotion_chunks, TEXT_CHUNK_BATCH_SIZE, top_k=None, truncation=True)
+    
+    analyses = []
+    for sentiment_document, sentiment_result, emotion_document, emotion_result in zip(
+        sentiment_chunks, sentiment_results, emotion_chunks, emotion_results
+    ):
+        sentiment_scores = combine_scores(sentiment_result, sentiment_document.weights)
+        emotion_scores = combine_scores(emotion_result, emotion_document.weights)
+        analyses.append(build_text_analysis(sentiment_scores[0], emotion_scores[:emotion_top_k]))
+    return analyses
+
 def analyze_text_sentiment(text):
     """Analyze text to determine sentiment and emotions."""
-    # Get sentiment
-    sentiment_result = sentiment_pipeline(text)[0]
-    sentiment_label = sentiment_result["label"]
-    sentiment_score = sentiment_result["score"]
-    
-    # Normalize sentiment score to -1 to 1 scale
-    normalized_score = sentiment_score if sentiment_label == "POSITIVE" else -sentiment_score
-    
-    # Map to 1-10 scale for the app
-    mood_score = int((normalized_score + 1) * 5)
-    
-    # Get emotions
-    emotions_result = emotion_pipeline(text)
-    detected_emotions = [item["label"] for item in emotions_result]
-    
-    # Map sentiment to mood
-    if normalized_score > 0.6:
-        mood = "happy"
-    elif normalized_score > 0.2:
-        mood = "neutral"
-    elif normalized_score > -0.2:
-        mood = "neutral"
-    elif normalized_score > -0.6:
-        mood = "sad"
+    return analyze_text_sentiment_batch([text])[0]
+
+# Concurrent text analyses are coalesced into one pipeline call per batch
+text_batcher = MicroBatcher(
+    analyze_text_sentiment_batch,
+    max_batch_size=TEXT_BATCH_MAX_SIZE,
+    max_wait_ms=TEXT_BATCH_MAX_WAIT_MS,
+    queue=text_queue,
+)
+
+# Concurrent fast voice analyses share one batched feature extraction and classifier call
+fast_voice_batcher = MicroBatcher(
+    analyze_voice_fast_batch,
+    max_batch_size=FAST_BATCH_MAX_SIZE,
+    max_wait_ms=FAST_BATCH_MAX_WAIT_MS,
+    queue=features_queue,
+)
+
+# Analysis results keyed by a hash of the normalized text
+analysis_cache = ResultCache(
+    max_entries=ANALYSIS_CACHE_SIZE,
+    ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS,
+    backend=SqliteCacheBackend(ANALYSIS_CACHE_SHARED_PATH, ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS)
+    if ANALYSIS_CACHE_SHARED_PATH else None,
+)
+
+# Transcripts, feature vectors and analyses of recordings, keyed by a hash of the decoded audio
+voice_cache = ResultCache(
+    max_entries=VOICE_CACHE_SIZE,
+    ttl_seconds=VOICE_CACHE_TTL_SECONDS,
+    backend=SqliteCacheBackend(VOICE_CACHE_PATH, ttl_seconds=VOICE_CACHE_TTL_SECONDS) if VOICE_CACHE_PATH else None,
+)
+
+# Per-user summary aggregates, updated with only the new check-ins. The shared store is used on its own,
+# without a local LRU in front, since a worker's local copy would miss the updates made by other workers
+summary_cache = (
+    SqliteCacheBackend(SUMMARY_CACHE_SHARED_PATH, ttl_seconds=SUMMARY_CACHE_TTL_SECONDS, max_entries=SUMMARY_CACHE_USERS)
+    if SUMMARY_CACHE_SHARED_PATH
+    else ResultCache(max_entries=SUMMARY_CACHE_USERS, ttl_seconds=SUMMARY_CACHE_TTL_SECONDS)
+)
+# Attempts at merging check-ins into a user's aggregates while other workers update them too
+SUMMARY_UPDATE_ATTEMPTS = 3
+
+async def load_summary_aggregates(user_id):
+    """A user's cached aggregates and their version, or (None, None)."""
+    key = f"summary:{user_id}"
+    if isinstance(summary_cache, SqliteCacheBackend):
+        entry = await summary_cache.run(summary_cache.get, key)
     else:
-        mood = "sad"
-    
-    # Adjust mood based on detected emotions
-    if "anger" in detected_emotions:
-        mood = "angry"
-    elif "fear" in detected_emotions:
-        mood = "anxious"
-    
-    # Get energy level based on emotion intensity
-    energy_map = {
-        "joy": 8,
-        "optimism": 7,
-        "neutral": 5,
-        "sadness": 3,
-        "anger": 6,
-        "fear": 4,
-        "surprise": 7
-    }
-    
-    energy_values = [energy_map.get(emotion, 5) for emotion in detected_emotions]
-    energy_level = int(sum(energy_values) / len(energy_values)) if energy_values else 5
+        entry = summary_cache.get(key)
+    if entry is None or "aggregates" not in entry:
+        return None, None
+    return SummaryAggregates.from_dict(entry["aggregates"]), entry["version"]
+
+async def store_summary_aggregates(user_id, aggregates, version):
+    """Cache a user's aggregates if they are still at ``version``; False if another request updated them first."""
+    key = f"summary:{user_id}"
+    entry = {"version": (version or 0) + 1, "aggregates": aggregates.to_dict()}
+    if isinstance(summary_cache, SqliteCacheBackend):
+        return await summary_cache.run(summary_cache.set_if_version, key, entry, version)
+    # One process, and nothing awaited between the load and this check, so a plain check is enough
+    current = summary_cache.get(key)
+    if (current["version"] if current is not None else None) != version:
+        return False
+    summary_cache.set(key, entry)
+    return True
+
+async def analyze_text_cached(text):
+    """Analyze text, reusing the cached result for identical normalized text."""
+    key = text_cache_key(text)
+    cached = await analysis_cache.aget(key)
+    if cached is not None:
+        return cached
     
-    return {
-        "mood": mood,
-        "score": mood_score,
-        "energy": energy_level,
-        "sentimentScore": normalized_score,
-        "emotional_state": detected_emotions[0] if detected_emotions else "neutral",
-        "detected_emotions": detected_emotions
-    }
+    analysis = await text_batcher.submit(normalize_text(text))
+    await analysis_cache.aset(key, analysis)
+    return analysis
 
-def get_recommendations(mood, energy_level, detected_emotions=[]):
-    """Generate personalized recommendations based on mood and energy level."""
-    # Normalize mood to one of our categories
-    mood_categories = ["happy", "sad", "anxious", "angry", "neutral", "tired", "energetic"]
-    
-    if mood not in mood_categories:
-        # Map to the closest category
-        if mood in ["excited", "joyful"]:
-            mood = "happy"
-        elif mood in ["depressed", "melancholy"]:
-            mood = "sad"
-        elif mood in ["stressed", "worried", "fearful"]:
-            mood = "anxious"
-        elif mood in ["irritated", "frustrated"]:
-            mood = "angry"
-        elif mood in ["fatigued", "exhausted"]:
-            mood = "tired"
-        elif energy_level >= 7:
-            mood = "energetic"
-        else:
-            mood = "neutral"
+async def voice_cache_get(fingerprint, part):
+    """Look up one cached part of a recording's analysis, counting the hit or miss."""
+    if fingerprint is None:
+        return None
+    value = await voice_cache.aget(f"{fingerprint}:{part}")
+    VOICE_CACHE_LOOKUPS.labels(part, "hit" if value is not None else "miss").inc()
+    return value
+
+async def voice_cache_set(fingerprint, part, value):
+    if fingerprint is not None:
+        await voice_cache.aset(f"{fingerprint}:{part}", value)
+
+def cacheable_transcript(model_id):
+    """Whether a transcript came from the cascade's most accurate model.
     
-    # Get recommendations for the mood
-    recommendations = []
+    Only those are cached: a faster model picked under load would otherwise
+    keep being served for the whole TTL after the load has gone.
+    """
+    return model_id == model_registry.specs[speech_cascade.names[-1]].model_id
+
+def get_recommendations(mood, energy_level, detected_emotions=[], user_id=None):
+    """Generate personalized recommendations based on mood, energy level and detected emotions.
     
-    if mood in RECOMMENDATION_DATA:
-        mood_recs = RECOMMENDATION_DATA[mood]
-        
-        # Add 1 music recommendation
-        if "music" in mood_recs and mood_recs["music"]:
-            music_rec = mood_recs["music"][0]
-            recommendations.append({
-                "type": "music",
-                "title": music_rec["title"],
-                "description": music_rec["description"],
-                "link": music_rec["link"],
-                "mood": mood
-            })
-        
-        # Add 1 video recommendation
-        if "video" in mood_recs and mood_recs["video"]:
-            video_rec = mood_recs["video"][0]
-            recommendations.append({
-                "type": "video",
-                "title": video_rec["title"],
-                "description": video_rec["description"],
-                "link": video_rec["link"],
-                "mood": mood
-            })
-        
-        # Add 1 activity recommendation
-        if "activity" in mood_recs and mood_recs["activity"]:
-            activity_rec = mood_recs["activity"][0]
-            recommendations.append({
-                "type": "activity",
-                "title": activity_rec["title"],
-                "description": activity_rec["description"],
-                "mood": mood
-            })
-        
-        # Add 1 journal recommendation
-        if "journal" in mood_recs and mood_recs["journal"]:
-            journal_rec = mood_recs["journal"][0]
-            recommendations.append({
-                "type": "journal",
-                "title": journal_rec["title"],
-                "description": journal_rec["description"],
-                "mood": mood
-            })
+    With a ``user_id``, items recommended to that user recently are not repeated.
+    """
+    return recommendation_engine.recommend(mood, energy_level, detected_emotions, user_id)
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    """Reject work quickly when a model queue is saturated."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.exception_handler(ModelNotAvailableError)
+async def model_unavailable_handler(request: Request, exc: ModelNotAvailableError):
+    """Report models that failed to load as a temporary outage."""
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "5"})
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Time every request by route, and report its stage timings in a Server-Timing header if enabled."""
+    timings = {}
+    token = request_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    elapsed = time.perf_counter() - start
     
-    return recommendations
+    route = request.scope.get("route")
+    REQUEST_SECONDS.labels(
+        request.method, route.path if route is not None else "unmatched", response.status_code
+    ).observe(elapsed)
+    if SERVER_TIMING_HEADER:
+        timings["total"] = round(elapsed * 1000, 2)
+        response.headers["Server-Timing"] = server_timing_header(timings)
+    return response
+
+@app.on_event("startup")
+async def load_models():
+    """Start loading eager models in the background; /ready reports when they are done."""
+    threading.Thread(
+        target=model_registry.load_eager, args=(MODEL_LOAD_WORKERS,), name="model-load", daemon=True
+    ).start()
+
+@app.on_event("startup")
+async def start_jobs():
+    """Start the background job workers."""
+    job_manager.start()
+
+@app.on_event("shutdown")
+async def shutdown_inference():
+    """Stop the job workers and the inference pools."""
+    await job_manager.stop()
+    inference_executor.shutdown()
 
 @app.get("/")
 async def root():
     """Root endpoint to check if the service is running."""
     return {"message": "Mental Health Mirror AI Service is running"}
 
-@app.post("/analyze-voice")
-async def analyze_voice(audio: UploadFile = File(...)):
+@app.get("/ready")
+async def ready():
+    """Readiness check: 200 once every eager model is loaded and warmed up, 503 before."""
+    return JSONResponse(
+        status_code=200 if model_registry.ready() else 503,
+        content={"ready": model_registry.ready(), "models": model_registry.status()},
+    )
+
+@app.get("/inference/queues")
+async def inference_queues():
+    """Report queue depth, concurrency and wait times for each model queue."""
+    return inference_executor.stats()
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Report size and hit/miss counters of the analysis cache."""
+    return analysis_cache.stats()
+
+@app.get("/cache/voice/stats")
+async def voice_cache_stats():
+    """Report size and hit/miss counters of the voice analysis cache."""
+    return voice_cache.stats()
+
+@app.get("/recommendations/catalog")
+async def recommendation_catalog():
+    """Report the loaded recommendation catalog and the users with a recommendation history."""
+    return recommendation_engine.stats()
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: stage and request latencies, audio seconds, input tokens, model queues and process memory."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/memory")
+async def worker_memory():
+    """Report this worker's resident, proportional, unique and shared memory in bytes."""
+    return {"pid": os.getpid(), "models_preloaded": model_registry.preloaded, **process_memory()}
+
+def require_profiler():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.get("/debug/profiler")
+async def profiler_status():
+    """Report whether the sampling profiler is running and how much it has sampled."""
+    require_profiler()
+    return profiler.status()
+
+@app.post("/debug/profiler/start")
+async def start_profiler(interval_ms: float = 10.0, seconds: Optional[float] = None):
+    """Start the sampling profiler, optionally stopping it by itself after some seconds."""
+    require_profiler()
+    try:
+        profiler.start(interval_ms, seconds)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return profiler.status()
+
+@app.post("/debug/profiler/stop")
+async def stop_profiler():
+    """Stop the sampling profiler and return the sampled stacks in collapsed format."""
+    require_profiler()
+    # Joining the sampling thread can take a sampling pass, so it is kept off the event loop
+    await run_in_threadpool(profiler.stop)
+    return PlainTextResponse(profiler.collapsed())
+
+async def timed_stage(timings, stage, awaitable):
+    """Await a pipeline stage, observe its duration and record it in milliseconds."""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        record_stage(stage, time.perf_counter() - start, timings)
+
+async def receive_audio(request):
+    """Decode an uploaded recording while it is received, within the upload limits.
+    
+    The declared body size is checked before anything is read, and the upload
+    is rejected as soon as it passes the byte or duration limit.
+    """
+    content_length = request.headers.get("content-length", "")
+    # Allow some room for the multipart headers around the file
+    if content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES + 16384:
+        raise AudioTooLargeError(f"Upload exceeds the {UPLOAD_MAX_BYTES} byte limit")
+    
+    async with upload_queue.slot():
+        decoder = IncrementalDecoder(TARGET_SAMPLE_RATE, UPLOAD_MAX_BYTES, UPLOAD_MAX_SECONDS, UPLOAD_SPOOL_BYTES)
+        try:
+            async for chunk in upload_chunks(request):
+                await run_in_threadpool(decoder.feed, chunk)
+            return await run_in_threadpool(decoder.finish)
+        finally:
+            await run_in_threadpool(decoder.close)
+
+async def transcribe(waveform):
+    """Transcribe on the speech model the cascade picks for the current load.
+    
+    The transcription has the id of the model used under "model".
+    """
+    name, reason, _ = speech_cascade.choose(len(waveform) / TARGET_SAMPLE_RATE, speech_queue)
+    model_id = model_registry.specs[name].model_id
+    SPEECH_MODEL_SELECTED.labels(model_id, reason).inc()
+    start = time.perf_counter()
+    transcription = await speech_queue.run(transcribe_waveform, waveform, name)
+    SPEECH_TRANSCRIPTION_SECONDS.labels(model_id).observe(time.perf_counter() - start)
+    return {**transcription, "model": model_id}
+
+async def find_speech(waveform, timings):
+    """Run voice activity detection, or return None when it is disabled."""
+    if not VAD_ENABLED:
+        return None
+    voice_activity = await timed_stage(timings, "vad", features_queue.run(detect_speech, waveform))
+    AUDIO_TRIMMED_FRACTION.observe(voice_activity.trimmed_fraction)
+    return voice_activity
+
+async def run_fast_voice_pipeline(waveform, timings):
+    """Analyze a decoded waveform from its acoustic features alone, without a transcript."""
+    voice_activity = await find_speech(waveform, timings)
+    if voice_activity is not None:
+        if voice_activity.silent:
+            return {**silent_voice_analysis(voice_activity), "transcribed_text": None, "mode": "fast"}
+        waveform = voice_activity.speech
+    
+    voice_analysis = await timed_stage(timings, "fast_analysis", fast_voice_batcher.submit(waveform))
+    analysis = {
+        "mood": voice_analysis["mood"],
+        "score": voice_analysis["score"],
+        "energy": voice_analysis["energy"],
+        "sentimentScore": None,
+        "emotional_state": voice_analysis["emotional_state"],
+        "detected_emotions": [],
+        "transcribed_text": None,
+        "mode": "fast",
+        "voice_model": voice_analysis["voice_model"],
+    }
+    if "confidence" in voice_analysis:
+        analysis["confidence"] = voice_analysis["confidence"]
+    if voice_activity is not None:
+        analysis["voice_activity"] = voice_activity.summary()
+    return analysis
+
+async def run_voice_pipeline(waveform, timings, transcribed_text=None, fingerprint=None):
+    """Analyze a decoded waveform.
+    
+    Silence is trimmed first, so both branches only see speech, and a
+    recording without any speech returns straight away. The acoustic branch
+    (feature extraction) does not need the transcript, so it runs
+    concurrently with the transcript branch (Whisper, then text analysis).
+    Whisper is skipped when the transcript is already known. With the
+    recording's ``fingerprint``, a cached transcript or feature vector is
+    used instead of running the model; only transcripts of the most accurate
+    speech model are cached.
+    """
+    voice_activity = await find_speech(waveform, timings)
+    if voice_activity is not None:
+        if voice_activity.silent:
+            return silent_voice_analysis(voice_activity)
+        waveform = voice_activity.speech
+    
+    async def transcript_branch():
+        speech_model_used = None
+        if transcribed_text is None:
+            transcription = await voice_cache_get(fingerprint, "transcript")
+            if transcription is None:
+                transcription = await timed_stage(timings, "transcription", transcribe(waveform))
+                if cacheable_transcript(transcription["model"]):
+                    await voice_cache_set(fingerprint, "transcript", {
+                        "text": transcription["text"],
+                        "model": transcription["model"],
+                    })
+            text = transcription["text"]
+            speech_model_used = transcription["model"]
+        else:
+            text = transcribed_text
+        text_analysis = await timed_stage(timings, "text_analysis", analyze_text_cached(text))
+        return text, text_analysis, speech_model_used
+    
+    async def acoustic_branch():
+        cached_features = await voice_cache_get(fingerprint, "features")
+        if cached_features is not None:
+            return analyze_voice_features(np.asarray(cached_features, dtype=np.float32))
+        audio_features, feature_timings = await timed_stage(
+            timings, "feature_extraction",
+            features_queue.run(extract_audio_features_timed, waveform, TARGET_SAMPLE_RATE),
+        )
+        for step, seconds in feature_timings.items():
+            record_stage(f"features.{step}", seconds, timings)
+        await voice_cache_set(fingerprint, "features", audio_features.tolist())
+        return analyze_voice_features(audio_features)
+    
+    branches = [asyncio.ensure_future(transcript_branch()), asyncio.ensure_future(acoustic_branch())]
+    try:
+        (text, text_analysis, speech_model_used), voice_analysis = await asyncio.gather(*branches)
+    except BaseException:
+        # Don't leave the other branch running once the request has failed
+        for branch in branches:
+            branch.cancel()
+        raise
+    
+    # Combine analyses
+    combined_analysis = {
+        "mood": text_analysis["mood"],
+        "score": text_analysis["score"],
+        "energy": (text_analysis["energy"] + voice_analysis["energy"]) // 2,
+        "sentimentScore": text_analysis["sentimentScore"],
+        "emotional_state": text_analysis["emotional_state"],
+        "detected_emotions": text_analysis["detected_emotions"],
+        "transcribed_text": text
+    }
+    if speech_model_used is not None:
+        combined_analysis["speech_model"] = speech_model_used
+    if voice_activity is not None:
+        combined_analysis["voice_activity"] = voice_activity.summary()
+    return combined_analysis
+
+async def analyze_recording(waveform, timings, mode="full"):
+    """Analyze a decoded recording, reusing the cached results for the same audio.
+    
+    The cache key is a hash of the decoded samples, so a retried upload is a
+    hit even when it arrives in another container or with other metadata. A
+    cached analysis is returned as is; otherwise a cached transcript or
+    feature vector still spares Whisper or the feature extraction. An analysis
+    whose transcript came from a faster speech model, picked under load, is
+    not cached.
+    """
+    fingerprint = await timed_stage(timings, "fingerprint", run_in_threadpool(audio_cache_key, waveform))
+    analysis = await voice_cache_get(fingerprint, f"{mode}_analysis")
+    if analysis is not None:
+        return analysis
+    
+    if mode == "fast":
+        analysis = await run_fast_voice_pipeline(waveform, timings)
+    else:
+        analysis = await run_voice_pipeline(waveform, timings, fingerprint=fingerprint)
+    if "speech_model" not in analysis or cacheable_transcript(analysis["speech_model"]):
+        await voice_cache_set(fingerprint, f"{mode}_analysis", analysis)
+    return analysis
+
+# The audio is read from the request stream, so document the form that FastAPI no longer parses
+AUDIO_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"audio": {"type": "string", "format": "binary"}},
+                    "required": ["audio"],
+                }
+            },
+            "audio/*": {"schema": {"type": "string", "format": "binary"}},
+        },
+    }
+}
+
+@app.post("/analyze-voice", openapi_extra=AUDIO_UPLOAD_OPENAPI)
+async def analyze_voice(request: Request, debug: bool = False, mode: str = "full"):
     """Analyze voice recording to detect mood and emotions."""
     try:
-        # Save the uploaded file temporarily
-        temp_dir = tempfile.mkdtemp()
-        temp_audio_path = os.path.join(temp_dir, "audio_file")
+        if mode not in ("full", "fast"):
+            raise HTTPException(status_code=400, detail="mode must be 'full' or 'fast'")
+        timings = current_timings()
+        start = time.perf_counter()
+        
+        # Decode the upload to 16 kHz mono float32 while it is received
+        waveform = await timed_stage(timings, "decode", receive_audio(request))
+        AUDIO_SECONDS.labels("upload").inc(len(waveform) / TARGET_SAMPLE_RATE)
         
-        with open(temp_audio_path, "wb") as buffer:
-            buffer.write(await audio.read())
+        combined_analysis = await analyze_recording(waveform, timings, mode)
         
-        # Convert WebM to WAV for processing if needed
-        file_extension = os.path.splitext(audio.filename)[1].lower()
-        processed_audio_path = temp_audio_path
+        if debug:
+            timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+            combined_analysis["debug"] = {"timings_ms": timings}
         
-        if file_extension == ".webm":
-            wav_path = os.path.join(temp_dir, "audio_file.wav")
-            audio_segment = AudioSegment.from_file(temp_audio_path, format="webm")
-            audio_segment.export(wav_path, format="wav")
-            processed_audio_path = wav_path
+        return combined_analysis
+    
+    except (HTTPException, QueueFullError, ModelNotAvailableError):
+        raise
+    except AudioTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing voice: {str(e)}")
+
+def log_partial_failure(task):
+    """Log a partial analysis that failed, since nothing awaits it once the next one starts."""
+    if not task.cancelled() and task.exception() is not None:
+        logger.error("Streaming partial analysis failed", exc_info=task.exception())
+
+async def send_stream_partial(websocket, session):
+    """Transcribe the pending window of a stream and send a partial result."""
+    try:
+        candidate = session.commit_candidate()
+        if candidate is not None:
+            segment, cut = candidate
+            transcription = await transcribe(segment)
+            session.commit(cut, transcription["text"])
         
-        # Transcribe audio to text
-        transcription = speech_pipeline(processed_audio_path)
-        transcribed_text = transcription["text"]
+        pending = session.pending_audio()
+        pending_text = ""
+        if len(pending) >= TARGET_SAMPLE_RATE // 2:
+            pending_text = (await transcribe(pending))["text"]
         
-        # Extract audio features
-        audio_features = extract_audio_features(processed_audio_path)
+        text = session.transcript(pending_text)
+        message = {"type": "partial", "text": text, "seconds": round(session.duration, 2)}
+        if text:
+            analysis = await analyze_text_cached(text)
+            message.update({
+                "mood": analysis["mood"],
+                "score": analysis["score"],
+                "energy": analysis["energy"],
+                "detected_emotions": analysis["detected_emotions"],
+            })
+        await websocket.send_json(message)
+    except QueueFullError:
+        # Skip this partial when the model is saturated; the next one catches up
+        pass
+
+@app.websocket("/analyze-voice/stream")
+async def analyze_voice_stream(websocket: WebSocket):
+    """Stream raw PCM audio and receive partial transcripts and rolling mood estimates."""
+    await websocket.accept()
+    partial_task = None
+    try:
+        session = StreamingSession(
+            sample_rate=int(websocket.query_params.get("sample_rate", TARGET_SAMPLE_RATE)),
+            sample_format=websocket.query_params.get("format", "f32le"),
+            window_seconds=STREAM_WINDOW_S,
+            partial_interval_seconds=STREAM_PARTIAL_INTERVAL_S,
+            max_seconds=STREAM_MAX_SECONDS,
+        )
         
-        # Analyze voice features
-        voice_analysis = analyze_voice_features(audio_features)
+        # Receive audio until the client sends {"type": "end"}
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            if message.get("bytes"):
+                session.add_frame(message["bytes"])
+                if session.partial_due() and (partial_task is None or partial_task.done()):
+                    partial_task = asyncio.ensure_future(send_stream_partial(websocket, session))
+                    partial_task.add_done_callback(log_partial_failure)
+            elif message.get("text") and stream_control_type(message["text"]) == "end":
+                break
         
-        # Analyze text sentiment
-        text_analysis = analyze_text_sentiment(transcribed_text)
+        if partial_task is not None:
+            await partial_task
+        session.finish()
+        if session.duration == 0:
+            raise AudioDecodeError("No audio received")
         
-        # Combine analyses
-        combined_analysis = {
-            "mood": text_analysis["mood"],
-            "score": text_analysis["score"],
-            "energy": (text_analysis["energy"] + voice_analysis["energy"]) // 2,
-            "sentimentScore": text_analysis["sentimentScore"],
-            "emotional_state": text_analysis["emotional_state"],
-            "detected_emotions": text_analysis["detected_emotions"],
-            "transcribed_text": transcribed_text
-        }
+        # Commit whatever is left, then analyze the whole recording
+        candidate = session.commit_candidate()
+        while candidate is not None:
+            segment, cut = candidate
+            session.commit(cut, (await transcribe(segment))["text"])
+            candidate = session.commit_candidate()
+        pending = session.pending_audio()
+        pending_text = (await transcribe(pending))["text"] if len(pending) else ""
         
-        return combined_analysis
+        AUDIO_SECONDS.labels("stream").inc(session.duration)
+        timings = {}
+        analysis = await run_voice_pipeline(session.audio(), timings, transcribed_text=session.transcript(pending_text))
+        await websocket.send_json({"type": "final", **analysis})
+        await websocket.close()
     
+    except WebSocketDisconnect:
+        if partial_task is not None:
+            partial_task.cancel()
+    except (AudioDecodeError, QueueFullError, ValueError) as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1013 if isinstance(e, QueueFullError) else 1003)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing voice: {str(e)}")
+        await websocket.send_json({"type": "error", "detail": f"Error analyzing voice stream: {str(e)}"})
+        await websocket.close(code=1011)
+
+async def run_voice_job(waveform):
+    """Analyze the recording of a background job."""
+    timings = {}
+    start = time.perf_counter()
+    analysis = await analyze_recording(waveform, timings)
+    timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+    analysis["timings_ms"] = timings
+    return analysis
+
+job_manager = JobManager(
+    run_voice_job,
+    workers=JOBS_WORKERS,
+    max_queued=JOBS_MAX_QUEUE,
+    max_queued_seconds=JOBS_MAX_QUEUED_SECONDS,
+    queue_timeout_seconds=JOBS_QUEUE_TIMEOUT_SECONDS,
+    retention_seconds=JOBS_RETENTION_SECONDS,
+    max_retained=JOBS_MAX_RETAINED,
+    length_weight=JOBS_LENGTH_WEIGHT,
+    store=SqliteCacheBackend(JOBS_SHARED_PATH, ttl_seconds=JOBS_RETENTION_SECONDS) if JOBS_SHARED_PATH else None,
+)
+
+@app.post("/jobs/analyze-voice", status_code=202, openapi_extra=AUDIO_UPLOAD_OPENAPI)
+async def submit_voice_job(request: Request):
+    """Accept a voice recording for background analysis and return the job id straight away."""
+    try:
+        waveform = await timed_stage(current_timings(), "decode", receive_audio(request))
+        AUDIO_SECONDS.labels("job").inc(len(waveform) / TARGET_SAMPLE_RATE)
+        job = job_manager.submit(waveform, len(waveform) / TARGET_SAMPLE_RATE)
+        return JSONResponse(status_code=202, content=job.to_dict(), headers={"Location": f"/jobs/{job.id}"})
+    
+    except (HTTPException, QueueFullError):
+        raise
+    except AudioTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error accepting voice job: {str(e)}")
+
+@app.get("/jobs")
+async def job_queue():
+    """Report the size of the job queue and how many jobs are retained."""
+    return job_manager.stats()
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Report the status of a job, with its result once it has completed."""
+    state = await job_manager.lookup(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found (it may have expired)")
+    return state
+
+def job_event(state):
+    return f"event: {state['status']}\ndata: {json.dumps(state)}\n\n"
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Stream the status of a job as server-sent events until it has finished."""
+    state = await job_manager.lookup(job_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Job not found (it may have expired)")
+    
+    async def events():
+        job = job_manager.get(job_id)
+        last = state
+        yield job_event(last)
+        while last["status"] not in FINISHED:
+            if job is not None:
+                # Jobs of this process wake the stream when they change; the change
+                # token is taken before the state is read, so no change is missed
+                changed = job.changed
+                current = await job_manager.lookup(job_id)
+                if current is None or current["status"] == last["status"]:
+                    await job.wait_for_change(15, changed)
+                    current = await job_manager.lookup(job_id)
+            else:
+                # Jobs of other workers are polled in the shared store
+                await asyncio.sleep(1)
+                current = await job_manager.lookup(job_id)
+            if current is None:
+                return
+            if current["status"] != last["status"]:
+                last = current
+                yield job_event(last)
+            else:
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.post("/analyze-text")
 async def analyze_text(request: Request):
@@ -449,12 +1037,99 @@ async def analyze_text(request: Request):
         if not text:
             raise HTTPException(status_code=400, detail="Text is required")
         
-        analysis = analyze_text_sentiment(text)
+        analysis = await analyze_text_cached(text)
         return analysis
     
+    except (HTTPException, QueueFullError, ModelNotAvailableError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing text: {str(e)}")
 
+def bulk_line(index, item_id=None, **fields):
+    """Format one result line of a bulk analysis."""
+    line = {"index": index}
+    if item_id is not None:
+        line["id"] = item_id
+    line.update(fields)
+    return json.dumps(line) + "\n"
+
+async def analyze_bulk_batch(batch):
+    """Analyze one batch of bulk items and return their NDJSON result lines."""
+    lines = {}
+    misses = {}
+    
+    for index, item in batch:
+        if isinstance(item, BulkItemError):
+            lines[index] = bulk_line(index, error=str(item))
+            continue
+        
+        item_id = item.get("id") if isinstance(item, dict) else None
+        text = item.get("text") if isinstance(item, dict) else item
+        if not isinstance(text, str) or not text.strip():
+            lines[index] = bulk_line(index, item_id, error="Text is required")
+            continue
+        
+        key = text_cache_key(text)
+        cached = await analysis_cache.aget(key)
+        if cached is not None:
+            lines[index] = bulk_line(index, item_id, **cached)
+        else:
+            misses[index] = (key, normalize_text(text), item_id)
+    
+    if misses:
+        texts = [text for _, text, _ in misses.values()]
+        deadline = time.monotonic() + TEXT_BULK_RETRY_SECONDS
+        while True:
+            try:
+                analyses = await text_queue.run(analyze_text_sentiment_batch, texts)
+                break
+            except QueueFullError as e:
+                # Bulk work yields to interactive requests, up to a point
+                if time.monotonic() >= deadline:
+                    for index, (_, _, item_id) in misses.items():
+                        lines[index] = bulk_line(index, item_id, error=str(e))
+                    return "".join(lines[index] for index in sorted(lines))
+                await asyncio.sleep(0.05)
+        
+        for (index, (key, _, item_id)), analysis in zip(misses.items(), analyses):
+            await analysis_cache.aset(key, analysis)
+            lines[index] = bulk_line(index, item_id, **analysis)
+    
+    return "".join(lines[index] for index in sorted(lines))
+
+async def stream_bulk_analysis(items, body):
+    """Analyze bulk items in fixed-size batches, yielding results as each batch finishes."""
+    try:
+        batch = []
+        for index, item in enumerate(items):
+            batch.append((index, item))
+            if len(batch) >= TEXT_BULK_BATCH_SIZE:
+                yield await analyze_bulk_batch(batch)
+                batch = []
+        if batch:
+            yield await analyze_bulk_batch(batch)
+    except ValueError as e:
+        yield json.dumps({"error": str(e)}) + "\n"
+    finally:
+        body.close()
+
+@app.post("/analyze-text/batch")
+async def analyze_text_batch(request: Request):
+    """Analyze many texts, streaming one NDJSON result line per text."""
+    content_type = request.headers.get("content-type", "")
+    try:
+        body = await spool_request_body(request, max_bytes=TEXT_BULK_MAX_BYTES)
+    except BodyTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        # A malformed JSON array is rejected here, before the response starts streaming
+        items = await run_in_threadpool(load_bulk_items, body, content_type)
+    except ValueError as e:
+        body.close()
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return StreamingResponse(stream_bulk_analysis(items, body), media_type="application/x-ndjson")
+
 @app.post("/generate-recommendations")
 async def generate_recommendations(request: Request):
     """Generate personalized recommendations based on mood analysis."""
@@ -468,85 +1143,81 @@ async def generate_recommendations(request: Request):
         
         if not userId or not mood or not energy_level:
             raise HTTPException(status_code=400, detail="Missing required fields")
+        if not isinstance(mood, str):
+            raise HTTPException(status_code=400, detail="mood must be a string")
+        try:
+            energy_level = float(energy_level)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="energyLevel must be a number")
+        if not math.isfinite(energy_level):
+            raise HTTPException(status_code=400, detail="energyLevel must be a number")
+        if not isinstance(detected_emotions, list) or not all(isinstance(e, str) for e in detected_emotions):
+            raise HTTPException(status_code=400, detail="detectedEmotions must be a list of strings")
         
-        recommendations = get_recommendations(mood, energy_level, detected_emotions)
+        # A changed catalog is compiled in the thread pool, never on the event loop
+        if recommendation_engine.reload_due():
+            await run_in_threadpool(recommendation_engine.maybe_reload)
+        recommendations = get_recommendations(mood, energy_level, detected_emotions, user_id=str(userId))
         
         # In a real application, we would store these in the database
         # Here we'll just return them
         return {"recommendations": recommendations}
     
+    except (HTTPException, QueueFullError, ModelNotAvailableError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
 
 @app.post("/generate-summary")
 async def generate_summary(request: Request):
-    """Generate weekly summary insights based on check-in data."""
+    """Generate weekly summary insights and trend statistics from check-in data.
+    
+    With "incremental": true and a userId, the user's aggregates are cached and
+    only check-ins newer than the last merged one are added to them, so the
+    caller can send just the check-ins since its previous call.
+    """
     try:
         data = await request.json()
         check_ins = data.get("checkIns", [])
+        user_id = data.get("userId")
+        incremental = bool(data.get("incremental")) and user_id is not None
+        try:
+            utc_offset_minutes = int(data.get("utcOffsetMinutes", 0))
+        except (TypeError, ValueError, OverflowError):
+            raise HTTPException(status_code=400, detail="utcOffsetMinutes must be a number")
+        if abs(utc_offset_minutes) > 14 * 60:
+            raise HTTPException(status_code=400, detail="utcOffsetMinutes must be between -840 and 840")
         
-        if not check_ins:
-            raise HTTPException(status_code=400, detail="No check-in data provided")
-        
-        # Analyze mood patterns
-        moods = [check_in.get("mood") for check_in in check_ins]
-        scores = [check_in.get("moodScore") for check_in in check_ins]
-        energy_levels = [check_in.get("energyLevel") for check_in in check_ins]
-        
-        # Calculate average mood score and energy level
-        avg_score = sum(scores) / len(scores) if scores else 0
-        avg_energy = sum(energy_levels) / len(energy_levels) if energy_levels else 0
-        
-        # Count mood frequencies
-        mood_counts = {}
-        for mood in moods:
-            if mood:
-                mood_counts[mood] = mood_counts.get(mood, 0) + 1
-        
-        # Get most common mood
-        most_common_mood = max(mood_counts.items(), key=lambda x: x[1])[0] if mood_counts else "neutral"
+        if not isinstance(check_ins, list) or not all(isinstance(check_in, dict) for check_in in check_ins):
+            raise HTTPException(status_code=400, detail="checkIns must be a list of objects")
         
-        # Generate insights
-        insights = f"This week, your average mood score was {avg_score:.1f}/10 and your average energy level was {avg_energy:.1f}/10. "
-        insights += f"You most frequently reported feeling {most_common_mood}. "
-        
-        # Add trend analysis
-        if len(scores) >= 3:
-            if scores[-1] > scores[0]:
-                insights += "Your mood has been improving over the week. "
-            elif scores[-1] < scores[0]:
-                insights += "Your mood has slightly declined over the week. "
-            else:
-                insights += "Your mood has remained relatively stable. "
-        
-        # Add recommendations based on mood patterns
-        recommendations = "Based on your mood patterns this week, consider the following:\n\n"
-        
-        if avg_score < 4:
-            recommendations += "• Your mood has been on the lower side. Consider scheduling time with a trusted friend or mental health professional.\n"
-            recommendations += "• Set aside time each day for self-care activities that have helped you feel better in the past.\n"
-            recommendations += "• Ensure you're getting adequate sleep, nutrition, and some light physical activity.\n"
-        elif avg_score < 7:
-            recommendations += "• Your mood has been moderate. Pay attention to what activities boost your mood and try to incorporate more of them.\n"
-            recommendations += "• Practice mindfulness or meditation to help maintain emotional balance.\n"
-            recommendations += "• Consider setting small, achievable goals to build momentum and confidence.\n"
+        # The cached aggregates are read, merged and written back only if no other
+        # request (on any worker) has written them in between; otherwise merge again
+        for _ in range(SUMMARY_UPDATE_ATTEMPTS):
+            aggregates, version = await load_summary_aggregates(user_id) if incremental else (None, None)
+            if aggregates is not None and aggregates.utc_offset_minutes != utc_offset_minutes:
+                aggregates = None
+            cached = aggregates is not None
+            if aggregates is None:
+                aggregates = SummaryAggregates(utc_offset_minutes)
+            
+            if not check_ins and not aggregates.count:
+                raise HTTPException(status_code=400, detail="No check-in data provided")
+            
+            new_check_ins = aggregates.update(check_ins)
+            if not incremental or await store_summary_aggregates(user_id, aggregates, version):
+                break
         else:
-            recommendations += "• Your mood has been positive! Reflect on what's working well and continue these practices.\n"
-            recommendations += "• Share your positive energy with others through acts of kindness or connection.\n"
-            recommendations += "• Document what's going well to reference during more challenging times.\n"
-        
-        if avg_energy < 4:
-            recommendations += "• Your energy has been low. Check your sleep quality and quantity.\n"
-            recommendations += "• Consider gentle exercise like walking or stretching to naturally boost energy.\n"
-        elif avg_energy > 7:
-            recommendations += "• You've had high energy. Channel this productively into activities that matter to you.\n"
-            recommendations += "• Ensure you're also building in adequate rest periods to sustain your energy.\n"
+            raise HTTPException(status_code=409, detail="This user's summary is being updated by another request, please retry")
         
-        return {
-            "insights": insights,
-            "recommendations": recommendations
-        }
+        summary = summary_text(aggregates)
+        summary["stats"] = aggregates.stats()
+        if incremental:
+            summary["incremental"] = {"cached": cached, "newCheckIns": new_check_ins}
+        return summary
     
+    except (HTTPException, QueueFullError, ModelNotAvailableError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
 
@@ -0,0 +1,150 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import REGISTRY
+
+from serving import process_memory
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "ai_stage_seconds", "Time spent in each stage of the analysis pipelines", ["stage"], buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "ai_request_seconds", "HTTP request latency by route", ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+AUDIO_SECONDS = Counter("ai_audio_seconds", "Seconds of decoded audio analyzed", ["source"])
+AUDIO_TRIMMED_FRACTION = Histogram(
+    "ai_audio_trimmed_fraction", "Fraction of each recording trimmed as silence",
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.99, 1.0),
+)
+INPUT_TOKENS = Histogram(
+    "ai_input_tokens", "Tokens per text sent to the text models",
+    buckets=(8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+TEXT_CHUNKS = Histogram("ai_text_chunks", "Windows each text was scored in", buckets=(1, 2, 3, 4, 6, 8, 12, 16))
+TEXT_TOKEN_BUDGET_EXCEEDED = Counter(
+    "ai_text_token_budget_exceeded", "Texts over their token budget, scored on evenly spread windows"
+)
+SPEECH_MODEL_SELECTED = Counter(
+    "ai_speech_model_selected", "Transcriptions by the speech model the cascade picked, and why", ["model", "reason"]
+)
+SPEECH_TRANSCRIPTION_SECONDS = Histogram(
+    "ai_speech_transcription_seconds", "Transcription latency, queueing included, by speech model", ["model"],
+    buckets=LATENCY_BUCKETS,
+)
+JOB_WAIT_SECONDS = Histogram(
+    "ai_job_wait_seconds", "Time background jobs wait before a worker starts them",
+    buckets=(0.01, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600),
+)
+JOBS_FINISHED = Counter("ai_jobs_finished", "Background jobs by final status", ["status"])
+VOICE_CACHE_LOOKUPS = Counter(
+    "ai_voice_cache_lookups", "Voice cache lookups by cached part and result (hit or miss)", ["part", "result"]
+)
+
+# Stage timings of the HTTP request being handled, for the Server-Timing header
+request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Dict[str, float]:
+    """The current request's stage timings (ms), or a fresh dict outside a request."""
+    timings = request_timings.get()
+    return timings if timings is not None else {}
+
+
+def record_stage(stage: str, seconds: float, timings: Optional[Dict[str, float]] = None):
+    """Observe a stage duration, and record it in milliseconds in ``timings`` if given."""
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    if timings is not None:
+        timings[stage] = round(seconds * 1000, 2)
+
+
+@contextmanager
+def span(stage: str, timings: Optional[Dict[str, float]] = None):
+    """Time the enclosed block as one pipeline stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(stage, time.perf_counter() - start, timings)
+
+
+def server_timing_header(timings: Dict[str, float]) -> str:
+    """Format stage timings (ms) as a Server-Timing header value."""
+    return ", ".join(f"{stage.replace('.', '-')};dur={duration}" for stage, duration in timings.items())
+
+
+class InferenceQueueCollector:
+    """Exports the in-flight and waiting calls of each model queue at scrape time."""
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    def collect(self):
+        in_flight = GaugeMetricFamily("ai_model_in_flight", "Model calls currently running", labels=["model"])
+        waiting = GaugeMetricFamily("ai_model_waiting", "Model calls waiting for a slot", labels=["model"])
+        rejected = CounterMetricFamily("ai_model_rejected", "Model calls rejected with 503", labels=["model"])
+        for name, stats in self.executor.stats().items():
+            in_flight.add_metric([name], stats["running"])
+            waiting.add_metric([name], stats["waiting"])
+            rejected.add_metric([name], stats["rejected"])
+        yield in_flight
+        yield waiting
+        yield rejected
+
+
+class SpeechCascadeCollector:
+    """Exports the cost per Whisper window the speech cascade estimates for each model."""
+
+    def __init__(self, cascade):
+        self.cascade = cascade
+
+    def collect(self):
+        window_seconds = GaugeMetricFamily(
+            "ai_speech_window_seconds", "Estimated seconds to transcribe one Whisper window", labels=["model"]
+        )
+        for stats in self.cascade.stats().values():
+            if stats["window_seconds"] is not None:
+                window_seconds.add_metric([stats["model"]], stats["window_seconds"])
+        yield window_seconds
+
+
+class ProcessMemoryCollector:
+    """Exports this worker's RSS, PSS, unique and shared memory at scrape time."""
+
+    def collect(self):
+        memory = GaugeMetricFamily("ai_worker_memory_bytes", "Memory of the worker process", labels=["kind"])
+        for kind, value in process_memory().items():
+            memory.add_metric([kind], value)
+        yield memory
+
+
+# Collectors that report on the worker serving the scrape
+worker_collectors = []
+
+
+def register_collector(collector):
+    REGISTRY.register(collector)
+    worker_collectors.append(collector)
+    return collector
+
+
+def render_metrics() -> bytes:
+    """The metrics exposition for /metrics.
+
+    With PROMETHEUS_MULTIPROC_DIR set (several workers, see gunicorn.conf.py),
+    counters and histograms are aggregated over every worker; gauges from the
+    worker collectors describe the worker that served the scrape.
+    """
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    for collector in worker_collectors:
+        registry.register(collector)
+    return generate_latest(registry)
@@ -0,0 +1,142 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from precision import load_pipeline
+
+logger = logging.getLogger(__name__)
+
+LOAD_MODES = ("eager", "lazy")
+
+
+class ModelNotAvailableError(RuntimeError):
+    """Raised when a model failed to load."""
+
+
+class ModelSpec:
+    """How to build one pipeline, and its current load state."""
+
+    def __init__(self, name: str, task: str, model_id: str, precision: str = "fp32",
+                 load_mode: str = "eager", warmup_input: Any = None, **kwargs):
+        if load_mode not in LOAD_MODES:
+            raise ValueError(f"Unknown load mode '{load_mode}' for {name}, expected one of {', '.join(LOAD_MODES)}")
+        self.name = name
+        self.task = task
+        self.model_id = model_id
+        self.precision = precision
+        self.load_mode = load_mode
+        self.warmup_input = warmup_input
+        self.kwargs = kwargs
+
+        self.pipeline = None
+        self.state = "not_loaded"
+        self.source: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "model": self.model_id,
+            "source": self.source,
+            "load_mode": self.load_mode,
+            "precision": self.pipeline.precision if self.pipeline is not None else self.precision,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """Loads pipelines from a pinned local snapshot directory, eagerly or on first use.
+
+    With ``snapshot_dir`` set, every model is read from
+    ``<snapshot_dir>/<model id>`` and the Hugging Face hub is never contacted,
+    so pods start without network access. Weights must be safetensors, which
+    are parsed without unpickling and the extra copies that come with it, so
+    loading is faster. The tensors are still copied into the model's
+    parameters once, so the weights are not shared with the page cache.
+    """
+
+    def __init__(self, snapshot_dir: Optional[str] = None, warmup: bool = True):
+        self.snapshot_dir = snapshot_dir
+        self.warmup = warmup
+        self.specs: Dict[str, ModelSpec] = {}
+        # Set when the models were loaded in a parent process and shared with forked workers
+        self.preloaded = False
+
+    def register(self, name: str, task: str, model_id: str, **options) -> ModelSpec:
+        spec = ModelSpec(name, task, model_id, **options)
+        self.specs[name] = spec
+        return spec
+
+    def resolve(self, model_id: str) -> str:
+        """Local snapshot path for a model id, or the hub id without a snapshot directory."""
+        if not self.snapshot_dir:
+            return model_id
+        path = os.path.join(self.snapshot_dir, model_id)
+        if not os.path.isfile(os.path.join(path, "config.json")):
+            raise ModelNotAvailableError(f"No snapshot of {model_id} in {self.snapshot_dir}")
+        return path
+
+    def get(self, name: str):
+        """Return a loaded pipeline, loading it first if it is lazy or still loading."""
+        spec = self.specs[name]
+        if spec.pipeline is None:
+            self.load(name)
+        return spec.pipeline
+
+    def load(self, name: str):
+        spec = self.specs[name]
+        with spec.lock:
+            if spec.pipeline is not None:
+                return spec.pipeline
+
+            spec.state = "loading"
+            spec.error = None
+            try:
+                start = time.perf_counter()
+                spec.source = self.resolve(spec.model_id)
+                model_kwargs = {"use_safetensors": True} if self.snapshot_dir else {}
+                pipe = load_pipeline(spec.task, spec.source, spec.precision, model_kwargs=model_kwargs, **spec.kwargs)
+                spec.load_seconds = round(time.perf_counter() - start, 3)
+
+                if self.warmup and spec.warmup_input is not None:
+                    spec.state = "warming_up"
+                    start = time.perf_counter()
+                    pipe(spec.warmup_input)
+                    spec.warmup_seconds = round(time.perf_counter() - start, 3)
+            except Exception as e:
+                spec.state = "failed"
+                spec.error = str(e)
+                logger.exception("Failed to load model %s (%s)", name, spec.model_id)
+                raise ModelNotAvailableError(f"Model {name} is not available: {e}")
+
+            spec.pipeline = pipe
+            spec.state = "ready"
+            logger.info("Loaded model %s from %s in %.1fs", name, spec.source, spec.load_seconds)
+            return pipe
+
+    def load_eager(self, max_workers: int = 3):
+        """Load every eager model, in parallel. Failures are recorded in status()."""
+        eager = [name for name, spec in self.specs.items() if spec.load_mode == "eager"]
+        if not eager:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="model-load") as pool:
+            for future in [pool.submit(self.load, name) for name in eager]:
+                try:
+                    future.result()
+                except ModelNotAvailableError:
+                    pass
+
+    def ready(self) -> bool:
+        """True once every eager model is loaded. Lazy models load on first use."""
+        return all(spec.state == "ready" for spec in self.specs.values() if spec.load_mode == "eager")
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        return {name: spec.status() for name, spec in self.specs.items()}
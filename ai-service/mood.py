@@ -0,0 +1,54 @@
+def build_text_analysis(sentiment_result, emotions_result):
+    """Turn raw sentiment and emotion pipeline outputs for one text into an analysis."""
+    sentiment_label = sentiment_result["label"]
+    sentiment_score = sentiment_result["score"]
+    
+    # Normalize sentiment score to -1 to 1 scale
+    normalized_score = sentiment_score if sentiment_label == "POSITIVE" else -sentiment_score
+    
+    # Map to 1-10 scale for the app
+    mood_score = int((normalized_score + 1) * 5)
+    
+    # Get emotions
+    detected_emotions = [item["label"] for item in emotions_result]
+    
+    # Map sentiment to mood
+    if normalized_score > 0.6:
+        mood = "happy"
+    elif normalized_score > 0.2:
+        mood = "neutral"
+    elif normalized_score > -0.2:
+        mood = "neutral"
+    elif normalized_score > -0.6:
+        mood = "sad"
+    else:
+        mood = "sad"
+    
+    # Adjust mood based on detected emotions
+    if "anger" in detected_emotions:
+        mood = "angry"
+    elif "fear" in detected_emotions:
+        mood = "anxious"
+    
+    # Get energy level based on emotion intensity
+    energy_map = {
+        "joy": 8,
+        "optimism": 7,
+        "neutral": 5,
+        "sadness": 3,
+        "anger": 6,
+        "fear": 4,
+        "surprise": 7
+    }
+    
+    energy_values = [energy_map.get(emotion, 5) for emotion in detected_emotions]
+    energy_level = int(sum(energy_values) / len(energy_values)) if energy_values else 5
+    
+    return {
+        "mood": mood,
+        "score": mood_score,
+        "energy": energy_level,
+        "sentimentScore": normalized_score,
+        "emotional_state": detected_emotions[0] if detected_emotions else "neutral",
+        "detected_emotions": detected_emotions
+    }
@@ -0,0 +1,59 @@
+import logging
+
+import torch
+from transformers import pipeline
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("fp32", "bf16", "int8")
+
+
+def bf16_supported() -> bool:
+    """Whether this CPU has native bfloat16 matmul support (AVX512-BF16 or AMX)."""
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def resolve_precision(precision: str) -> str:
+    """Validate a precision name, falling back to fp32 when bf16 would be emulated."""
+    precision = (precision or "fp32").lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}', expected one of {', '.join(PRECISIONS)}")
+    if precision == "bf16" and not bf16_supported():
+        logger.warning("bf16 requested but this CPU has no native bfloat16 support, using fp32")
+        return "fp32"
+    return precision
+
+
+def load_pipeline(task: str, model: str, precision: str = "fp32", **kwargs):
+    """Create a transformers pipeline in the requested CPU precision.
+
+    - fp32: the model as published
+    - bf16: weights and activations in bfloat16
+    - int8: dynamic quantization of every nn.Linear (weights stored as int8,
+      activations quantized on the fly); other layers stay fp32
+    """
+    precision = resolve_precision(precision)
+    if precision == "bf16":
+        kwargs["torch_dtype"] = torch.bfloat16
+
+    pipe = pipeline(task, model=model, **kwargs)
+    if precision == "int8":
+        torch.ao.quantization.quantize_dynamic(pipe.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+    pipe.model.eval()
+    pipe.precision = precision
+    return pipe
+
+
+def model_size_bytes(model: torch.nn.Module) -> int:
+    """Bytes held by a model's parameters, buffers and packed quantized weights."""
+    total = sum(t.numel() * t.element_size() for t in list(model.parameters()) + list(model.buffers()))
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, bias = module.weight(), module.bias()
+            total += weight.numel() * weight.element_size()
+            total += bias.numel() * bias.element_size() if bias is not None else 0
+    return total
@@ -0,0 +1,282 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+MOODS = ("happy", "sad", "anxious", "angry", "neutral", "tired", "energetic")
+MOOD_ALIASES = {
+    "excited": "happy",
+    "joyful": "happy",
+    "depressed": "sad",
+    "melancholy": "sad",
+    "stressed": "anxious",
+    "worried": "anxious",
+    "fearful": "anxious",
+    "irritated": "angry",
+    "frustrated": "angry",
+    "fatigued": "tired",
+    "exhausted": "tired",
+}
+# Energy levels (1-10) covered by each band
+ENERGY_BANDS = {"low": (1, 3), "medium": (4, 6), "high": (7, 10)}
+# Score added when an item matches the first, second and third detected emotion
+EMOTION_WEIGHTS = (1.0, 0.5, 0.25)
+# Score of an item whose energy range contains the user's energy level
+ENERGY_WEIGHT = 0.5
+
+
+def normalize_mood(mood: str, energy_level: float) -> str:
+    """Map a mood to one of the catalog's mood categories."""
+    if not isinstance(mood, str):
+        mood = ""
+    if mood in MOODS:
+        return mood
+    if mood in MOOD_ALIASES:
+        return MOOD_ALIASES[mood]
+    return "energetic" if energy_level >= 7 else "neutral"
+
+
+def energy_band(energy_level: float) -> str:
+    if energy_level < 4:
+        return "low"
+    if energy_level < 7:
+        return "medium"
+    return "high"
+
+
+class CatalogItem:
+    """One recommendation, with its response built once per mood when the catalog is compiled."""
+
+    __slots__ = ("index", "id", "type", "moods", "emotions", "energy_min", "energy_max", "weight", "responses")
+
+    def __init__(self, index: int, data: Dict):
+        for field in ("id", "type", "title", "description"):
+            if not isinstance(data.get(field), str) or not data[field]:
+                raise ValueError(f"Recommendation item {data.get('id', index)!r} needs a '{field}' string")
+        if not data.get("moods"):
+            raise ValueError(f"Recommendation item {data['id']!r} needs at least one mood")
+
+        self.index = index
+        self.id = data["id"]
+        self.type = data["type"]
+        self.moods = tuple(data["moods"])
+        self.emotions = frozenset(data.get("emotions", ()))
+        self.energy_min, self.energy_max = data.get("energy", (1, 10))
+        self.weight = float(data.get("weight", 0.0))
+
+        response = {"id": self.id, "type": self.type, "title": data["title"], "description": data["description"]}
+        if data.get("link"):
+            response["link"] = data["link"]
+        self.responses = {mood: {**response, "mood": mood} for mood in self.moods}
+
+    def overlaps(self, low: float, high: float) -> bool:
+        return self.energy_min <= high and self.energy_max >= low
+
+    def energy_fit(self, energy_level: float) -> float:
+        """1 inside the item's energy range, falling linearly to 0 nine levels away from it."""
+        distance = max(self.energy_min - energy_level, energy_level - self.energy_max, 0)
+        return 1.0 - min(distance, 9) / 9
+
+    def score(self, emotions: Sequence[str], energy_level: float) -> float:
+        score = self.weight + ENERGY_WEIGHT * self.energy_fit(energy_level)
+        for weight, emotion in zip(EMOTION_WEIGHTS, emotions):
+            if emotion in self.emotions:
+                score += weight
+        return score
+
+
+class RecommendationCatalog:
+    """Recommendation items indexed by mood, energy band and type.
+
+    For every mood, band and type, the ``candidates`` best items are ranked
+    when the catalog is compiled: once for each emotion, and once for none.
+    A lookup only scores the candidates of the detected emotions, so its cost
+    does not grow with the catalog. Items are placed in a band when their
+    energy range overlaps it; a band without any item of a type falls back to
+    all of the mood's items of that type.
+    """
+
+    def __init__(self, items: Sequence[Dict], candidates: int = 16):
+        self.items = [CatalogItem(index, data) for index, data in enumerate(items)]
+        ids = [item.id for item in self.items]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Recommendation item ids must be unique")
+        self.candidates_per_key = max(1, int(candidates))
+        # Types in the order they first appear, which is the order they are returned in
+        self.types = list(OrderedDict.fromkeys(item.type for item in self.items))
+        self._index: Dict[Tuple[str, str, str], Dict[Optional[str], Tuple[CatalogItem, ...]]] = {}
+
+        by_mood_type: Dict[Tuple[str, str], List[CatalogItem]] = {}
+        for item in self.items:
+            for mood in item.moods:
+                by_mood_type.setdefault((mood, item.type), []).append(item)
+
+        for (mood, kind), mood_items in by_mood_type.items():
+            for band, (low, high) in ENERGY_BANDS.items():
+                members = [item for item in mood_items if item.overlaps(low, high)] or mood_items
+                self._index[(mood, band, kind)] = self._rank(members, (low + high) / 2)
+
+    @classmethod
+    def load(cls, path: str, candidates: int = 16) -> "RecommendationCatalog":
+        """Compile the catalog in a JSON file of the form {"items": [...]}."""
+        with open(path) as f:
+            return cls(json.load(f)["items"], candidates)
+
+    def _rank(self, members: List[CatalogItem], energy_level: float) -> Dict[Optional[str], Tuple[CatalogItem, ...]]:
+        emotions = set().union(*(item.emotions for item in members))
+        ranked = {}
+        for emotion in [None] + sorted(emotions):
+            scored = sorted(
+                members,
+                key=lambda item: (-item.score((emotion,) if emotion else (), energy_level), item.index),
+            )
+            ranked[emotion] = tuple(scored[:self.candidates_per_key])
+        return ranked
+
+    def candidates(self, mood: str, band: str, kind: str, emotions: Sequence[str]) -> List[CatalogItem]:
+        """The items worth scoring for a mood, energy band, type and detected emotions."""
+        ranked = self._index.get((mood, band, kind))
+        if not ranked:
+            return []
+        found: Dict[int, CatalogItem] = {}
+        for key in [None] + list(emotions):
+            for item in ranked.get(key, ()):
+                found[item.index] = item
+        return list(found.values())
+
+    def stats(self) -> Dict:
+        return {"items": len(self.items), "types": self.types, "index_keys": len(self._index)}
+
+
+class RecentHistory:
+    """The last ``per_user`` items recommended to each of at most ``max_users`` users.
+
+    Only item ids are kept, and the users seen least recently are dropped
+    first, so memory stays bounded however many users there are.
+    """
+
+    def __init__(self, max_users: int = 10000, per_user: int = 20):
+        self.max_users = max(1, int(max_users))
+        self.per_user = max(0, int(per_user))
+        self._users: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def recent(self, user_id: str) -> Dict[str, int]:
+        """Recently recommended item ids, mapped to their position (0 for the one recommended longest ago)."""
+        with self._lock:
+            items = self._users.get(user_id)
+            return {item_id: position for position, item_id in enumerate(items)} if items else {}
+
+    def add(self, user_id: str, item_ids: Sequence[str]):
+        if self.per_user == 0:
+            return
+        with self._lock:
+            items = self._users.get(user_id)
+            if items is None:
+                items = self._users[user_id] = deque(maxlen=self.per_user)
+            self._users.move_to_end(user_id)
+            items.extend(item_ids)
+            while len(self._users) > self.max_users:
+                self._users.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+
+class RecommendationEngine:
+    """Recommendations from a catalog file that is reloaded when it changes.
+
+    The file's modification time is checked at most every
+    ``reload_seconds`` (never when 0). A catalog that fails to load is logged
+    and the previous one stays in use.
+    """
+
+    def __init__(self, path: str, history: RecentHistory, reload_seconds: float = 5.0, candidates: int = 16):
+        self.path = path
+        self.history = history
+        self.reload_seconds = reload_seconds
+        self.candidates = candidates
+        self.catalog = RecommendationCatalog.load(path, candidates)
+        self.loaded_at = time.time()
+        self._mtime = os.path.getmtime(path)
+        self._checked_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reload_due(self) -> bool:
+        """Whether the catalog file should be checked for changes again."""
+        return self.reload_seconds > 0 and time.monotonic() - self._checked_at >= self.reload_seconds
+
+    def maybe_reload(self):
+        """Reload the catalog if its file changed; this compiles it, so keep it off the event loop."""
+        if not self.reload_due():
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.reload_seconds:
+                return
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                logger.warning("Recommendation catalog %s is missing, keeping the current catalog", self.path)
+                return
+            if mtime == self._mtime:
+                return
+            # Remember the change even if it fails to load, so a broken file is reported once
+            self._mtime = mtime
+            try:
+                catalog = RecommendationCatalog.load(self.path, self.candidates)
+            except Exception:
+                logger.exception("Could not reload the recommendation catalog %s, keeping the current catalog", self.path)
+                return
+            self.catalog = catalog
+            self.loaded_at = time.time()
+            logger.info("Reloaded %d recommendation items from %s", len(catalog.items), self.path)
+
+    def recommend(
+        self,
+        mood: str,
+        energy_level: float,
+        detected_emotions: Sequence[str] = (),
+        user_id: Optional[str] = None,
+    ) -> List[Dict]:
+        """One item of each type, the best match for the mood, energy and emotions.
+
+        Items recommended to the user recently are skipped while others are
+        available; when every candidate is recent, the one shown longest ago
+        is repeated. The catalog is not reloaded here; call ``maybe_reload``
+        first.
+        """
+        catalog = self.catalog
+        mood = normalize_mood(mood, energy_level)
+        band = energy_band(energy_level)
+        emotions = list(detected_emotions or ())[:len(EMOTION_WEIGHTS)]
+        recent = self.history.recent(user_id) if user_id else {}
+
+        picked = []
+        for kind in catalog.types:
+            candidates = catalog.candidates(mood, band, kind, emotions)
+            if candidates:
+                picked.append(max(candidates, key=lambda item: (
+                    item.id not in recent,
+                    -recent.get(item.id, 0),
+                    item.score(emotions, energy_level),
+                    -item.index,
+                )))
+
+        if user_id:
+            self.history.add(user_id, [item.id for item in picked])
+        return [item.responses[mood] for item in picked]
+
+    def stats(self) -> Dict:
+        return {
+            **self.catalog.stats(),
+            "path": self.path,
+            "loaded_at": datetime.fromtimestamp(self.loaded_at, timezone.utc).isoformat(),
+            "users": len(self.history),
+        }
@@ -0,0 +1,70 @@
+"""Download pinned snapshots of the service's models for offline startup.
+
+Each model registered in main.py is saved to <output>/<model id> with only the
+files needed for inference. Weights are stored as safetensors (converted from
+PyTorch .bin files when the hub repo has no safetensors), which the service
+loads without unpickling them. The resolved commit of every model is written
+to <output>/snapshots.json.
+
+Usage:
+    python scripts/download_models.py --output /models
+    MODEL_SNAPSHOT_DIR=/models uvicorn main:app
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from huggingface_hub import HfApi, snapshot_download  # noqa: E402
+from transformers import pipeline  # noqa: E402
+
+from main import model_registry  # noqa: E402
+
+ALLOW_PATTERNS = ["*.json", "*.txt", "*.model", "*.safetensors", "*.bin"]
+
+
+def download(spec, output, revision):
+    local_dir = os.path.join(output, spec.model_id)
+    commit = HfApi().model_info(spec.model_id, revision=revision).sha
+    snapshot_download(spec.model_id, revision=commit, local_dir=local_dir, allow_patterns=ALLOW_PATTERNS)
+
+    bin_files = glob.glob(os.path.join(local_dir, "*.bin"))
+    if bin_files and not glob.glob(os.path.join(local_dir, "*.safetensors")):
+        print(f"Converting {spec.model_id} weights to safetensors")
+        pipe = pipeline(spec.task, model=local_dir)
+        pipe.model.save_pretrained(local_dir, safe_serialization=True)
+    for path in bin_files:
+        if not path.endswith("training_args.bin"):
+            os.remove(path)
+
+    return commit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="Snapshot directory (MODEL_SNAPSHOT_DIR)")
+    parser.add_argument("--revision", action="append", default=[], metavar="MODEL_ID=REVISION",
+                        help="Pin a model to a branch, tag or commit (default: main)")
+    args = parser.parse_args()
+    revisions = dict(item.split("=", 1) for item in args.revision)
+
+    manifest_path = os.path.join(args.output, "snapshots.json")
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    for spec in model_registry.specs.values():
+        commit = download(spec, args.output, revisions.get(spec.model_id, "main"))
+        manifest[spec.model_id] = commit
+        print(f"{spec.model_id} @ {commit}")
+
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
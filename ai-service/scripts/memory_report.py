@@ -0,0 +1,56 @@
+"""Report the memory of a preforking server and each of its workers.
+
+Reads /proc on the host running the server (Linux only). RSS counts shared
+model weights once per worker; PSS divides them between the processes that
+share them, and USS is the memory unique to each worker - the cost of adding
+one more.
+
+Usage:
+    PIDFILE=/tmp/ai-service.pid gunicorn main:app -c gunicorn.conf.py
+    python scripts/memory_report.py --pid $(cat /tmp/ai-service.pid)
+    python scripts/memory_report.py --pid <master pid> --json
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serving import worker_memory_report  # noqa: E402
+
+MB = 1024 * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pid", type=int, required=True, help="Pid of the gunicorn master")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = worker_memory_report(args.pid)
+    if not report["master"].get("rss"):
+        sys.exit(f"Cannot read the memory of pid {args.pid} (is it running, and is this Linux?)")
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{'process':<16} {'RSS MB':>10} {'PSS MB':>10} {'USS MB':>10} {'shared MB':>10}")
+    rows = [("master", report["master"])] + [(f"worker {w['pid']}", w) for w in report["workers"]]
+    for name, memory in rows:
+        print(
+            f"{name:<16} {memory['rss'] / MB:>10.1f} {memory['pss'] / MB:>10.1f} "
+            f"{memory['uss'] / MB:>10.1f} {memory['shared'] / MB:>10.1f}"
+        )
+
+    totals = report["totals"]
+    print()
+    print(f"Workers: {totals['workers']}")
+    print(f"Sum of RSS (memory without sharing): {totals['rss'] / MB:.1f} MB")
+    print(f"Sum of PSS (actual footprint):       {totals['pss'] / MB:.1f} MB")
+    if totals["workers"]:
+        print(f"Unique memory per worker (mean USS): {totals['uss'] / totals['workers'] / MB:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Compare reduced-precision models against fp32 on a fixed local corpus.
+
+For each requested precision the sentiment and emotion models are run over
+data/parity_corpus.txt and their mood, sentiment and emotion labels are
+compared with the fp32 labels. With --audio-dir, every audio file in that
+directory is also transcribed and the word error rate against the fp32
+transcript is reported.
+
+Usage:
+    python scripts/precision_parity.py --precisions bf16 int8
+    python scripts/precision_parity.py --precisions int8 --audio-dir recordings/ --output parity.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio import decode_audio  # noqa: E402
+from mood import build_text_analysis  # noqa: E402
+from precision import PRECISIONS, load_pipeline, model_size_bytes  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "parity_corpus.txt")
+
+
+def run_text_models(sentiment_model, emotion_model, precision, texts, batch_size):
+    """Analyze the corpus with both text models loaded in one precision."""
+    sentiment = load_pipeline("sentiment-analysis", sentiment_model, precision)
+    emotion = load_pipeline("text-classification", emotion_model, precision, top_k=3)
+
+    # Warm up once so the timing excludes lazy initialisation
+    sentiment(texts[:1])
+    emotion(texts[:1])
+
+    start = time.perf_counter()
+    sentiment_results = sentiment(texts, batch_size=batch_size)
+    emotion_results = emotion(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    return {
+        "precision": sentiment.precision,
+        "analyses": [build_text_analysis(s, e) for s, e in zip(sentiment_results, emotion_results)],
+        "ms_per_text": 1000 * elapsed / len(texts),
+        "model_bytes": model_size_bytes(sentiment.model) + model_size_bytes(emotion.model),
+    }
+
+
+def compare_text(reference, candidate):
+    """Agreement of a candidate run with the fp32 reference."""
+    pairs = list(zip(reference["analyses"], candidate["analyses"]))
+    n = len(pairs)
+
+    def overlap(a, b):
+        return len(set(a) & set(b)) / max(len(set(a) | set(b)), 1)
+
+    return {
+        "precision": candidate["precision"],
+        "mood_agreement": sum(r["mood"] == c["mood"] for r, c in pairs) / n,
+        "sentiment_label_agreement": sum((r["sentimentScore"] > 0) == (c["sentimentScore"] > 0) for r, c in pairs) / n,
+        "top_emotion_agreement": sum(r["emotional_state"] == c["emotional_state"] for r, c in pairs) / n,
+        "emotion_set_overlap": sum(overlap(r["detected_emotions"], c["detected_emotions"]) for r, c in pairs) / n,
+        "sentiment_score_mae": sum(abs(r["sentimentScore"] - c["sentimentScore"]) for r, c in pairs) / n,
+        "ms_per_text": candidate["ms_per_text"],
+        "speedup": reference["ms_per_text"] / candidate["ms_per_text"],
+        "model_bytes": candidate["model_bytes"],
+        "memory_ratio": candidate["model_bytes"] / reference["model_bytes"],
+    }
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level Levenshtein distance divided by the reference length."""
+    ref, hyp = reference.lower().split(), hypothesis.lower().split()
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hyp, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1] / max(len(ref), 1)
+
+
+def run_speech_model(speech_model, precision, waveforms):
+    speech = load_pipeline("automatic-speech-recognition", speech_model, precision)
+    start = time.perf_counter()
+    transcripts = [speech(waveform, chunk_length_s=30, stride_length_s=5)["text"] for waveform in waveforms]
+    elapsed = time.perf_counter() - start
+    audio_seconds = sum(len(w) for w in waveforms) / 16000
+    return {
+        "precision": speech.precision,
+        "transcripts": transcripts,
+        "real_time_factor": elapsed / audio_seconds,
+        "model_bytes": model_size_bytes(speech.model),
+    }
+
+
+def compare_speech(reference, candidate):
+    pairs = list(zip(reference["transcripts"], candidate["transcripts"]))
+    return {
+        "precision": candidate["precision"],
+        "word_error_rate_vs_fp32": sum(word_error_rate(r, c) for r, c in pairs) / len(pairs),
+        "real_time_factor": candidate["real_time_factor"],
+        "speedup": reference["real_time_factor"] / candidate["real_time_factor"],
+        "model_bytes": candidate["model_bytes"],
+        "memory_ratio": candidate["model_bytes"] / reference["model_bytes"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--precisions", nargs="+", default=["bf16", "int8"], choices=[p for p in PRECISIONS if p != "fp32"])
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS, help="Text file with one check-in per line")
+    parser.add_argument("--audio-dir", help="Directory of recordings for the speech model comparison")
+    parser.add_argument("--sentiment-model", default="distilbert-base-uncased-finetuned-sst-2-english")
+    parser.add_argument("--emotion-model", default="j-hartmann/emotion-english-distilroberta-base")
+    parser.add_argument("--speech-model", default="openai/whisper-small")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--output", help="Write the report as JSON to this file")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        texts = [line.strip() for line in f if line.strip()]
+
+    report = {"corpus": args.corpus, "texts": len(texts), "text": [], "speech": []}
+
+    reference = run_text_models(args.sentiment_model, args.emotion_model, "fp32", texts, args.batch_size)
+    print(f"fp32 text models: {reference['ms_per_text']:.2f} ms/text, {reference['model_bytes'] / 1e6:.1f} MB")
+    for precision in args.precisions:
+        result = compare_text(reference, run_text_models(args.sentiment_model, args.emotion_model, precision, texts, args.batch_size))
+        report["text"].append(result)
+        print(
+            f"{result['precision']} text models: mood {result['mood_agreement']:.1%}, "
+            f"sentiment {result['sentiment_label_agreement']:.1%}, top emotion {result['top_emotion_agreement']:.1%}, "
+            f"emotion overlap {result['emotion_set_overlap']:.1%}, {result['speedup']:.2f}x faster, "
+            f"{result['memory_ratio']:.0%} of fp32 memory"
+        )
+
+    if args.audio_dir:
+        waveforms = []
+        for name in sorted(os.listdir(args.audio_dir)):
+            with open(os.path.join(args.audio_dir, name), "rb") as f:
+                waveforms.append(decode_audio(f.read()))
+        report["recordings"] = len(waveforms)
+
+        speech_reference = run_speech_model(args.speech_model, "fp32", waveforms)
+        print(f"fp32 speech model: real-time factor {speech_reference['real_time_factor']:.3f}")
+        for precision in args.precisions:
+            result = compare_speech(speech_reference, run_speech_model(args.speech_model, precision, waveforms))
+            report["speech"].append(result)
+            print(
+                f"{result['precision']} speech model: WER vs fp32 {result['word_error_rate_vs_fp32']:.1%}, "
+                f"{result['speedup']:.2f}x faster, {result['memory_ratio']:.0%} of fp32 memory"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""Train and evaluate the acoustic mood classifier used by /analyze-voice?mode=fast.
+
+Training data are local labelled feature files: CSV files with one column per
+feature (the names in features.FEATURE_NAMES) plus `mood` and `energy`
+columns, or .npz files with `features`, `mood` and `energy` arrays. The
+`features` command builds such a CSV from labelled recordings the way the
+service sees them: silence is trimmed with the same voice activity detection
+settings (VAD_ENABLED, VAD_FLOOR_DB, VAD_MIN_SILENCE_MS and VAD_PAD_MS, or the
+matching options), recordings without speech are skipped, and the speech goes
+through the same feature extractor. Use the service's VAD settings, or the
+model is trained on different inputs than it sees in production.
+
+Usage:
+    python scripts/train_voice_model.py features --audio-dir recordings/ --labels labels.csv --output features.csv
+    python scripts/train_voice_model.py train --data features.csv --output models/voice_mood.joblib
+    python scripts/train_voice_model.py evaluate --model models/voice_mood.joblib --data holdout.csv
+
+labels.csv has the columns `file`, `mood` and `energy` (1-10), with file names
+relative to --audio-dir. Serve the trained model with
+VOICE_MODEL_PATH=models/voice_mood.joblib.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from audio import TARGET_SAMPLE_RATE, decode_audio  # noqa: E402
+from features import FEATURE_NAMES, get_feature_engine  # noqa: E402
+from vad import detect_voice_activity  # noqa: E402
+from voice_model import VoiceMoodClassifier  # noqa: E402
+
+
+def load_feature_file(path):
+    """Feature matrix, moods and energies from one CSV or .npz file."""
+    if path.endswith(".npz"):
+        data = np.load(path, allow_pickle=False)
+        return data["features"].astype(np.float32), data["mood"].astype(str), data["energy"].astype(np.float64)
+
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    missing = [name for name in FEATURE_NAMES + ["mood", "energy"] if rows and name not in rows[0]]
+    if missing:
+        sys.exit(f"{path} is missing the columns: {', '.join(missing)}")
+    features = np.array([[float(row[name]) for name in FEATURE_NAMES] for row in rows], dtype=np.float32)
+    return features, np.array([row["mood"] for row in rows]), np.array([float(row["energy"]) for row in rows])
+
+
+def load_feature_files(paths):
+    parts = [load_feature_file(path) for path in paths]
+    return tuple(np.concatenate([part[i] for part in parts]) for i in range(3))
+
+
+def split(n, test_size, seed):
+    """Shuffled train and test indices."""
+    order = np.random.default_rng(seed).permutation(n)
+    n_test = int(round(n * test_size))
+    return order[n_test:], order[:n_test]
+
+
+def extract_command(args):
+    engine = get_feature_engine(TARGET_SAMPLE_RATE)
+    with open(args.labels, newline="") as f:
+        labels = list(csv.DictReader(f))
+
+    written, silent = 0, []
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["file"] + FEATURE_NAMES + ["mood", "energy"])
+        for row in labels:
+            with open(os.path.join(args.audio_dir, row["file"]), "rb") as audio:
+                y = decode_audio(audio.read())
+            if args.vad:
+                # Serving trims silence before extracting features and never scores silent clips
+                voice_activity = detect_voice_activity(
+                    y, TARGET_SAMPLE_RATE,
+                    floor_db=args.vad_floor_db, min_silence_ms=args.vad_min_silence_ms, pad_ms=args.vad_pad_ms,
+                )
+                if voice_activity.silent:
+                    silent.append(row["file"])
+                    continue
+                y = voice_activity.speech
+            features = engine.extract(y)
+            writer.writerow([row["file"]] + [f"{value:.6g}" for value in features] + [row["mood"], row["energy"]])
+            written += 1
+    print(f"Wrote features of {written} recordings to {args.output}")
+    if silent:
+        print(f"Skipped {len(silent)} recordings without speech: {', '.join(silent)}")
+
+
+def train_command(args):
+    features, moods, energies = load_feature_files(args.data)
+    train, test = split(len(moods), args.test_size, args.seed)
+    if len(test) == 0 or len(set(moods[train])) < 2:
+        sys.exit("Not enough labelled clips: need at least two moods and a non-empty test split")
+
+    start = time.perf_counter()
+    classifier = VoiceMoodClassifier.fit(features[train], moods[train], energies[train], c=args.c, alpha=args.alpha)
+    train_seconds = time.perf_counter() - start
+    metrics = classifier.evaluate(features[test], moods[test], energies[test])
+
+    # Batch scoring cost, per clip
+    batch = features[test][: args.batch_size]
+    start = time.perf_counter()
+    for _ in range(20):
+        classifier.predict_batch(batch)
+    metrics["ms_per_clip"] = round(1000 * (time.perf_counter() - start) / (20 * len(batch)), 4)
+    metrics["train_samples"] = int(len(train))
+    metrics["train_seconds"] = round(train_seconds, 3)
+
+    if args.refit:
+        # The held-out score is kept as the estimate; the saved model sees every clip
+        classifier = VoiceMoodClassifier.fit(features, moods, energies, c=args.c, alpha=args.alpha)
+    classifier.metrics = metrics
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    classifier.save(args.output)
+    report(metrics, args.report)
+    print(f"Model written to {args.output}")
+
+
+def evaluate_command(args):
+    classifier = VoiceMoodClassifier.load(args.model)
+    features, moods, energies = load_feature_files(args.data)
+    report(classifier.evaluate(features, moods, energies), args.report)
+
+
+def report(metrics, path):
+    print(f"Samples: {metrics['samples']}  accuracy: {metrics['accuracy']:.3f}  macro F1: {metrics['macro_f1']:.3f}  "
+          f"energy MAE: {metrics['energy_mae']:.2f}")
+    for mood, stats in metrics["moods"].items():
+        print(f"  {mood:<10} support {stats['support']:>5}  recall {stats['recall']:.3f}")
+    if "ms_per_clip" in metrics:
+        print(f"Batch scoring: {metrics['ms_per_clip']} ms per clip")
+    if path:
+        with open(path, "w") as f:
+            json.dump(metrics, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    extract = commands.add_parser("features", help="Extract a feature CSV from labelled recordings")
+    extract.add_argument("--audio-dir", required=True)
+    extract.add_argument("--labels", required=True, help="CSV with file, mood and energy columns")
+    extract.add_argument("--output", required=True)
+    extract.add_argument(
+        "--no-vad", dest="vad", action="store_false", default=os.getenv("VAD_ENABLED", "true").lower() == "true",
+        help="Keep silence in the recordings (only for a service running with VAD_ENABLED=false)",
+    )
+    extract.add_argument("--vad-floor-db", type=float, default=float(os.getenv("VAD_FLOOR_DB", "-50")))
+    extract.add_argument("--vad-min-silence-ms", type=float, default=float(os.getenv("VAD_MIN_SILENCE_MS", "300")))
+    extract.add_argument("--vad-pad-ms", type=float, default=float(os.getenv("VAD_PAD_MS", "150")))
+    extract.set_defaults(run=extract_command)
+
+    train = commands.add_parser("train", help="Train on feature files and report held-out metrics")
+    train.add_argument("--data", nargs="+", required=True, help="Feature files (.csv or .npz)")
+    train.add_argument("--output", default="models/voice_mood.joblib")
+    train.add_argument("--test-size", type=float, default=0.2)
+    train.add_argument("--seed", type=int, default=0)
+    train.add_argument("--c", type=float, default=1.0, help="Inverse regularization of the mood classifier")
+    train.add_argument("--alpha", type=float, default=1.0, help="Regularization of the energy regression")
+    train.add_argument("--batch-size", type=int, default=64, help="Clips per batch when timing scoring")
+    train.add_argument("--refit", action="store_true", help="Refit on all clips after evaluating")
+    train.add_argument("--report", help="Write the metrics as JSON to this file")
+    train.set_defaults(run=train_command)
+
+    evaluate = commands.add_parser("evaluate", help="Evaluate a trained model on feature files")
+    evaluate.add_argument("--model", required=True)
+    evaluate.add_argument("--data", nargs="+", required=True)
+    evaluate.add_argument("--report", help="Write the metrics as JSON to this file")
+    evaluate.set_defaults(run=evaluate_command)
+
+    args = parser.parse_args()
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
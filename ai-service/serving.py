@@ -0,0 +1,99 @@
+import gc
+import logging
+import os
+from typing import Dict, List, Optional
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+def preload_models(registry, max_workers: int = 3):
+    """Load the eager models in a parent process that is about to fork workers.
+
+    Torch runs single-threaded while loading: once the OpenMP thread pool has
+    run a parallel region, forked children deadlock in their first parallel
+    op. Afterwards every object is moved to the permanent GC generation, so
+    the workers' collectors never write to (and un-share) the parent's pages.
+    """
+    torch.set_num_threads(1)
+    registry.load_eager(max_workers)
+    registry.preloaded = True
+    gc.collect()
+    gc.freeze()
+    logger.info("Preloaded models in pid %d: %s", os.getpid(), ", ".join(
+        name for name, spec in registry.specs.items() if spec.pipeline is not None
+    ))
+
+
+def init_worker(num_threads: int):
+    """Set up a worker forked from the preloading parent."""
+    torch.set_num_threads(max(1, num_threads))
+
+
+def read_smaps_rollup(pid="self") -> Dict[str, int]:
+    """Memory counters of a process from /proc/<pid>/smaps_rollup, in bytes (empty off Linux)."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            lines = f.readlines()
+    except OSError:
+        return {}
+    fields = {}
+    for line in lines[1:]:
+        key, value = line.split(":", 1)
+        fields[key] = int(value.split()[0]) * 1024
+    return fields
+
+
+def process_memory(pid="self") -> Dict[str, int]:
+    """RSS, PSS, unique (USS) and shared memory of a process, in bytes.
+
+    USS is what the process would free if it exited; PSS splits each shared
+    page evenly between the processes mapping it, so the PSS of all workers
+    adds up to their real footprint.
+    """
+    fields = read_smaps_rollup(pid)
+    if not fields:
+        return {}
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "uss": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "swap": fields.get("Swap", 0),
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process, found by scanning /proc."""
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields after it are space separated
+        if int(stat.rsplit(")", 1)[1].split()[1]) == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def worker_memory_report(master_pid: int) -> Dict[str, Optional[Dict]]:
+    """Memory of a preforking master and each of its workers, with totals."""
+    master = process_memory(master_pid)
+    workers = {pid: process_memory(pid) for pid in child_pids(master_pid)}
+    workers = {pid: memory for pid, memory in workers.items() if memory}
+    return {
+        "master": {"pid": master_pid, **master},
+        "workers": [{"pid": pid, **memory} for pid, memory in workers.items()],
+        "totals": {
+            "workers": len(workers),
+            # What the same workers would use without sharing, and what they actually use
+            "rss": sum(memory["rss"] for memory in workers.values()) + master.get("rss", 0),
+            "pss": sum(memory["pss"] for memory in workers.values()) + master.get("pss", 0),
+            "uss": sum(memory["uss"] for memory in workers.values()),
+        },
+    }
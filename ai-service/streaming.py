@@ -0,0 +1,134 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+import soxr
+
+from audio import TARGET_SAMPLE_RATE, AudioDecodeError
+
+SAMPLE_FORMATS = {"f32le": np.float32, "s16le": np.int16}
+
+
+def stream_control_type(text: str) -> Any:
+    """The type of a text frame of a voice stream, which must be a JSON object such as {"type": "end"}.
+
+    Raises ValueError for anything else.
+    """
+    try:
+        control = json.loads(text)
+    except ValueError:
+        control = None
+    if not isinstance(control, dict):
+        raise ValueError('Text frames must be JSON objects such as {"type": "end"}')
+    return control.get("type")
+
+
+class StreamingSession:
+    """Audio and transcript state of one streaming voice session.
+
+    The client sends raw PCM frames. Audio is kept at 16 kHz, resampled by
+    one resampler that carries its state across frames, so frame boundaries
+    leave no discontinuities; call ``finish`` once the last frame has arrived
+    to flush the resampler's tail. The part of the audio that
+    has not been committed yet (the pending window) is re-transcribed for each
+    partial result. Once the pending window grows past ``window_seconds`` it
+    is cut at its quietest point near the end, transcribed one final time and
+    committed, so each partial only costs one short Whisper call.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = TARGET_SAMPLE_RATE,
+        sample_format: str = "f32le",
+        window_seconds: float = 20.0,
+        partial_interval_seconds: float = 2.0,
+        max_seconds: float = 600.0,
+    ):
+        if sample_format not in SAMPLE_FORMATS:
+            raise AudioDecodeError(f"Unsupported sample format '{sample_format}', use one of {sorted(SAMPLE_FORMATS)}")
+        if sample_rate <= 0:
+            raise AudioDecodeError("Sample rate must be positive")
+
+        self.sample_rate = sample_rate
+        self.dtype = SAMPLE_FORMATS[sample_format]
+        self.window_samples = int(window_seconds * TARGET_SAMPLE_RATE)
+        self.partial_interval_samples = int(partial_interval_seconds * TARGET_SAMPLE_RATE)
+        self.max_samples = int(max_seconds * TARGET_SAMPLE_RATE)
+
+        self._resampler = None
+        if sample_rate != TARGET_SAMPLE_RATE:
+            self._resampler = soxr.ResampleStream(sample_rate, TARGET_SAMPLE_RATE, 1, dtype="float32", quality="HQ")
+
+        self._audio = np.zeros(TARGET_SAMPLE_RATE * 10, dtype=np.float32)
+        self._length = 0
+        self._committed_samples = 0
+        self._last_partial_samples = 0
+        self._committed_text: List[str] = []
+
+    @property
+    def duration(self) -> float:
+        return self._length / TARGET_SAMPLE_RATE
+
+    def add_frame(self, data: bytes):
+        """Append one frame of raw PCM from the client."""
+        itemsize = np.dtype(self.dtype).itemsize
+        if len(data) % itemsize:
+            raise AudioDecodeError(f"Frame size must be a multiple of {itemsize} bytes")
+
+        samples = np.frombuffer(data, dtype=self.dtype).astype(np.float32)
+        if self.dtype == np.int16:
+            samples /= 32768.0
+        if self._resampler is not None:
+            samples = self._resampler.resample_chunk(samples)
+        self._append(samples)
+
+    def finish(self):
+        """Flush the audio the resampler still holds back; call after the last frame."""
+        if self._resampler is not None:
+            self._append(self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+            self._resampler = None
+
+    def _append(self, samples: np.ndarray):
+        if self._length + len(samples) > self.max_samples:
+            raise AudioDecodeError(f"Recording exceeds the {self.max_samples // TARGET_SAMPLE_RATE} s streaming limit")
+
+        if self._length + len(samples) > len(self._audio):
+            grown = np.zeros(max(2 * len(self._audio), self._length + len(samples)), dtype=np.float32)
+            grown[:self._length] = self._audio[:self._length]
+            self._audio = grown
+        self._audio[self._length:self._length + len(samples)] = samples
+        self._length += len(samples)
+
+    def audio(self) -> np.ndarray:
+        """All audio received so far."""
+        return self._audio[:self._length].copy()
+
+    def partial_due(self) -> bool:
+        return self._length - self._last_partial_samples >= self.partial_interval_samples
+
+    def commit_candidate(self) -> Optional[Tuple[np.ndarray, int]]:
+        """Return the next segment to commit and where it ends, once the window is full."""
+        if self._length - self._committed_samples < self.window_samples:
+            return None
+
+        # Cut in the quietest 50 ms of the last second so words are not split
+        end = self._committed_samples + self.window_samples
+        search_start = end - TARGET_SAMPLE_RATE
+        hop = TARGET_SAMPLE_RATE // 20
+        frames = self._audio[search_start:end][: (TARGET_SAMPLE_RATE // hop) * hop].reshape(-1, hop)
+        cut = search_start + int(np.argmin((frames ** 2).mean(axis=1))) * hop + hop // 2
+        return self._audio[self._committed_samples:cut].copy(), cut
+
+    def commit(self, cut: int, text: str):
+        """Mark audio up to ``cut`` as transcribed with ``text``."""
+        self._committed_samples = cut
+        if text.strip():
+            self._committed_text.append(text.strip())
+
+    def pending_audio(self) -> np.ndarray:
+        """Audio after the last commit, which partial transcripts cover."""
+        self._last_partial_samples = self._length
+        return self._audio[self._committed_samples:self._length].copy()
+
+    def transcript(self, pending_text: str = "") -> str:
+        return " ".join(self._committed_text + ([pending_text.strip()] if pending_text.strip() else []))
@@ -0,0 +1,400 @@
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+MS_PER_DAY = 86400000
+# Latest timestamp accepted, the end of year 9999 in epoch milliseconds
+MAX_TIMESTAMP_MS = 253402300799999
+
+# Recent statistics cover WINDOW_DAYS days; rolling series are reported for the last ROLLING_DAYS days
+WINDOW_DAYS = 7
+ROLLING_DAYS = 28
+
+
+def to_float(value) -> float:
+    """A numeric check-in field as a float, NaN when missing or not a finite number."""
+    if isinstance(value, bool):
+        return np.nan
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return np.nan
+    return value if math.isfinite(value) else np.nan
+
+
+def to_label(value) -> str:
+    """A mood or emotion label, "unknown" when missing or not a string."""
+    return value if isinstance(value, str) and value else "unknown"
+
+
+def parse_timestamps(values: List[Any]) -> np.ndarray:
+    """ISO 8601 timestamps (or epoch milliseconds) as int64 UTC milliseconds.
+
+    Missing or invalid ones, and times before 1970 or after 9999, become -1.
+    """
+    parsed = np.full(len(values), -1, dtype=np.int64)
+    for i, value in enumerate(values):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if math.isfinite(value) and 0 <= value <= MAX_TIMESTAMP_MS:
+                parsed[i] = int(value)
+        elif isinstance(value, str) and value:
+            try:
+                moment = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+                if moment.tzinfo is None:
+                    moment = moment.replace(tzinfo=timezone.utc)
+                timestamp = int(moment.timestamp() * 1000)
+            except (ValueError, OverflowError, OSError):
+                continue
+            if 0 <= timestamp <= MAX_TIMESTAMP_MS:
+                parsed[i] = timestamp
+    return parsed
+
+
+def grouped_sum(keys: np.ndarray, values: np.ndarray, size: int) -> np.ndarray:
+    """Sum values by integer key in [0, size), ignoring NaN values."""
+    valid = ~np.isnan(values)
+    return np.bincount(keys[valid], weights=values[valid], minlength=size)
+
+
+def mean_or_none(total: float, count: float) -> Optional[float]:
+    return round(float(total / count), 2) if count else None
+
+
+def std_or_none(total: float, total_sq: float, count: float) -> Optional[float]:
+    if count < 2:
+        return None
+    variance = max(0.0, (total_sq - total * total / count) / (count - 1))
+    return round(float(np.sqrt(variance)), 2)
+
+
+class Distribution:
+    """Counts of labels (moods or emotions) per day of the week, growing with new labels."""
+
+    def __init__(self):
+        self.labels: Dict[str, int] = {}
+        self.counts = np.zeros((0, 7), dtype=np.int64)
+        self.undated = np.zeros(0, dtype=np.int64)
+
+    def add(self, labels: List[str], weekdays: np.ndarray):
+        """Count labels, with the weekday of each (-1 when the check-in has no date)."""
+        for label in labels:
+            if label not in self.labels:
+                self.labels[label] = len(self.labels)
+        size = len(self.labels)
+        if size > len(self.counts):
+            self.counts = np.vstack([self.counts, np.zeros((size - len(self.counts), 7), dtype=np.int64)])
+            self.undated = np.concatenate([self.undated, np.zeros(size - len(self.undated), dtype=np.int64)])
+
+        index = np.array([self.labels[label] for label in labels], dtype=np.int64)
+        dated = weekdays >= 0
+        np.add.at(self.counts, (index[dated], weekdays[dated]), 1)
+        np.add.at(self.undated, index[~dated], 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"labels": list(self.labels), "counts": self.counts.tolist(), "undated": self.undated.tolist()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Distribution":
+        distribution = cls()
+        distribution.labels = {label: i for i, label in enumerate(data["labels"])}
+        distribution.counts = np.array(data["counts"], dtype=np.int64).reshape(-1, 7)
+        distribution.undated = np.array(data["undated"], dtype=np.int64)
+        return distribution
+
+    def totals(self) -> Dict[str, int]:
+        totals = self.counts.sum(axis=1) + self.undated
+        labels = list(self.labels)
+        return {labels[i]: int(totals[i]) for i in np.argsort(-totals, kind="stable")}
+
+    def by_weekday(self, weekday: int) -> Dict[str, int]:
+        return {label: int(self.counts[i, weekday]) for label, i in self.labels.items() if self.counts[i, weekday]}
+
+
+class SummaryAggregates:
+    """Running aggregates of one user's check-ins.
+
+    Everything a summary needs is kept as sums and counts, so new check-ins are
+    merged in without revisiting the history: mood and energy totals, a least
+    squares fit of mood score against time, per-weekday totals and
+    distributions, and per-day totals for the most recent days (enough to
+    compute rolling windows). Check-ins without a moodScore or energyLevel are
+    counted, but left out of the statistics they lack.
+    """
+
+    def __init__(self, utc_offset_minutes: int = 0):
+        self.utc_offset_minutes = utc_offset_minutes
+        self.count = 0
+        self.last_timestamp = -1
+        self.origin_day: Optional[float] = None
+
+        # [count, sum, sum of squares] of mood score and energy level
+        self.score = np.zeros(3)
+        self.energy = np.zeros(3)
+        # Least squares sums of mood score against days since origin_day: n, St, Stt, Sy, Sty
+        self.trend = np.zeros(5)
+
+        self.weekday_checkins = np.zeros(7)
+        self.weekday_score = np.zeros((2, 7))  # count, sum
+        self.weekday_energy = np.zeros((2, 7))
+        self.moods = Distribution()
+        self.emotions = Distribution()
+
+        # Per-day totals of the last WINDOW_DAYS + ROLLING_DAYS days:
+        # check-ins, score count, score sum, score sum of squares, energy count, energy sum
+        self.days = np.zeros(0, dtype=np.int64)
+        self.daily = np.zeros((6, 0))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The aggregates as JSON-serializable data, so they can be kept in a cache shared by workers."""
+        return {
+            "utc_offset_minutes": self.utc_offset_minutes,
+            "count": self.count,
+            "last_timestamp": int(self.last_timestamp),
+            "origin_day": self.origin_day,
+            "score": self.score.tolist(),
+            "energy": self.energy.tolist(),
+            "trend": self.trend.tolist(),
+            "weekday_checkins": self.weekday_checkins.tolist(),
+            "weekday_score": self.weekday_score.tolist(),
+            "weekday_energy": self.weekday_energy.tolist(),
+            "moods": self.moods.to_dict(),
+            "emotions": self.emotions.to_dict(),
+            "days": self.days.tolist(),
+            "daily": self.daily.tolist(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SummaryAggregates":
+        aggregates = cls(data["utc_offset_minutes"])
+        aggregates.count = data["count"]
+        aggregates.last_timestamp = data["last_timestamp"]
+        aggregates.origin_day = data["origin_day"]
+        for name in ("score", "energy", "trend", "weekday_checkins", "weekday_score", "weekday_energy"):
+            setattr(aggregates, name, np.array(data[name], dtype=float))
+        aggregates.moods = Distribution.from_dict(data["moods"])
+        aggregates.emotions = Distribution.from_dict(data["emotions"])
+        aggregates.days = np.array(data["days"], dtype=np.int64)
+        aggregates.daily = np.array(data["daily"], dtype=float).reshape(6, -1)
+        return aggregates
+
+    def update(self, check_ins: List[Dict[str, Any]]) -> int:
+        """Merge check-ins into the aggregates and return how many were new.
+
+        Dated check-ins at or before the latest one already merged are skipped,
+        so a client may resend overlapping history.
+        """
+        timestamps = parse_timestamps([c.get("createdAt") for c in check_ins])
+        if self.last_timestamp >= 0:
+            keep = (timestamps < 0) | (timestamps > self.last_timestamp)
+            check_ins = [c for c, k in zip(check_ins, keep) if k]
+            timestamps = timestamps[keep]
+        if not check_ins:
+            return 0
+
+        scores = np.array([to_float(c.get("moodScore")) for c in check_ins])
+        energies = np.array([to_float(c.get("energyLevel")) for c in check_ins])
+        self.count += len(check_ins)
+        self.score += self._moments(scores)
+        self.energy += self._moments(energies)
+
+        dated = timestamps >= 0
+        local_ms = timestamps + self.utc_offset_minutes * 60000
+        days = np.where(dated, local_ms // MS_PER_DAY, 0)
+        weekdays = np.where(dated, (days + 3) % 7, -1)  # 1970-01-01 was a Thursday
+
+        self.moods.add([to_label(c.get("mood")) for c in check_ins], weekdays)
+        emotion_labels, emotion_weekdays = [], []
+        for check_in, weekday in zip(check_ins, weekdays):
+            emotions = check_in.get("detectedEmotions")
+            emotions = [e for e in emotions if isinstance(e, str) and e] if isinstance(emotions, list) else []
+            emotion_labels += emotions
+            emotion_weekdays += [weekday] * len(emotions)
+        self.emotions.add(emotion_labels, np.array(emotion_weekdays, dtype=np.int64))
+
+        if dated.any():
+            self._update_dated(local_ms[dated], days[dated], weekdays[dated], scores[dated], energies[dated])
+            self.last_timestamp = max(self.last_timestamp, int(timestamps[dated].max()))
+        return len(check_ins)
+
+    @staticmethod
+    def _moments(values: np.ndarray) -> np.ndarray:
+        values = values[~np.isnan(values)]
+        return np.array([len(values), values.sum(), (values ** 2).sum()])
+
+    def _update_dated(self, local_ms, days, weekdays, scores, energies):
+        if self.origin_day is None:
+            self.origin_day = float(local_ms.min() // MS_PER_DAY)
+        t = local_ms / MS_PER_DAY - self.origin_day
+        scored = ~np.isnan(scores)
+        ts, ys = t[scored], scores[scored]
+        self.trend += [len(ys), ts.sum(), (ts ** 2).sum(), ys.sum(), (ts * ys).sum()]
+
+        self.weekday_checkins += np.bincount(weekdays, minlength=7)
+        self.weekday_score += [np.bincount(weekdays[scored], minlength=7), grouped_sum(weekdays, scores, 7)]
+        has_energy = ~np.isnan(energies)
+        self.weekday_energy += [np.bincount(weekdays[has_energy], minlength=7), grouped_sum(weekdays, energies, 7)]
+
+        # Merge per-day totals, then drop days that fell out of the kept range
+        all_days = np.concatenate([self.days, days])
+        unique_days, index = np.unique(all_days, return_inverse=True)
+        new = np.vstack([
+            np.ones(len(days)),
+            scored.astype(float),
+            np.nan_to_num(scores),
+            np.nan_to_num(scores) ** 2,
+            has_energy.astype(float),
+            np.nan_to_num(energies),
+        ])
+        merged = np.zeros((6, len(unique_days)))
+        np.add.at(merged.T, index, np.hstack([self.daily, new]).T)
+        keep = unique_days > unique_days.max() - (WINDOW_DAYS + ROLLING_DAYS)
+        self.days, self.daily = unique_days[keep], merged[:, keep]
+
+    def slope_per_day(self) -> Optional[float]:
+        n, st, stt, sy, sty = self.trend
+        denominator = n * stt - st * st
+        if n < 2 or denominator <= 1e-9:
+            return None
+        return round(float((n * sty - st * sy) / denominator), 3)
+
+    def dense_daily(self):
+        """Per-day totals as a dense calendar (days without check-ins are zero)."""
+        if not len(self.days):
+            return self.days, self.daily
+        calendar = np.arange(self.days.min(), self.days.max() + 1)
+        dense = np.zeros((6, len(calendar)))
+        dense[:, self.days - calendar[0]] = self.daily
+        return calendar, dense
+
+    def recent(self) -> Dict[str, Any]:
+        """Statistics of the last WINDOW_DAYS days, ending on the latest check-in's day."""
+        calendar, dense = self.dense_daily()
+        window = dense[:, -WINDOW_DAYS:]
+        checkins, score_n, score_sum, score_sq, energy_n, energy_sum = window.sum(axis=1)
+
+        slope = None
+        days = np.arange(window.shape[1], dtype=float)
+        weights = window[1]
+        if weights.sum() >= 3 and (weights > 0).sum() >= 2:
+            means = np.divide(window[2], weights, out=np.zeros_like(weights), where=weights > 0)
+            slope = round(float(np.polyfit(days, means, 1, w=np.sqrt(weights))[0]), 3)
+
+        return {
+            "days": WINDOW_DAYS,
+            "checkIns": int(checkins),
+            "moodScore": mean_or_none(score_sum, score_n),
+            "energyLevel": mean_or_none(energy_sum, energy_n),
+            "moodSlopePerDay": slope,
+            "moodVolatility": std_or_none(score_sum, score_sq, score_n),
+        }
+
+    def rolling(self) -> List[Dict[str, Any]]:
+        """Trailing WINDOW_DAYS-day averages for each of the last ROLLING_DAYS days."""
+        calendar, dense = self.dense_daily()
+        if not len(calendar):
+            return []
+        # Prefix sums over the calendar, led by WINDOW_DAYS empty days so early days get partial windows
+        sums = np.cumsum(np.hstack([np.zeros((6, WINDOW_DAYS + 1)), dense]), axis=1)
+        checkins, score_n, score_sum, score_sq, energy_n, energy_sum = sums[:, WINDOW_DAYS + 1:] - sums[:, 1:-WINDOW_DAYS]
+
+        rows = []
+        for j in range(max(0, len(calendar) - ROLLING_DAYS), len(calendar)):
+            rows.append({
+                "date": str(np.datetime64(int(calendar[j]), "D")),
+                "checkIns": int(checkins[j]),
+                "moodScore": mean_or_none(score_sum[j], score_n[j]),
+                "energyLevel": mean_or_none(energy_sum[j], energy_n[j]),
+                "moodVolatility": std_or_none(score_sum[j], score_sq[j], score_n[j]),
+            })
+        return rows
+
+    def stats(self) -> Dict[str, Any]:
+        by_weekday = {}
+        for i, name in enumerate(WEEKDAYS):
+            if self.weekday_checkins[i]:
+                by_weekday[name] = {
+                    "checkIns": int(self.weekday_checkins[i]),
+                    "moodScore": mean_or_none(self.weekday_score[1, i], self.weekday_score[0, i]),
+                    "energyLevel": mean_or_none(self.weekday_energy[1, i], self.weekday_energy[0, i]),
+                    "moods": self.moods.by_weekday(i),
+                    "emotions": self.emotions.by_weekday(i),
+                }
+
+        return {
+            "checkIns": self.count,
+            "moodScore": mean_or_none(self.score[1], self.score[0]),
+            "energyLevel": mean_or_none(self.energy[1], self.energy[0]),
+            "moodSlopePerDay": self.slope_per_day(),
+            "moodVolatility": std_or_none(self.score[1], self.score[2], self.score[0]),
+            "recent": self.recent(),
+            "rolling": self.rolling(),
+            "byDayOfWeek": by_weekday,
+            "moodDistribution": self.moods.totals(),
+            "emotionDistribution": self.emotions.totals(),
+        }
+
+
+def summary_text(aggregates: SummaryAggregates) -> Dict[str, str]:
+    """Weekly insights and recommendations from the last WINDOW_DAYS days (or all check-ins if undated)."""
+    recent = aggregates.recent() if len(aggregates.days) else None
+    if recent and recent["checkIns"]:
+        avg_score, avg_energy, slope = recent["moodScore"], recent["energyLevel"], recent["moodSlopePerDay"]
+    else:
+        avg_score = mean_or_none(aggregates.score[1], aggregates.score[0])
+        avg_energy = mean_or_none(aggregates.energy[1], aggregates.energy[0])
+        slope = None
+    totals = aggregates.moods.totals()
+    totals.pop("unknown", None)
+    most_common_mood = next(iter(totals), "neutral")
+
+    # Generate insights
+    if avg_score is not None:
+        insights = f"This week, your average mood score was {avg_score:.1f}/10"
+    else:
+        insights = "This week, no mood scores were recorded"
+    if avg_energy is not None:
+        insights += f" and your average energy level was {avg_energy:.1f}/10. "
+    else:
+        insights += " and no energy levels were recorded. "
+    insights += f"You most frequently reported feeling {most_common_mood}. "
+
+    # Add trend analysis: the fitted change in mood score over the week
+    if slope is not None:
+        if slope * WINDOW_DAYS >= 0.5:
+            insights += "Your mood has been improving over the week. "
+        elif slope * WINDOW_DAYS <= -0.5:
+            insights += "Your mood has slightly declined over the week. "
+        else:
+            insights += "Your mood has remained relatively stable. "
+
+    # Add recommendations based on mood patterns
+    recommendations = "Based on your mood patterns this week, consider the following:\n\n"
+
+    if avg_score is None:
+        pass
+    elif avg_score < 4:
+        recommendations += "• Your mood has been on the lower side. Consider scheduling time with a trusted friend or mental health professional.\n"
+        recommendations += "• Set aside time each day for self-care activities that have helped you feel better in the past.\n"
+        recommendations += "• Ensure you're getting adequate sleep, nutrition, and some light physical activity.\n"
+    elif avg_score < 7:
+        recommendations += "• Your mood has been moderate. Pay attention to what activities boost your mood and try to incorporate more of them.\n"
+        recommendations += "• Practice mindfulness or meditation to help maintain emotional balance.\n"
+        recommendations += "• Consider setting small, achievable goals to build momentum and confidence.\n"
+    else:
+        recommendations += "• Your mood has been positive! Reflect on what's working well and continue these practices.\n"
+        recommendations += "• Share your positive energy with others through acts of kindness or connection.\n"
+        recommendations += "• Document what's going well to reference during more challenging times.\n"
+
+    if avg_energy is None:
+        pass
+    elif avg_energy < 4:
+        recommendations += "• Your energy has been low. Check your sleep quality and quantity.\n"
+        recommendations += "• Consider gentle exercise like walking or stretching to naturally boost energy.\n"
+    elif avg_energy > 7:
+        recommendations += "• You've had high energy. Channel this productively into activities that matter to you.\n"
+        recommendations += "• Ensure you're also building in adequate rest periods to sustain your energy.\n"
+
+    return {"insights": insights, "recommendations": recommendations}
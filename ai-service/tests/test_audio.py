@@ -0,0 +1,85 @@
+import io
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio import TARGET_SAMPLE_RATE, AudioDecodeError, AudioTooLargeError, IncrementalDecoder
+
+
+def encode(seconds, sr, format, chunk_seconds=10):
+    """A sine tone in a soundfile container, written in blocks."""
+    data = io.BytesIO()
+    with sf.SoundFile(data, "w", samplerate=sr, channels=1, format=format) as f:
+        for start in np.arange(0, seconds, chunk_seconds):
+            t = np.arange(int(min(chunk_seconds, seconds - start) * sr)) / sr
+            f.write((0.3 * np.sin(2 * np.pi * 220 * t)).astype(np.float32))
+    return data.getvalue()
+
+
+def feed(decoder, payload, chunk_size=65536):
+    for start in range(0, len(payload), chunk_size):
+        decoder.feed(payload[start:start + chunk_size])
+
+
+def test_wav_is_decoded_and_resampled():
+    decoder = IncrementalDecoder(max_seconds=10)
+    feed(decoder, encode(2, 8000, "WAV"), chunk_size=1000)
+    try:
+        y = decoder.finish()
+    finally:
+        decoder.close()
+    assert y.dtype == np.float32
+    assert abs(len(y) - 2 * TARGET_SAMPLE_RATE) <= 1
+
+
+def test_long_wav_is_rejected_from_its_header():
+    payload = encode(20, TARGET_SAMPLE_RATE, "WAV")
+    decoder = IncrementalDecoder(max_seconds=10)
+    try:
+        with pytest.raises(AudioTooLargeError):
+            decoder.feed(payload[:4096])
+    finally:
+        decoder.close()
+
+
+def test_upload_over_the_byte_limit_is_rejected():
+    decoder = IncrementalDecoder(max_bytes=1000)
+    try:
+        with pytest.raises(AudioTooLargeError):
+            feed(decoder, encode(1, 8000, "WAV"), chunk_size=500)
+    finally:
+        decoder.close()
+
+
+def test_ogg_without_declared_duration_is_rejected_before_decoding(tmp_path):
+    # OGG headers carry no duration, so the length libsndfile reports is checked in finish()
+    path = tmp_path / "long.ogg"
+    with sf.SoundFile(str(path), "w", samplerate=48000, channels=1, format="OGG") as f:
+        for _ in range(12):
+            f.write(np.zeros(10 * 48000, dtype=np.float32))
+    decoder = IncrementalDecoder(max_seconds=60)
+    try:
+        feed(decoder, path.read_bytes())
+        with pytest.raises(AudioTooLargeError):
+            decoder.finish()
+    finally:
+        decoder.close()
+
+
+def test_short_ogg_is_decoded(tmp_path):
+    path = tmp_path / "short.ogg"
+    with sf.SoundFile(str(path), "w", samplerate=TARGET_SAMPLE_RATE, channels=1, format="OGG") as f:
+        f.write(np.zeros(TARGET_SAMPLE_RATE, dtype=np.float32))
+    decoder = IncrementalDecoder(max_seconds=60)
+    try:
+        feed(decoder, path.read_bytes(), chunk_size=4096)
+        assert abs(len(decoder.finish()) - TARGET_SAMPLE_RATE) <= 1
+    finally:
+        decoder.close()
+
+
+def test_empty_upload_is_rejected():
+    decoder = IncrementalDecoder()
+    with pytest.raises(AudioDecodeError, match="empty"):
+        decoder.finish()
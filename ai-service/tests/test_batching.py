@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from batching import MicroBatcher
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_calls_share_a_batch():
+    batches = []
+
+    def double(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert run(scenario()) == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_full_batches_do_not_wait():
+    batches = []
+
+    def identity(items):
+        batches.append(len(items))
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(identity, max_batch_size=2, max_wait_ms=10000)
+        return await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(4))), timeout=5)
+
+    assert run(scenario()) == [0, 1, 2, 3]
+    assert batches == [2, 2]
+
+
+def test_errors_reach_every_caller():
+    def fail(items):
+        raise RuntimeError("model failed")
+
+    async def scenario():
+        batcher = MicroBatcher(fail, max_wait_ms=1)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_wrong_result_count_is_an_error():
+    async def scenario():
+        batcher = MicroBatcher(lambda items: items[:1], max_wait_ms=1)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+
+    results = run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+class FullQueue:
+    def check_capacity(self):
+        raise OverflowError("queue full")
+
+
+def test_full_queue_fails_before_batching():
+    async def scenario():
+        batcher = MicroBatcher(lambda items: items, queue=FullQueue())
+        await batcher.submit(1)
+
+    with pytest.raises(OverflowError):
+        run(scenario())
@@ -0,0 +1,130 @@
+import asyncio
+import io
+import json
+
+import pytest
+
+import bulk
+from bulk import BodyTooLargeError, BulkItemError, iter_json_array, iter_ndjson, load_bulk_items, spool_request_body
+
+
+def parse(text, chunk_size=None, monkeypatch=None):
+    if chunk_size is not None:
+        monkeypatch.setattr(bulk, "READ_CHUNK_SIZE", chunk_size)
+    return list(iter_json_array(io.BytesIO(text.encode("utf-8"))))
+
+
+VALID = [
+    "[]",
+    " [ ]\n",
+    "[1, 2.5, -3e2, true, false, null]",
+    '[{"text": "a ] } [ { \\" b"}, "\\\\", [1, [2, {}]]]',
+    '["é✓ unicode across chunk boundaries", {"id": 1, "text": "x"}]',
+]
+
+INVALID = [
+    "[1 2]",
+    "[1,,2]",
+    "[1,]",
+    "[,1]",
+    "[1] [2]",
+    "[1",
+    '{"text": "not an array"}',
+    '[{"a": 1]',
+    "[}",
+    "[tru]",
+    '["unterminated',
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 5, 64 * 1024])
+@pytest.mark.parametrize("text", VALID)
+def test_json_array_matches_json_loads(text, chunk_size, monkeypatch):
+    assert parse(text, chunk_size, monkeypatch) == json.loads(text)
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 64 * 1024])
+@pytest.mark.parametrize("text", INVALID)
+def test_malformed_json_array_is_rejected(text, chunk_size, monkeypatch):
+    with pytest.raises(ValueError):
+        parse(text, chunk_size, monkeypatch)
+
+
+def test_error_reports_position_in_the_whole_body(monkeypatch):
+    with pytest.raises(ValueError, match="character 12"):
+        parse('["abcdefgh" 1]', 4, monkeypatch)
+
+
+def test_element_larger_than_a_read(monkeypatch):
+    monkeypatch.setattr(bulk, "READ_CHUNK_SIZE", 1024)
+    items = [{"text": "x" * 100000}, "after", {"text": "y" * 5000, "nested": ["]" * 3000]}]
+    assert list(iter_json_array(io.BytesIO(json.dumps(items).encode()))) == items
+
+
+def test_large_element_is_scanned_once(monkeypatch):
+    monkeypatch.setattr(bulk, "READ_CHUNK_SIZE", 1024)
+    calls = []
+    decode = json.JSONDecoder.raw_decode
+
+    def counting(self, s, idx=0):
+        calls.append(idx)
+        return decode(self, s, idx)
+
+    monkeypatch.setattr(json.JSONDecoder, "raw_decode", counting)
+    body = json.dumps([{"text": "x" * 200000}]).encode()
+    assert len(list(iter_json_array(io.BytesIO(body)))) == 1
+    assert len(calls) == 1
+
+
+def test_load_bulk_items_returns_parsed_array():
+    body = io.BytesIO(b'  [{"text": "a"}, "b"]')
+    assert load_bulk_items(body, "application/json") == [{"text": "a"}, "b"]
+
+
+def test_load_bulk_items_rejects_malformed_array_up_front():
+    with pytest.raises(ValueError):
+        load_bulk_items(io.BytesIO(b'[{"text": "a"} {"text": "b"}]'), "application/json")
+
+
+def test_ndjson_bad_line_only_fails_its_item():
+    items = list(load_bulk_items(io.BytesIO(b'{"text": "a"}\n\nnot json\n"b"\n'), "application/x-ndjson"))
+    assert items[0] == {"text": "a"}
+    assert isinstance(items[1], BulkItemError)
+    assert items[2] == "b"
+
+
+def test_array_with_ndjson_content_type_is_read_as_ndjson():
+    assert list(load_bulk_items(io.BytesIO(b"[1, 2]\n[3]\n"), "application/x-ndjson")) == [[1, 2], [3]]
+    assert list(iter_ndjson(io.BytesIO(b"1\n2\n"))) == [1, 2]
+
+
+def test_empty_body_is_rejected():
+    with pytest.raises(ValueError, match="empty"):
+        load_bulk_items(io.BytesIO(b" \n "), "")
+
+
+class FakeRequest:
+    def __init__(self, chunks, content_length=None):
+        self.chunks = chunks
+        self.headers = {} if content_length is None else {"content-length": str(content_length)}
+
+    async def stream(self):
+        for chunk in self.chunks:
+            yield chunk
+
+
+def test_spool_request_body():
+    body = asyncio.run(spool_request_body(FakeRequest([b"[1, ", b"2]"]), max_bytes=100))
+    assert body.read() == b"[1, 2]"
+
+
+def test_spool_rejects_declared_length_before_reading():
+    request = FakeRequest([], content_length=101)
+    with pytest.raises(BodyTooLargeError):
+        asyncio.run(spool_request_body(request, max_bytes=100))
+
+
+def test_spool_rejects_streamed_body_over_limit():
+    request = FakeRequest([b"x" * 60, b"x" * 60])
+    with pytest.raises(BodyTooLargeError):
+        asyncio.run(spool_request_body(request, max_bytes=100))
@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+import numpy as np
+
+from cache import ResultCache, SqliteCacheBackend, audio_cache_key, normalize_text, text_cache_key
+
+
+def test_text_keys_ignore_trivial_differences():
+    assert normalize_text("  I  feel\tfine\n") == "I feel fine"
+    assert text_cache_key("I feel ﬁne") == text_cache_key(" I feel fine ")
+    assert text_cache_key("fine") != text_cache_key("fine", namespace="other")
+
+
+def test_audio_keys_hash_16_bit_pcm():
+    waveform = (np.arange(-1000, 1000) / 32768).astype(np.float32)
+    assert audio_cache_key(waveform) == audio_cache_key(waveform + 1e-6)
+    assert audio_cache_key(waveform) != audio_cache_key(waveform[::-1])
+
+
+def test_lru_eviction_and_counters():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats["entries"], stats["hits"], stats["misses"]) == (2, 3, 1)
+
+
+def test_entries_expire():
+    cache = ResultCache(ttl_seconds=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+
+
+def test_values_are_copied():
+    cache = ResultCache()
+    value = {"emotions": ["joy"]}
+    cache.set("a", value)
+    value["emotions"].append("fear")
+    cache.get("a")["emotions"].append("anger")
+    assert cache.get("a") == {"emotions": ["joy"]}
+
+
+def test_shared_backend_hits_across_caches(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    writer = ResultCache(backend=SqliteCacheBackend(path))
+    reader = ResultCache(backend=SqliteCacheBackend(path))
+    writer.set("a", {"mood": "calm"})
+    assert reader.get("a") == {"mood": "calm"}
+    assert reader.get("a") == {"mood": "calm"}
+    assert reader.stats()["shared_hits"] == 1
+
+
+def test_local_copy_keeps_the_shared_expiry(tmp_path):
+    backend = SqliteCacheBackend(str(tmp_path / "cache.sqlite"), ttl_seconds=0.1)
+    ResultCache(backend=backend).set("a", 1)
+    reader = ResultCache(ttl_seconds=3600, backend=backend)
+    assert reader.get("a") == 1
+    time.sleep(0.12)
+    assert reader.get("a") is None
+
+
+def test_async_access_runs_off_the_event_loop(tmp_path):
+    backend = SqliteCacheBackend(str(tmp_path / "cache.sqlite"))
+    cache = ResultCache(backend=backend)
+
+    async def scenario():
+        await cache.aset("a", [1, 2])
+        other = ResultCache(backend=backend)
+        return await other.aget("a"), await other.aget("missing")
+
+    assert asyncio.run(scenario()) == ([1, 2], None)
+
+
+def test_set_if_version_is_compare_and_set(tmp_path):
+    backend = SqliteCacheBackend(str(tmp_path / "cache.sqlite"))
+    assert backend.set_if_version("user", {"version": 1, "count": 1}, None)
+    assert not backend.set_if_version("user", {"version": 1, "count": 5}, None)
+    assert backend.set_if_version("user", {"version": 2, "count": 2}, 1)
+    assert not backend.set_if_version("user", {"version": 2, "count": 9}, 1)
+    assert backend.get("user") == {"version": 2, "count": 2}
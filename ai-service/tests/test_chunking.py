@@ -0,0 +1,92 @@
+import re
+
+from chunking import allocate_windows, chunk_documents, combine_scores, spread, window_starts
+
+
+def whitespace_tokenizer(texts, **kwargs):
+    """Stands in for a fast tokenizer: one token per word, with character offsets."""
+    return {"offset_mapping": [[match.span() for match in re.finditer(r"\S+", text)] for text in texts]}
+
+
+def words(count, start=0):
+    return " ".join(f"w{i}" for i in range(start, start + count))
+
+
+def test_window_starts_cover_the_document():
+    assert window_starts(10, 16, 4) == [0]
+    starts = window_starts(100, 16, 4)
+    assert starts[0] == 0 and starts[-1] == 100 - 16
+    assert all(b - a <= 12 for a, b in zip(starts, starts[1:]))
+
+
+def test_allocate_windows_keeps_short_documents_whole():
+    assert allocate_windows([1, 2, 3], 10) == [1, 2, 3]
+    assert allocate_windows([1, 2, 20], 10) == [1, 2, 7]
+    assert allocate_windows([8, 8, 8], 10) == [4, 3, 3]
+
+
+def test_allocate_windows_gives_every_document_one_window():
+    assert allocate_windows([5, 5, 5], 1) == [1, 1, 1]
+
+
+def test_spread_keeps_first_and_last():
+    assert spread(list(range(9)), 3) == [0, 4, 8]
+    assert spread(list(range(3)), 5) == [0, 1, 2]
+
+
+def test_short_text_is_one_window():
+    [document] = chunk_documents(whitespace_tokenizer, ["a short text"], window=16, overlap=4, max_tokens=64)
+    assert document.texts == ["a short text"]
+    assert document.tokens == 3
+    assert not document.sampled
+
+
+def test_long_text_windows_overlap():
+    text = words(40)
+    [document] = chunk_documents(whitespace_tokenizer, [text], window=16, overlap=4, max_tokens=1000)
+    assert document.texts[0].startswith("w0 ") and document.texts[-1].endswith("w39")
+    assert all(len(chunk.split()) <= 16 for chunk in document.texts)
+    # Consecutive windows share their overlap
+    assert document.texts[0].split()[-4:] == document.texts[1].split()[:4]
+    assert not document.sampled
+
+
+def test_text_over_its_token_budget_is_sampled():
+    text = words(60)
+    [document] = chunk_documents(whitespace_tokenizer, [text], window=16, overlap=4, max_tokens=48)
+    assert len(document.texts) == 3
+    assert document.texts[0].startswith("w0 ") and document.texts[-1].endswith("w59")
+    assert document.sampled
+
+
+def test_very_long_text_is_only_tokenized_in_pieces():
+    text = words(5000)
+    seen = []
+
+    def tokenizer(texts, **kwargs):
+        seen.extend(texts)
+        return whitespace_tokenizer(texts, **kwargs)
+
+    [document] = chunk_documents(tokenizer, [text], window=16, overlap=4, max_tokens=32)
+    assert len(document.texts) == 2
+    assert max(len(piece) for piece in seen) < len(text)
+    assert document.tokens > 1000
+    assert document.sampled
+
+
+def test_batch_budget_favours_short_texts():
+    texts = ["short one", words(100), words(100, start=100)]
+    documents = chunk_documents(whitespace_tokenizer, texts, window=16, overlap=0, max_tokens=1000, max_batch_tokens=5 * 16)
+    assert documents[0].texts == ["short one"]
+    assert sum(len(document.texts) for document in documents) <= 5
+    assert documents[1].sampled and documents[2].sampled
+
+
+def test_combine_scores_weights_by_length():
+    results = [
+        [{"label": "joy", "score": 1.0}, {"label": "sadness", "score": 0.0}],
+        [{"label": "joy", "score": 0.0}, {"label": "sadness", "score": 1.0}],
+    ]
+    combined = combine_scores(results, [3, 1])
+    assert combined[0] == {"label": "joy", "score": 0.75}
+    assert combined[1] == {"label": "sadness", "score": 0.25}
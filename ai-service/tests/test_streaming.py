@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+from audio import TARGET_SAMPLE_RATE, AudioDecodeError
+from streaming import StreamingSession, stream_control_type
+
+
+def tone(seconds, sr=TARGET_SAMPLE_RATE, amplitude=0.5):
+    t = np.arange(int(seconds * sr)) / sr
+    return (amplitude * np.sin(2 * np.pi * 220 * t)).astype(np.float32)
+
+
+def test_control_frames():
+    assert stream_control_type('{"type": "end"}') == "end"
+    assert stream_control_type('{"type": "ping"}') == "ping"
+    assert stream_control_type("{}") is None
+
+
+@pytest.mark.parametrize("text", ["[1]", '"end"', "1", "null", "not json", ""])
+def test_control_frames_must_be_json_objects(text):
+    with pytest.raises(ValueError, match="JSON objects"):
+        stream_control_type(text)
+
+
+def test_frames_are_appended():
+    session = StreamingSession()
+    session.add_frame(tone(0.5).tobytes())
+    session.add_frame(b"")
+    assert session.duration == 0.5
+
+
+def test_int16_frames_are_scaled():
+    session = StreamingSession(sample_format="s16le")
+    session.add_frame(np.array([16384, -32768], dtype=np.int16).tobytes())
+    assert session.audio().tolist() == [0.5, -1.0]
+
+
+def test_bad_frames_and_formats_are_rejected():
+    with pytest.raises(AudioDecodeError):
+        StreamingSession(sample_format="mp3")
+    with pytest.raises(AudioDecodeError):
+        StreamingSession(sample_rate=0)
+    with pytest.raises(AudioDecodeError, match="multiple of 4"):
+        StreamingSession().add_frame(b"\x00" * 6)
+
+
+def test_recording_over_the_limit_is_rejected():
+    session = StreamingSession(max_seconds=1)
+    session.add_frame(tone(1).tobytes())
+    with pytest.raises(AudioDecodeError, match="streaming limit"):
+        session.add_frame(tone(0.1).tobytes())
+
+
+def test_resampled_stream_keeps_its_length():
+    session = StreamingSession(sample_rate=48000)
+    audio = tone(2, sr=48000)
+    for start in range(0, len(audio), 4800):
+        session.add_frame(audio[start:start + 4800].tobytes())
+    session.finish()
+    assert abs(len(session.audio()) - 2 * TARGET_SAMPLE_RATE) <= 1
+    # Frame boundaries leave no clicks: the resampled tone stays within its amplitude
+    assert np.abs(session.audio()).max() < 0.55
+
+
+def test_commit_cuts_in_the_quietest_part():
+    session = StreamingSession(window_seconds=4)
+    audio = tone(5)
+    quiet = int(3.5 * TARGET_SAMPLE_RATE)
+    audio[quiet:quiet + TARGET_SAMPLE_RATE // 10] = 0
+    session.add_frame(audio[:TARGET_SAMPLE_RATE].tobytes())
+    assert session.commit_candidate() is None
+
+    session.add_frame(audio[TARGET_SAMPLE_RATE:].tobytes())
+    segment, cut = session.commit_candidate()
+    assert quiet <= cut <= quiet + TARGET_SAMPLE_RATE // 10
+    assert len(segment) == cut
+
+    session.commit(cut, " first part ")
+    assert len(session.pending_audio()) == len(audio) - cut
+    assert session.commit_candidate() is None
+    assert session.transcript(" second ") == "first part second"
+
+
+def test_partials_are_due_every_interval():
+    session = StreamingSession(partial_interval_seconds=1)
+    session.add_frame(tone(0.5).tobytes())
+    assert not session.partial_due()
+    session.add_frame(tone(0.5).tobytes())
+    assert session.partial_due()
+    session.pending_audio()
+    assert not session.partial_due()
+
+
+def test_empty_commit_adds_no_text():
+    session = StreamingSession(window_seconds=2)
+    session.add_frame(np.zeros(3 * TARGET_SAMPLE_RATE, dtype=np.float32).tobytes())
+    _, cut = session.commit_candidate()
+    session.commit(cut, "  ")
+    assert session.transcript() == ""
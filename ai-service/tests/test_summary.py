@@ -0,0 +1,114 @@
+import json
+
+import numpy as np
+
+from summary import MS_PER_DAY, SummaryAggregates, parse_timestamps, summary_text, to_float, to_label
+
+DAY0 = 19723 * MS_PER_DAY  # 2024-01-01, a Monday
+
+
+def check_in(day, score, energy=5, mood="happy", emotions=("joy",), hour=12):
+    return {
+        "createdAt": DAY0 + day * MS_PER_DAY + hour * 3600000,
+        "moodScore": score,
+        "energyLevel": energy,
+        "mood": mood,
+        "detectedEmotions": list(emotions),
+    }
+
+
+def test_parse_timestamps():
+    parsed = parse_timestamps([
+        "2024-01-01T00:00:00Z",
+        "2024-01-01T01:00:00+01:00",
+        "2024-01-01T00:00:00",
+        1704067200000,
+        "yesterday",
+        None,
+        True,
+    ])
+    assert parsed.tolist() == [1704067200000] * 4 + [-1, -1, -1]
+
+
+def test_parse_timestamps_rejects_non_finite_and_out_of_range_numbers():
+    parsed = parse_timestamps([float("nan"), float("inf"), 1e30, -5, "9999-12-31T23:59:59Z", "0001-01-01T00:00:00Z"])
+    assert parsed.tolist() == [-1, -1, -1, -1, 253402300799000, -1]
+
+
+def test_field_coercion():
+    assert to_float("7") == 7.0
+    assert np.isnan(to_float(float("nan")))
+    assert np.isnan(to_float("1e999"))
+    assert np.isnan(to_float(True))
+    assert np.isnan(to_float({"score": 1}))
+    assert to_label("calm") == "calm"
+    assert to_label(["calm"]) == "unknown"
+    assert to_label("") == "unknown"
+
+
+def test_stats():
+    aggregates = SummaryAggregates()
+    aggregates.update([check_in(0, 4, mood="sad"), check_in(1, 6), check_in(2, 8)])
+    stats = aggregates.stats()
+    assert stats["checkIns"] == 3
+    assert stats["moodScore"] == 6.0
+    assert stats["moodSlopePerDay"] == 2.0
+    assert stats["moodDistribution"] == {"happy": 2, "sad": 1}
+    assert stats["byDayOfWeek"]["Monday"]["moods"] == {"sad": 1}
+    assert stats["recent"]["checkIns"] == 3
+    assert [row["date"] for row in stats["rolling"]] == ["2024-01-01", "2024-01-02", "2024-01-03"]
+
+
+def test_incremental_update_matches_a_single_update():
+    check_ins = [check_in(day, score) for day, score in enumerate([3, 5, 4, 7, 8, 6, 9, 2, 5, 6])]
+    whole = SummaryAggregates()
+    whole.update(check_ins)
+
+    incremental = SummaryAggregates()
+    incremental.update(check_ins[:4])
+    # Overlapping history is skipped, not counted twice
+    assert incremental.update(check_ins[2:7]) == 3
+    assert incremental.update(check_ins[7:]) == 3
+    assert incremental.stats() == whole.stats()
+
+
+def test_serialized_aggregates_round_trip():
+    aggregates = SummaryAggregates(utc_offset_minutes=60)
+    aggregates.update([check_in(0, 4), check_in(3, 7, mood="calm")])
+    restored = SummaryAggregates.from_dict(json.loads(json.dumps(aggregates.to_dict())))
+    assert restored.stats() == aggregates.stats()
+    restored.update([check_in(4, 9)])
+    assert restored.stats()["checkIns"] == 3
+
+
+def test_invalid_fields_are_skipped():
+    aggregates = SummaryAggregates()
+    added = aggregates.update([
+        {"createdAt": float("nan"), "moodScore": "high", "mood": ["happy"], "detectedEmotions": "joy"},
+        {"createdAt": 1e30, "moodScore": 5, "energyLevel": float("inf"), "mood": 3},
+        check_in(0, 7, emotions=("joy", 5, None)),
+    ])
+    assert added == 3
+    stats = aggregates.stats()
+    assert stats["checkIns"] == 3
+    assert stats["moodScore"] == 6.0
+    assert stats["energyLevel"] == 5.0
+    assert stats["moodDistribution"] == {"unknown": 2, "happy": 1}
+    assert stats["emotionDistribution"] == {"joy": 1}
+
+
+def test_summary_text():
+    aggregates = SummaryAggregates()
+    aggregates.update([check_in(day, 8, energy=8) for day in range(3)])
+    text = summary_text(aggregates)
+    assert "average mood score was 8.0/10" in text["insights"]
+    assert "feeling happy" in text["insights"]
+    assert "positive" in text["recommendations"]
+
+
+def test_summary_text_without_scores():
+    aggregates = SummaryAggregates()
+    aggregates.update([{"mood": "tired"}])
+    text = summary_text(aggregates)
+    assert "no mood scores were recorded" in text["insights"]
+    assert "feeling tired" in text["insights"]
@@ -0,0 +1,65 @@
+import numpy as np
+
+from vad import detect_voice_activity, frame_energy_db, runs
+
+SR = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    t = np.arange(int(seconds * SR)) / SR
+    return (amplitude * np.sin(2 * np.pi * 200 * t)).astype(np.float32)
+
+
+def silence(seconds):
+    return np.zeros(int(seconds * SR), dtype=np.float32)
+
+
+def test_runs():
+    assert runs(np.array([True, True, False, True])).tolist() == [[0, 2], [3, 4]]
+    assert runs(np.array([False, False])).tolist() == []
+
+
+def test_frame_energy_db():
+    levels = frame_energy_db(np.ones(1000, dtype=np.float32), 100, 50)
+    assert len(levels) == 19
+    assert np.allclose(levels, 0.0)
+    assert frame_energy_db(np.zeros(10, dtype=np.float32), 100, 50)[0] == -120.0
+
+
+def test_silence_is_silent():
+    activity = detect_voice_activity(silence(2), SR)
+    assert activity.silent
+    assert len(activity.speech) == 0
+    assert activity.summary()["trimmed_fraction"] == 1.0
+
+
+def test_leading_and_trailing_silence_is_trimmed():
+    y = np.concatenate([silence(1), tone(1), silence(1)])
+    activity = detect_voice_activity(y, SR, pad_ms=100)
+    assert len(activity.segments) == 1
+    begin, end = activity.segments[0]
+    assert abs(begin - 0.9 * SR) < 0.05 * SR
+    assert abs(end - 2.1 * SR) < 0.05 * SR
+    assert abs(activity.trimmed_fraction - 0.6) < 0.05
+
+
+def test_short_pauses_are_kept():
+    y = np.concatenate([silence(1), tone(0.5), silence(0.2), tone(0.5), silence(1)])
+    assert len(detect_voice_activity(y, SR, min_silence_ms=300).segments) == 1
+    assert len(detect_voice_activity(y, SR, min_silence_ms=100, pad_ms=0).segments) == 2
+
+
+def test_short_bursts_are_dropped():
+    y = np.concatenate([silence(1), tone(0.03), silence(1)])
+    assert detect_voice_activity(y, SR, min_speech_ms=100).silent
+
+
+def test_quiet_audio_under_the_floor_is_silence():
+    assert detect_voice_activity(tone(1, amplitude=1e-4), SR, floor_db=-50).silent
+
+
+def test_continuous_speech_is_returned_whole():
+    y = tone(1)
+    activity = detect_voice_activity(y, SR)
+    assert activity.segments == [(0, len(y))]
+    assert np.array_equal(activity.speech, y)
@@ -0,0 +1,88 @@
+from typing import AsyncIterator, List
+
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+from audio import AudioDecodeError
+
+
+class MultipartFileReader:
+    """Pull the content of one file field out of a multipart/form-data body as it arrives."""
+
+    def __init__(self, boundary: bytes, field: str):
+        self.field = field
+        self.found = False
+        self._chunks: List[bytes] = []
+        self._in_field = False
+        self._header_field = b""
+        self._header_value = b""
+        self._headers = {}
+        self._parser = MultipartParser(boundary, callbacks={
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """Parse the next piece of the body and return the file content found in it."""
+        try:
+            self._parser.write(data)
+        except MultipartParseError as e:
+            raise AudioDecodeError(f"Malformed multipart body: {e}")
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        # Only the first part with the field name is read
+        self._in_field = not self.found and options.get(b"name", b"").decode("latin-1") == self.field
+        self.found = self.found or self._in_field
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._in_field:
+            self._chunks.append(bytes(data[start:end]))
+
+    def _on_part_end(self):
+        self._in_field = False
+
+
+async def upload_chunks(request, field: str = "audio") -> AsyncIterator[bytes]:
+    """Yield the bytes of an uploaded file while the request body is received.
+
+    The file is read from the ``field`` part of a multipart/form-data body, or
+    the whole body is the file when it is sent with an ``audio/*`` or
+    ``application/octet-stream`` content type.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    if content_type == b"multipart/form-data":
+        if not options.get(b"boundary"):
+            raise AudioDecodeError("Multipart body without a boundary")
+        reader = MultipartFileReader(options[b"boundary"], field)
+        async for data in request.stream():
+            for chunk in reader.feed(data):
+                yield chunk
+        if not reader.found:
+            raise AudioDecodeError(f"Form field '{field}' with the audio file is required")
+    elif content_type.startswith(b"audio/") or content_type == b"application/octet-stream":
+        async for data in request.stream():
+            yield data
+    else:
+        raise AudioDecodeError("Send the audio as multipart/form-data or as the raw request body")
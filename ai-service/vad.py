@@ -0,0 +1,101 @@
+from typing import List, Tuple
+
+import numpy as np
+
+
+class VoiceActivity:
+    """Speech segments found in a clip, and the speech-only audio."""
+
+    def __init__(self, segments: List[Tuple[int, int]], speech: np.ndarray, total_samples: int, sr: int):
+        self.segments = segments
+        self.speech = speech
+        self.total_samples = total_samples
+        self.sr = sr
+
+    @property
+    def silent(self) -> bool:
+        return not self.segments
+
+    @property
+    def trimmed_fraction(self) -> float:
+        return 1.0 - len(self.speech) / self.total_samples if self.total_samples else 1.0
+
+    def summary(self):
+        return {
+            "silent": self.silent,
+            "speech_seconds": round(len(self.speech) / self.sr, 2),
+            "total_seconds": round(self.total_samples / self.sr, 2),
+            "trimmed_fraction": round(self.trimmed_fraction, 3),
+            "segments": len(self.segments),
+        }
+
+
+def frame_energy_db(y: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """RMS level of each frame in dBFS, from a running sum of squares."""
+    if len(y) < frame_length:
+        y = np.pad(y, (0, frame_length - len(y)))
+    energy = np.concatenate(([0.0], np.cumsum(y.astype(np.float64) ** 2)))
+    starts = np.arange(0, len(y) - frame_length + 1, hop_length)
+    mean_square = (energy[starts + frame_length] - energy[starts]) / frame_length
+    return 10.0 * np.log10(np.maximum(mean_square, 1e-12))
+
+
+def runs(mask: np.ndarray) -> np.ndarray:
+    """(start, stop) frame indices of each run of True values."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.stack([np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)], axis=1)
+
+
+def detect_voice_activity(
+    y: np.ndarray,
+    sr: int,
+    floor_db: float = -50.0,
+    margin_db: float = 10.0,
+    dynamic_range_db: float = 30.0,
+    min_speech_ms: float = 100.0,
+    min_silence_ms: float = 300.0,
+    pad_ms: float = 150.0,
+    frame_ms: float = 30.0,
+    hop_ms: float = 10.0,
+) -> VoiceActivity:
+    """Find speech in a clip from frame energy.
+
+    A frame is speech when it is ``margin_db`` above the clip's noise floor (its
+    10th percentile level), never requiring more than ``dynamic_range_db``
+    below the loudest frame, and never accepting anything under ``floor_db``
+    dBFS. Pauses shorter than ``min_silence_ms`` are kept, bursts shorter than
+    ``min_speech_ms`` are dropped, and every segment is padded by ``pad_ms`` so
+    word onsets and tails are not clipped.
+    """
+    frame_length = max(1, int(sr * frame_ms / 1000))
+    hop_length = max(1, int(sr * hop_ms / 1000))
+    levels = frame_energy_db(y, frame_length, hop_length)
+
+    threshold = max(floor_db, min(np.percentile(levels, 10) + margin_db, levels.max() - dynamic_range_db))
+    speech = levels > threshold
+
+    # Bridge short pauses, then drop bursts too short to be speech
+    for start, stop in runs(~speech):
+        if 0 < start and stop < len(speech) and (stop - start) * hop_ms < min_silence_ms:
+            speech[start:stop] = True
+    for start, stop in runs(speech):
+        if (stop - start) * hop_ms + frame_ms < min_speech_ms:
+            speech[start:stop] = False
+
+    pad = int(sr * pad_ms / 1000)
+    segments = []
+    for start, stop in runs(speech):
+        begin = max(0, start * hop_length - pad)
+        end = min(len(y), (stop - 1) * hop_length + frame_length + pad)
+        if segments and begin <= segments[-1][1]:
+            segments[-1] = (segments[-1][0], end)
+        else:
+            segments.append((begin, end))
+
+    if not segments:
+        audio = y[:0]
+    elif len(segments) == 1 and segments[0] == (0, len(y)):
+        audio = y
+    else:
+        audio = np.concatenate([y[begin:end] for begin, end in segments])
+    return VoiceActivity(segments, np.ascontiguousarray(audio, dtype=np.float32), len(y), sr)
@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional, Sequence
+
+import joblib
+import numpy as np
+import sklearn
+from sklearn.linear_model import LogisticRegression, Ridge
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+from features import FEATURE_NAMES
+
+# App mood score (1-10) of each mood, for clips scored without a transcript
+MOOD_SCORES = {"happy": 8, "neutral": 5, "tired": 4, "sad": 3, "anxious": 3, "angry": 3}
+
+
+class VoiceMoodClassifier:
+    """Mood and energy from the acoustic feature vector alone.
+
+    A standardized multinomial logistic regression predicts the mood and a
+    ridge regression the energy level (1-10). Both are a single matrix product
+    per batch, so scoring many clips costs about as much as scoring one.
+    """
+
+    def __init__(self, mood_model, energy_model, metrics: Optional[Dict] = None):
+        self.mood_model = mood_model
+        self.energy_model = energy_model
+        self.metrics = metrics or {}
+
+    @property
+    def moods(self) -> List[str]:
+        return [str(label) for label in self.mood_model.classes_]
+
+    @classmethod
+    def fit(cls, features: np.ndarray, moods: Sequence[str], energies: Sequence[float], c: float = 1.0, alpha: float = 1.0):
+        mood_model = make_pipeline(StandardScaler(), LogisticRegression(C=c, max_iter=2000))
+        energy_model = make_pipeline(StandardScaler(), Ridge(alpha=alpha))
+        mood_model.fit(features, np.asarray(moods))
+        energy_model.fit(features, np.asarray(energies, dtype=np.float64))
+        return cls(mood_model, energy_model)
+
+    def predict_batch(self, features: np.ndarray) -> List[Dict]:
+        """Score a (clips, FEATURE_SIZE) array of feature vectors."""
+        features = np.atleast_2d(features)
+        probabilities = self.mood_model.predict_proba(features)
+        energies = np.clip(np.rint(self.energy_model.predict(features)), 1, 10).astype(int)
+        moods = self.moods
+        scores = probabilities @ np.array([MOOD_SCORES.get(mood, 5) for mood in moods], dtype=np.float64)
+
+        results = []
+        for row, energy, score in zip(probabilities, energies, scores):
+            best = int(np.argmax(row))
+            results.append({
+                "mood": moods[best],
+                "score": int(round(score)),
+                "energy": int(energy),
+                "confidence": round(float(row[best]), 3),
+            })
+        return results
+
+    def evaluate(self, features: np.ndarray, moods: Sequence[str], energies: Sequence[float]) -> Dict:
+        """Accuracy, macro F1, per-mood recall and energy error on labelled feature vectors."""
+        moods = np.asarray(moods)
+        energies = np.asarray(energies, dtype=np.float64)
+        predicted = self.mood_model.predict(features)
+        predicted_energy = np.clip(np.rint(self.energy_model.predict(features)), 1, 10)
+
+        per_mood = {}
+        f1_scores = []
+        for mood in sorted(set(moods) | set(predicted)):
+            true_positives = np.sum((predicted == mood) & (moods == mood))
+            precision = true_positives / max(1, np.sum(predicted == mood))
+            recall = true_positives / max(1, np.sum(moods == mood))
+            f1_scores.append(2 * precision * recall / (precision + recall) if precision + recall else 0.0)
+            per_mood[str(mood)] = {"support": int(np.sum(moods == mood)), "recall": round(float(recall), 3)}
+
+        return {
+            "samples": int(len(moods)),
+            "accuracy": round(float(np.mean(predicted == moods)), 3),
+            "macro_f1": round(float(np.mean(f1_scores)), 3),
+            "energy_mae": round(float(np.mean(np.abs(predicted_energy - energies))), 3),
+            "moods": per_mood,
+        }
+
+    def save(self, path: str):
+        joblib.dump({
+            "mood_model": self.mood_model,
+            "energy_model": self.energy_model,
+            "feature_names": list(FEATURE_NAMES),
+            "sklearn_version": sklearn.__version__,
+            "metrics": self.metrics,
+        }, path)
+
+    @classmethod
+    def load(cls, path: str) -> "VoiceMoodClassifier":
+        """Load a model saved by ``save``; only load files you trust, they are pickles."""
+        saved = joblib.load(path)
+        if saved["feature_names"] != list(FEATURE_NAMES):
+            raise ValueError(f"{path} was trained on a different feature layout, retrain it")
+        return cls(saved["mood_model"], saved["energy_model"], saved.get("metrics"))